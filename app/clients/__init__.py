@@ -3,7 +3,8 @@
 Keep a small explicit public surface for easier imports in the rest of the app.
 """
 
-from .supabase_client import SupabaseClient, table_url
+from .google_maps_client import GoogleMapsClient
+from .supabase_client import SupabaseClient, decode_json, rpc_url, table_url
 
-__all__ = ["SupabaseClient", "table_url"]
+__all__ = ["GoogleMapsClient", "SupabaseClient", "decode_json", "rpc_url", "table_url"]
 
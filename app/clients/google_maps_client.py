@@ -0,0 +1,47 @@
+import logging
+
+import httpx
+
+from app.config import settings
+from app.core.bulkhead import GOOGLE_MAPS, get_bulkhead, pool_limits
+from app.core.deadline import httpx_timeout
+from app.core.metrics import track_upstream
+from app.core.resilience import call_upstream
+
+logger = logging.getLogger(__name__)
+
+_shared_async_client: httpx.AsyncClient | None = None
+
+
+def _get_async_client() -> httpx.AsyncClient:
+    global _shared_async_client
+    if _shared_async_client is None:
+        # Reusar conexiones TLS con Google en lugar de abrir una por request
+        _shared_async_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(settings.GOOGLE_MAPS_TIMEOUT_SECONDS, connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS),
+            limits=pool_limits(GOOGLE_MAPS),
+        )
+    return _shared_async_client
+
+
+class GoogleMapsClient:
+    """Thin shared-connection client for the Google Maps web service APIs."""
+
+    def __init__(self):
+        self._client = _get_async_client()
+
+    async def get(self, endpoint: str, params: dict) -> httpx.Response:
+        """GET ``{base}/{endpoint}/json`` (e.g. ``geocode`` or ``place/autocomplete``)."""
+        url = f"{settings.GOOGLE_MAPS_BASE_URL.rstrip('/')}/{endpoint.strip('/')}/json"
+        logger.debug("GET %s", url)  # params incluye la API key: no se registra
+
+        async def send() -> httpx.Response:
+            # Cupos propios: una ráfaga de geocodificación no compite con Supabase
+            async with get_bulkhead(GOOGLE_MAPS):
+                timeout = httpx_timeout(settings.GOOGLE_MAPS_TIMEOUT_SECONDS)
+                with track_upstream("google_maps", endpoint, "GET") as call:
+                    res = await self._client.get(url, params=params, timeout=timeout)
+                    call.record_response(res.status_code, res.content)
+            return res
+
+        return await call_upstream("google_maps", httpx.URL(url).host, endpoint, "GET", send)
@@ -0,0 +1,53 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from app.config import settings
+from app.core.bulkhead import SENDGRID, get_bulkhead, limit_for
+from app.core.deadline import timeout_for
+from app.core.metrics import track_upstream
+
+logger = logging.getLogger(__name__)
+
+_executor: ThreadPoolExecutor | None = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        # El SDK de SendGrid es bloqueante: hilos propios, del tamaño del bulkhead
+        _executor = ThreadPoolExecutor(max_workers=limit_for(SENDGRID), thread_name_prefix="sendgrid")
+    return _executor
+
+
+def _send_sync(api_key: str, message: Any, timeout: float) -> Any:
+    from sendgrid import SendGridAPIClient  # import diferido: pesado y solo necesario al enviar
+
+    sg = SendGridAPIClient(api_key, host=settings.SENDGRID_API_HOST)
+    sg.client.timeout = timeout
+    return sg.send(message)
+
+
+async def send_mail(api_key: str, message: Any, kind: str) -> Any:
+    """Send a SendGrid ``Mail`` off the event loop and record it in the upstream metrics.
+
+    ``kind`` identifies the email template (used as the metric target label).
+    SendGrid raises on non-2xx responses; the status code is still recorded.
+    Raises BulkheadFull when no SendGrid slot frees up in time.
+    """
+    async with get_bulkhead(SENDGRID):
+        # Lanza DeadlineExceeded si la request ya no tiene tiempo
+        timeout = timeout_for(settings.SENDGRID_TIMEOUT_SECONDS)
+        with track_upstream("sendgrid", kind, "send") as call:
+            try:
+                response = await asyncio.get_running_loop().run_in_executor(
+                    _get_executor(), _send_sync, api_key, message, timeout
+                )
+            except Exception as e:
+                status_code = getattr(e, "status_code", None)
+                if status_code is not None:
+                    call.record_response(status_code, getattr(e, "body", None))
+                raise
+            call.record_response(response.status_code, response.body)
+    return response
@@ -1,10 +1,28 @@
 import httpx
 import logging
+from typing import Any
 from app.config import settings
+from app.core import table_versions
+from app.core.bulkhead import SUPABASE_READ, SUPABASE_WRITE, get_bulkhead, pool_limits
+from app.core.deadline import httpx_timeout
+from app.core.metrics import track_upstream
+from app.core.resilience import call_upstream
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el decoder de httpx
+    orjson = None
 
 logger = logging.getLogger(__name__)
 
 
+def decode_json(res: httpx.Response) -> Any:
+    """Decode a PostgREST JSON body, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(res.content)
+    return res.json()
+
+
 def supabase_headers() -> dict:
     # PostgREST/Supabase acepta ambos: 'apikey' y 'Authorization: Bearer'
     return {
@@ -27,37 +45,116 @@ def table_url(table_name: str | None = None) -> str:
     return f"{base}/rest/v1/{table}"
 
 
+def rpc_url(function_name: str) -> str:
+    """Return the PostgREST URL for a SQL function exposed as RPC."""
+    base = str(settings.SUPABASE_URL).rstrip('/')
+    return f"{base}/rest/v1/rpc/{function_name}"
+
+
+def _table_from_url(url: str) -> str | None:
+    """Extract the table name from a PostgREST table URL (None for RPC calls)."""
+    _, sep, rest = url.partition("/rest/v1/")
+    if not sep or rest.startswith("rpc/"):
+        return None
+    return rest.split("?", 1)[0].strip("/") or None
+
+
+def _target_from_url(url: str) -> str:
+    """Metric label for a PostgREST URL: the table name or ``rpc/<function>``."""
+    _, sep, rest = url.partition("/rest/v1/")
+    if not sep:
+        return "-"
+    return rest.split("?", 1)[0].strip("/") or "-"
+
+
+def _mark_written(url: str) -> None:
+    table = _table_from_url(url)
+    if table:
+        table_versions.bump(table)
+
+
+def _fields(payload: Any) -> list[str] | None:
+    return sorted(payload) if isinstance(payload, dict) else None
+
+
 _shared_async_client: httpx.AsyncClient | None = None
+_shared_write_client: httpx.AsyncClient | None = None
+
+
+def _new_client(bulkhead: str) -> httpx.AsyncClient:
+    # Reusar conexiones (HTTP/1.1 keep-alive) y limitar timeout; pool del tamaño del bulkhead
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(settings.SUPABASE_TIMEOUT_SECONDS, connect=settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS),
+        limits=pool_limits(bulkhead),
+    )
 
 
 def _get_async_client() -> httpx.AsyncClient:
     global _shared_async_client
     if _shared_async_client is None:
-        # Reusar conexiones (HTTP/1.1 keep-alive) y limitar timeout
-        _shared_async_client = httpx.AsyncClient(timeout=httpx.Timeout(10.0))
+        _shared_async_client = _new_client(SUPABASE_READ)
     return _shared_async_client
 
 
+def _get_write_client() -> httpx.AsyncClient:
+    global _shared_write_client
+    if _shared_write_client is None:
+        # Pool aparte: una ráfaga de escrituras no ocupa las conexiones de lectura
+        _shared_write_client = _new_client(SUPABASE_WRITE)
+    return _shared_write_client
+
+
+def _is_read(method: str, url: str) -> bool:
+    # Las RPC (POST /rpc/...) que usa la API son lecturas (feed de seguidos)
+    return method == "GET" or "/rest/v1/rpc/" in url
+
+
 class SupabaseClient:
     def __init__(self):
         self._client = _get_async_client()
+        self._write_client = _get_write_client()
+
+    async def _request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        target = _target_from_url(url)
+        read = _is_read(method, url)
+        client = self._client if read else self._write_client
+        bulkhead = get_bulkhead(SUPABASE_READ if read else SUPABASE_WRITE)
+
+        async def send() -> httpx.Response:
+            async with bulkhead:
+                # Timeout recortado a lo que le queda al deadline de la request
+                timeout = httpx_timeout(settings.SUPABASE_TIMEOUT_SECONDS)
+                with track_upstream("supabase", target, method) as call:
+                    res = await client.request(method, url, headers=supabase_headers(), timeout=timeout, **kwargs)
+                    call.record_response(res.status_code, res.content)
+            return res
+
+        # Breaker por host; los GET además se reintentan (y opcionalmente hedging)
+        return await call_upstream("supabase", httpx.URL(url).host, target, method, send)
 
     async def get(self, url: str, params: dict | None = None):
         logger.debug("GET %s params=%s", url, params)
-        return await self._client.get(url, headers=supabase_headers(), params=params)
+        return await self._request("GET", url, params=params)
 
     async def post(self, url: str, json: dict):
-        logger.debug("POST %s json=%s", url, json)
-        return await self._client.post(url, headers=supabase_headers(), json=json)
+        # Solo las columnas: los valores pueden incluir datos sensibles
+        logger.debug("POST %s fields=%s", url, _fields(json))
+        res = await self._request("POST", url, json=json)
+        _mark_written(url)
+        return res
 
     async def patch(self, url: str, json: dict | None = None, params: dict | None = None):
-        logger.debug("PATCH %s params=%s json=%s", url, params, json)
-        return await self._client.patch(url, headers=supabase_headers(), params=params, json=json)
+        logger.debug("PATCH %s params=%s fields=%s", url, params, _fields(json))
+        res = await self._request("PATCH", url, params=params, json=json)
+        _mark_written(url)
+        return res
 
     async def delete(self, url: str, params: dict | None = None):
         logger.debug("DELETE %s params=%s", url, params)
-        return await self._client.delete(url, headers=supabase_headers(), params=params)
+        res = await self._request("DELETE", url, params=params)
+        _mark_written(url)
+        return res
 
     async def aclose(self):
         # Cliente compartido: no cerrar aquí para no romper otras instancias
-        pass
\ No newline at end of file
+        pass
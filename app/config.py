@@ -11,8 +11,173 @@ class Settings(BaseSettings):
     SUPABASE_TABLE: str = "Usuarios"
     GOOGLE_MAPS_API_KEY: str
     SENDGRID_API_KEY: str
+    # Bases de las APIs externas (se pueden apuntar a bench/fake_upstream.py)
+    GOOGLE_MAPS_BASE_URL: str = "https://maps.googleapis.com/maps/api"
+    SENDGRID_API_HOST: str = "https://api.sendgrid.com"
     APP_TITLE: str = "Proxy API"
     APP_VERSION: str = "1.0.0"
+    # Base de los links de recuperación de contraseña
+    FRONTEND_URL: str = "http://localhost:52802"
+
+    # Logging (ver app/core/logging_setup.py)
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = "httpx=WARNING,httpcore=WARNING"
+    LOG_SAMPLING: str = ""
+    LOG_FORMAT: str = "json"
+
+    # Token para endpoints /admin y para pedir perfiles con `X-Profile: <token>`
+    ADMIN_TOKEN: str | None = None
+    # Fracción de requests perfiladas al azar (0 desactiva) y perfiles guardados
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_MAX_PROFILES: int = 50
+
+    # Llamadas externas más lentas que esto (ms) se registran como warning; 0 desactiva
+    UPSTREAM_SLOW_CALL_MS: int = 500
+
+    # Resiliencia de llamadas externas (ver app/core/resilience.py)
+    UPSTREAM_CONNECT_TIMEOUT_SECONDS: float = 2.0
+    SUPABASE_TIMEOUT_SECONDS: float = 10.0
+    GOOGLE_MAPS_TIMEOUT_SECONDS: float = 5.0
+    SENDGRID_TIMEOUT_SECONDS: float = 10.0
+    # Intentos totales para GET (1 desactiva los reintentos); backoff con jitter
+    UPSTREAM_RETRY_ATTEMPTS: int = 3
+    UPSTREAM_RETRY_BASE_MS: int = 50
+    UPSTREAM_RETRY_MAX_MS: int = 1000
+    UPSTREAM_RETRY_STATUSES: str = "500,502,503,504"
+    # Fallas consecutivas que abren el circuito de un host (0 desactiva) y tiempo abierto
+    CIRCUIT_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_OPEN_SECONDS: float = 10.0
+    # Hedging de GET: segundo intento tras el cuantil de latencia reciente del destino
+    UPSTREAM_HEDGE_ENABLED: bool = False
+    UPSTREAM_HEDGE_QUANTILE: float = 0.95
+    UPSTREAM_HEDGE_MIN_MS: int = 20
+    UPSTREAM_HEDGE_MAX_MS: int = 2000
+    UPSTREAM_HEDGE_MIN_SAMPLES: int = 50
+
+    # Bulkheads (ver app/core/bulkhead.py): llamadas concurrentes por dependencia
+    # (también el tamaño de su pool), cola máxima y espera máxima por un cupo
+    BULKHEAD_SUPABASE_READ: int = 64
+    BULKHEAD_SUPABASE_WRITE: int = 16
+    BULKHEAD_GOOGLE_MAPS: int = 8
+    BULKHEAD_SENDGRID: int = 4
+    BULKHEAD_MAX_QUEUE: int = 200
+    BULKHEAD_QUEUE_TIMEOUT_SECONDS: float = 2.0
+
+    # Deadline por request (ver app/core/deadline.py): default, por prefijo de
+    # ruta ("prefijo=segundos,..."; 0 = sin deadline) y mínimo restante para
+    # ejecutar pasos opcionales (geocodificación, emails, notificaciones)
+    REQUEST_DEADLINE_SECONDS: float = 15.0
+    REQUEST_DEADLINE_ROUTES: str = "/Reportes/actualizar-distritos-masivo=0,/alertas/enviar-ahora=0"
+    DEADLINE_OPTIONAL_MIN_SECONDS: float = 1.0
+
+    # Rate limiting por cliente (usuario o IP) y clase de ruta: "<por minuto>/<ráfaga>",
+    # vacío desactiva la clase. Backend "memory" (por worker) | "sqlite" (compartido)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_SQLITE_PATH: str = str(BASE_DIR / "rate_limits.sqlite3")
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMIT_EXPENSIVE: str = "2/1"
+    RATE_LIMIT_PLACES: str = "30/10"
+    RATE_LIMIT_AUTH: str = "20/10"
+    RATE_LIMIT_WRITES: str = "120/30"
+    RATE_LIMIT_DEFAULT: str = "600/100"
+    # Tomar la IP de X-Forwarded-For (solo detrás de un proxy confiable)
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+
+    # Shedding por sobrecarga (503): requests en curso por worker y retraso del event loop; 0 desactiva
+    OVERLOAD_MAX_IN_FLIGHT: int = 500
+    OVERLOAD_MAX_LAG_MS: int = 250
+
+    # Rollups diarios del ranking de distritos: "memory" (por worker) o "sqlite"
+    # (archivo compartido por los workers del host). Los últimos
+    # ROLLUP_MUTABLE_DAYS días se recalculan en cada refresco.
+    ROLLUPS_ENABLED: bool = True
+    ROLLUP_BACKEND: str = "memory"
+    ROLLUP_SQLITE_PATH: str = str(BASE_DIR / "rollups.sqlite3")
+    ROLLUP_REFRESH_SECONDS: int = 300
+    ROLLUP_MUTABLE_DAYS: int = 30
+    ROLLUP_PAGE_SIZE: int = 1000
+
+    # Filas por página al recorrer Reportes para construir índices en memoria
+    REPORTES_SCAN_PAGE_SIZE: int = 1000
+
+    # Grilla de densidad (geohash) de /Reportes/densidad: precisiones mantenidas,
+    # reconstrucción periódica y máximo de celdas por respuesta
+    DENSITY_ENABLED: bool = True
+    DENSITY_PRECISIONS: str = "4,5,6,7"
+    DENSITY_REFRESH_SECONDS: int = 900
+    DENSITY_MAX_CELLS: int = 5000
+
+    # Clusters de marcadores de /Reportes/clusters: zooms con clusters (por encima
+    # de CLUSTER_MAX_ZOOM se devuelven los reportes sueltos) y radio en píxeles
+    CLUSTERS_ENABLED: bool = True
+    CLUSTER_MIN_ZOOM: int = 0
+    CLUSTER_MAX_ZOOM: int = 16
+    CLUSTER_RADIUS: int = 40
+    CLUSTER_REFRESH_SECONDS: int = 900
+    CLUSTER_MAX_ITEMS: int = 5000
+
+    # Grilla de /Reportes/cercanos: tamaño de celda en grados y radio máximo
+    NEARBY_ENABLED: bool = True
+    NEARBY_CELL_DEGREES: float = 0.01
+    NEARBY_REFRESH_SECONDS: int = 900
+    NEARBY_MAX_RADIUS_M: int = 50000
+
+    # Índice de texto de /Reportes/buscar. SEARCH_FTS_COLUMN (columna tsvector en
+    # Reportes) se usa para buscar en Postgres mientras el índice no está listo
+    SEARCH_ENABLED: bool = True
+    SEARCH_REFRESH_SECONDS: int = 900
+    SEARCH_FTS_COLUMN: str = ""
+
+    # Réplica en memoria de Reportes: carga completa al arrancar, delta cada
+    # REPLICA_SYNC_SECONDS por REPLICA_WATERMARK_COLUMN (releyendo los últimos
+    # REPLICA_CLOCK_SKEW_SECONDS), bajas desde REPLICA_TOMBSTONES_TABLE (obligatoria)
+    # y recarga completa cada REPLICA_RESYNC_SECONDS.
+    # Las lecturas vuelven a Supabase si la última sincronización es más vieja que
+    # REPLICA_MAX_STALENESS_SECONDS
+    REPLICA_ENABLED: bool = False
+    REPLICA_WATERMARK_COLUMN: str = "updated_at"
+    REPLICA_TOMBSTONES_TABLE: str = ""
+    REPLICA_SYNC_SECONDS: float = 2
+    REPLICA_MAX_STALENESS_SECONDS: float = 10
+    REPLICA_RESYNC_SECONDS: int = 3600
+    REPLICA_CLOCK_SKEW_SECONDS: int = 60
+    REPLICA_MAX_SORTED_VIEWS: int = 8
+
+    # Columna opcional con el username en minúsculas (ej. "user_lower") para
+    # búsquedas exactas indexables en lugar de ilike
+    USERS_USERNAME_NORMALIZED_COLUMN: str | None = None
+
+    # Firma de tokens de acceso (mismo valor en todos los workers)
+    AUTH_SECRET_KEY: str | None = None
+    AUTH_TOKEN_TTL_SECONDS: int = 86_400
+
+    # Hash de contraseñas (scrypt) en un pool dedicado
+    PASSWORD_SCRYPT_N: int = 2**14
+    PASSWORD_SCRYPT_R: int = 8
+    PASSWORD_SCRYPT_P: int = 1
+    PASSWORD_HASH_WORKERS: int = 2
+
+    # Rutas con serialización rápida (sin doble validación, orjson); "*" = todas
+    FAST_JSON_ROUTES: str = "reportes.list,reportes.by_user,reportes.seguidos,reportes.get"
+
+    # Tokens de recuperación de contraseña ("memory" | "sqlite" compartido entre workers)
+    RESET_TOKEN_BACKEND: str = "memory"
+    RESET_TOKEN_SQLITE_PATH: str = str(BASE_DIR / "reset_tokens.sqlite3")
+    RESET_TOKEN_TTL_SECONDS: int = 3600
+    RESET_TOKEN_MAX: int = 10_000
+    RESET_TOKEN_SWEEP_SECONDS: int = 60
+
+    # Timelines materializadas del feed de seguidos ("memory" | "sqlite")
+    TIMELINE_BACKEND: str = "memory"
+    TIMELINE_SQLITE_PATH: str = str(BASE_DIR / "timelines.sqlite3")
+    TIMELINE_SIZE: int = 500
+    TIMELINE_MAX_USERS: int = 50_000
+    # Con "memory" cada worker solo ve sus propias escrituras: las timelines se
+    # vuelven a sembrar pasado este tiempo
+    TIMELINE_MEMORY_TTL_SECONDS: int = 30
+    # Autores con más seguidores que esto no hacen fan-out; se leen en pull
+    TIMELINE_FANOUT_MAX_FOLLOWERS: int = 1000
 
     model_config = SettingsConfigDict(
         env_file=str(ENV_PATH),
@@ -21,3 +186,15 @@ class Settings(BaseSettings):
     )
 
 settings = Settings()
+
+
+def use_settings(new: Settings) -> Settings:
+    """Copia `new` sobre el objeto compartido `settings`.
+
+    Los módulos hacen `from app.config import settings` al importarse, así que
+    se actualiza ese mismo objeto en vez de reemplazarlo.
+    """
+    if new is not settings:
+        for name in Settings.model_fields:
+            setattr(settings, name, getattr(new, name))
+    return settings
@@ -25,7 +25,8 @@ async def list_adjuntos_by_reporte(reporte_id: int, service: AdjuntoService = De
 
 @router.post("", response_model=AdjuntoOut, status_code=201)
 async def create_adjunto(data: AdjuntoCreate, service: AdjuntoService = Depends(get_service)):
-    logger.debug("Payload a Supabase: %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase: %s", data.model_dump())
     return await service.create_adjunto(data)
 
 
@@ -0,0 +1,61 @@
+#//sw2_backend_safe2gether/app/controllers/admin_controller.py
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from app.core.bulkhead import bulkhead_snapshot
+from app.core.resilience import circuit_snapshot
+from app.middleware.profiling import get_profile, is_admin_token, list_profiles
+from app.repositories.reportes_replica import get_reportes_replica
+from app.services.indexes import enabled_indexes
+from app.services.rollups_service import get_rollups_service
+
+router = APIRouter(prefix="/admin", tags=["Admin"], include_in_schema=False)
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)) -> None:
+    # Sin ADMIN_TOKEN configurado los endpoints de admin no existen
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+
+
+@router.get("/profiles", dependencies=[Depends(require_admin)])
+async def profiles():
+    """Resumen de los perfiles guardados (más recientes primero)."""
+    return list_profiles()
+
+
+@router.get("/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def profile_detail(profile_id: int):
+    """Perfil completo (salida de pstats ordenada por tiempo acumulado)."""
+    profile = get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    return profile
+
+
+@router.get("/upstreams", dependencies=[Depends(require_admin)])
+async def upstreams():
+    """Estado de los circuit breakers por host y de los bulkheads por dependencia."""
+    return {"circuits": circuit_snapshot(), "bulkheads": bulkhead_snapshot()}
+
+
+@router.get("/rollups", dependencies=[Depends(require_admin)])
+async def rollups():
+    """Estado de los rollups diarios del ranking de distritos."""
+    return get_rollups_service().status()
+
+
+@router.post("/rollups/rebuild", dependencies=[Depends(require_admin)])
+async def rollups_rebuild():
+    """Recalcula todos los rollups (necesario si cambian reportes de días ya congelados)."""
+    return await get_rollups_service().rebuild()
+
+
+@router.get("/indices", dependencies=[Depends(require_admin)])
+async def indices():
+    """Estado de los índices en memoria de Reportes (densidad, clusters, cercanos, búsqueda) en este worker."""
+    return {name: index.status() for name, index in enabled_indexes().items()}
+
+
+@router.get("/replica", dependencies=[Depends(require_admin)])
+async def replica():
+    """Estado de la réplica en memoria de Reportes en este worker."""
+    return get_reportes_replica().status()
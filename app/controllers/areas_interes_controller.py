@@ -42,7 +42,8 @@ async def get_nivel_riesgo(
 @router.post("", response_model=AreaInteresOut, status_code=201)
 async def create_area(data: AreaInteresCreate, service: AreasInteresService = Depends(get_service)):
     """Crea una nueva área de interés"""
-    logger.debug("Payload a Supabase (AreaInteres): %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase (AreaInteres): %s", data.model_dump())
     return await service.create_area(data)
 
 
@@ -1,7 +1,9 @@
 #//sw2_backend_safe2gether/app/controllers/auth_controller.py
 from fastapi import APIRouter, Depends
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from app.services.users_service import UsersService
-from app.models.user import LoginRequest, TokenResponse
+from app.models.user import LoginRequest, SessionOut, TokenResponse
+from app.core.auth_tokens import Session, get_current_session, revoke_token
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
@@ -12,9 +14,24 @@ def get_service() -> UsersService:
 
 @router.post("/login", response_model=TokenResponse)
 async def login(data: LoginRequest, service: UsersService = Depends(get_service)):
-    """Endpoint de login: recibe user + psswd y devuelve token simple.
+    """Endpoint de login: recibe user + psswd y devuelve un token firmado.
 
-    Reemplazar la implementación de token por JWT en producción.
+    Enviar el token como `Authorization: Bearer <token>` en endpoints protegidos.
     """
     result = await service.authenticate(data.user, data.psswd)
     return result
+
+
+@router.get("/me", response_model=SessionOut)
+async def me(session: Session = Depends(get_current_session)):
+    """Devuelve la sesión del token (sin consultar Supabase)."""
+    return SessionOut(user_id=session.user_id, username=session.username, expires_at=session.expires_at)
+
+
+@router.post("/logout")
+async def logout(
+    session: Session = Depends(get_current_session),
+    credentials: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+):
+    """Revoca el token actual."""
+    return {"revoked": revoke_token(credentials.credentials)}
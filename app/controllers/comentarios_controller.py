@@ -29,7 +29,8 @@ async def list_comentarios_by_user(user_id: int, service: ComentariosService = D
 
 @router.post("", response_model=ComentarioOut, status_code=201)
 async def create_comentario(data: ComentarioCreate, service: ComentariosService = Depends(get_service)):
-    logger.debug("Payload a Supabase (Comentario): %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase (Comentario): %s", data.model_dump())
     return await service.create_comentario(data)
 
 
@@ -29,7 +29,8 @@ async def list_notas_by_user(user_id: int, service: NotasComunidadService = Depe
 
 @router.post("", response_model=NotaComunidadOut, status_code=201)
 async def create_nota(data: NotaComunidadCreate, service: NotasComunidadService = Depends(get_service)):
-    logger.debug("Payload a Supabase (Nota Comunidad): %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase (Nota Comunidad): %s", data.model_dump())
     return await service.create_nota(data)
 
 
@@ -1,7 +1,8 @@
 # app/controllers/places_controller.py
 from fastapi import APIRouter, Query, HTTPException
 import httpx
-import os
+from app.clients.google_maps_client import GoogleMapsClient
+from app.config import settings
 
 router = APIRouter(prefix="/places", tags=["Places"])
 
@@ -11,11 +12,10 @@ async def autocomplete_address(q: str = Query(..., min_length=3)):
     Proxy para Google Places Autocomplete API.
     Devuelve sugerencias de direcciones basadas en la consulta.
     """
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    api_key = settings.GOOGLE_MAPS_API_KEY
     if not api_key:
         raise HTTPException(status_code=500, detail="Google Maps API Key no configurada")
     
-    url = "https://maps.googleapis.com/maps/api/place/autocomplete/json"
     params = {
         "input": q,
         "key": api_key,
@@ -24,10 +24,9 @@ async def autocomplete_address(q: str = Query(..., min_length=3)):
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            return response.json()
+        response = await GoogleMapsClient().get("place/autocomplete", params)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error en Google Places API: {str(e)}")
 
@@ -40,11 +39,10 @@ async def reverse_geocode(
     Proxy para Google Geocoding API (Reverse Geocoding).
     Devuelve la dirección formateada basada en coordenadas.
     """
-    api_key = os.getenv("GOOGLE_MAPS_API_KEY")
+    api_key = settings.GOOGLE_MAPS_API_KEY
     if not api_key:
         raise HTTPException(status_code=500, detail="Google Maps API Key no configurada")
     
-    url = "https://maps.googleapis.com/maps/api/geocode/json"
     params = {
         "latlng": f"{lat},{lng}",
         "key": api_key,
@@ -52,9 +50,8 @@ async def reverse_geocode(
     }
     
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, params=params, timeout=10.0)
-            response.raise_for_status()
-            return response.json()
+        response = await GoogleMapsClient().get("geocode", params)
+        response.raise_for_status()
+        return response.json()
     except httpx.HTTPError as e:
         raise HTTPException(status_code=500, detail=f"Error en Google Geocoding API: {str(e)}")
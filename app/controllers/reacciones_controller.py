@@ -29,7 +29,8 @@ async def list_reacciones_by_user(user_id: int, service: ReaccionesService = Dep
 
 @router.post("", response_model=ReaccionOut, status_code=201)
 async def create_reaccion(data: ReaccionCreate, service: ReaccionesService = Depends(get_service)):
-    logger.debug("Payload a Supabase (Reaccion): %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase (Reaccion): %s", data.model_dump())
     return await service.create_reaccion(data)
 
 
@@ -1,9 +1,15 @@
 # //sw2_backend_safe2gether/app/controllers/reportes_controller.py
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
+from datetime import date
 from typing import Optional
 import logging
 from app.services.reportes_service import ReportesService
+from app.services.cluster_service import ClusterService, get_cluster_service
+from app.services.density_service import DensityService, get_density_service
+from app.services.nearby_service import NearbyService, get_nearby_service
+from app.services.search_service import SearchService, get_search_service
 from app.models.reporte import ReporteCreate, ReporteOut, ReporteUpdate
+from app.core.serialization import FastJSONResponse, fast_path_enabled
 
 router = APIRouter(prefix="/Reportes", tags=["Reportes"])
 
@@ -19,25 +25,53 @@ async def list_reportes(
     limit: int = Query(20, ge=1, le=200),
     offset: int = Query(0, ge=0),
     order: str = Query("created_at.desc"),
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej. id,lat,lon,categoria,estado)"),
     service: ReportesService = Depends(get_service),
 ):
-    return await service.list_reportes(limit=limit, offset=offset, order=order)
+    fast = fast_path_enabled("reportes.list")
+    reportes = await service.list_reportes(limit=limit, offset=offset, order=order, trusted=fast, fields=fields)
+    # Las filas parciales no cumplen ReporteOut: se devuelven tal cual
+    return FastJSONResponse(reportes) if fast or fields else reportes
 
 
 @router.get("/user/{user_id}", response_model=list[ReporteOut])
-async def list_reportes_by_user(user_id: int, service: ReportesService = Depends(get_service)):
-    return await service.list_by_user(user_id)
+async def list_reportes_by_user(
+    user_id: int,
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej. id,lat,lon,categoria,estado)"),
+    service: ReportesService = Depends(get_service),
+):
+    fast = fast_path_enabled("reportes.by_user")
+    reportes = await service.list_by_user(user_id, trusted=fast, fields=fields)
+    return FastJSONResponse(reportes) if fast or fields else reportes
 
 
 @router.get("/seguidos/{user_id}", response_model=list[ReporteOut])
-async def list_reportes_from_followed_users(user_id: int, service: ReportesService = Depends(get_service)):
-    """Obtiene reportes de los usuarios que user_id sigue"""
-    return await service.list_reportes_from_followed_users(user_id)
+async def list_reportes_from_followed_users(
+    user_id: int,
+    response: Response,
+    limit: int = Query(20, ge=1, le=200),
+    cursor: Optional[str] = Query(None, description="Cursor devuelto en X-Next-Cursor por la página anterior"),
+    service: ReportesService = Depends(get_service),
+):
+    """Obtiene reportes de los usuarios que user_id sigue (paginado por cursor).
+
+    Si hay más resultados, la respuesta incluye el header X-Next-Cursor.
+    """
+    fast = fast_path_enabled("reportes.seguidos")
+    reportes, next_cursor = await service.list_reportes_from_followed_users(
+        user_id, limit=limit, cursor=cursor, trusted=fast
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if fast:
+        return FastJSONResponse(reportes, headers=headers)
+    response.headers.update(headers)
+    return reportes
 
 
 @router.post("", response_model=ReporteOut, status_code=201)
 async def create_reporte(data: ReporteCreate, service: ReportesService = Depends(get_service)):
-    logger.debug("Payload a Supabase: %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase: %s", data.model_dump())
     return await service.create_reporte(data)
 
 
@@ -68,16 +102,77 @@ async def get_district_statistics(service: ReportesService = Depends(get_service
 async def get_district_ranking(
     period: str = Query("week", pattern="^(week|month|year)$"),
     categorias: Optional[str] = Query(None, description="Filtrar por tipos de delito (separados por coma)"),
+    desde: Optional[date] = Query(None, description="Inicio del rango (YYYY-MM-DD, UTC); reemplaza a period"),
+    hasta: Optional[date] = Query(None, description="Fin del rango, inclusive (YYYY-MM-DD, UTC)"),
+    comparar: bool = Query(False, description="Incluir el período anterior de igual largo"),
     service: ReportesService = Depends(get_service)
 ):
     """Ranking de distritos más seguros (menos reportes válidos) para el período indicado.
 
     period: week | month | year
     categorias: (opcional) filtrar por tipos de delito específicos separados por coma
+    desde/hasta: (opcional) rango de días personalizado, máximo 366 días
+    comparar: (opcional) agrega `anterior` y `variacion_porcentaje` por distrito
     """
     # Convertir string separado por comas a lista
     categorias_list = [c.strip() for c in categorias.split(',')] if categorias else None
-    return await service.get_district_ranking(period, categorias_list)
+    return await service.get_district_ranking(period, categorias_list, desde, hasta, comparar)
+
+@router.get("/densidad")
+async def get_densidad(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    precision: int = Query(6, ge=1, le=12, description="Largo del geohash de cada celda"),
+    desde: Optional[date] = Query(None, description="Solo reportes desde este día (YYYY-MM-DD, UTC)"),
+    categorias: Optional[str] = Query(None, description="Filtrar por tipos de delito (separados por coma)"),
+    solo_validos: bool = Query(False, description="Solo reportes Activos con veracidad suficiente"),
+    service: DensityService = Depends(get_density_service),
+):
+    """Conteo de reportes por celda geohash para mapas de calor.
+
+    Devuelve arreglos paralelos `celdas` y `conteos` (solo celdas con reportes).
+    """
+    categorias_list = [c.strip() for c in categorias.split(',')] if categorias else None
+    return await service.densidad(bbox, precision, desde, categorias_list, solo_validos)
+
+
+@router.get("/clusters")
+async def get_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+    zoom: float = Query(..., ge=0, le=24, description="Zoom actual del mapa"),
+    service: ClusterService = Depends(get_cluster_service),
+):
+    """Clusters de reportes para el zoom del mapa.
+
+    Devuelve arreglos paralelos `ids`, `lats`, `lons` y `counts`; `ids` es null
+    en los clusters y el id del reporte cuando `counts` es 1.
+    """
+    return await service.clusters(bbox, zoom)
+
+
+@router.get("/cercanos")
+async def get_cercanos(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radio: float = Query(1000, gt=0, description="Radio de búsqueda en metros"),
+    k: int = Query(20, ge=1, le=200, description="Máximo de reportes a devolver"),
+    desde: Optional[date] = Query(None, description="Solo reportes desde este día (YYYY-MM-DD, UTC)"),
+    service: NearbyService = Depends(get_nearby_service),
+):
+    """Reportes cercanos a un punto, ordenados por distancia (incluye `distancia_m`)."""
+    return await service.cercanos(lat, lon, radio, k, desde)
+
+
+@router.get("/buscar")
+async def buscar_reportes(
+    q: str = Query(..., min_length=2, max_length=200, description="Texto a buscar en título y descripción"),
+    distrito: Optional[str] = Query(None),
+    categoria: Optional[str] = Query(None),
+    limit: int = Query(20, ge=1, le=100),
+    service: SearchService = Depends(get_search_service),
+):
+    """Búsqueda de texto en reportes, los más relevantes primero (incluye `puntaje`)."""
+    return await service.buscar(q, distrito, categoria, limit)
+
 
 @router.post("/{reporte_id}/actualizar-distrito")
 async def actualizar_distrito_desde_coordenadas(
@@ -103,5 +198,11 @@ async def actualizar_distritos_masivo(
 
 
 @router.get("/{id}", response_model=ReporteOut)
-async def get_reporte(id: int, service: ReportesService = Depends(get_service)):
-    return await service.get_reporte(id)
\ No newline at end of file
+async def get_reporte(
+    id: int,
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (ej. id,lat,lon,categoria,estado)"),
+    service: ReportesService = Depends(get_service),
+):
+    fast = fast_path_enabled("reportes.get")
+    reporte = await service.get_reporte(id, trusted=fast, fields=fields)
+    return FastJSONResponse(reporte) if fast or fields else reporte
\ No newline at end of file
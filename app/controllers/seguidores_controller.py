@@ -37,7 +37,8 @@ async def is_following(seguidor_id: int, seguido_id: int, service: SeguidoresSer
 
 @router.post("", response_model=SeguidorOut, status_code=201)
 async def create_seguidor(data: SeguidorCreate, service: SeguidoresService = Depends(get_service)):
-    logger.debug("Payload a Supabase (Seguidor): %s", data.model_dump())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase (Seguidor): %s", data.model_dump())
     return await service.create_seguidor(data)
 
 
@@ -1,5 +1,7 @@
 #//sw2_backend_safe2gether/app/controllers/users_controller.py
 from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from typing import Optional
 import logging
 from app.services.users_service import UsersService
 from app.models.user import UserCreate, UserOut, UserUpdate
@@ -22,14 +24,16 @@ def get_service() -> UsersService:
 
 
 @router.get("", response_model=list[UserOut])
-async def list_users(service: UsersService = Depends(get_service)):
-    return await service.list_users()
+async def list_users(fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (id,user,email)"), service: UsersService = Depends(get_service)):
+    users = await service.list_users(fields)
+    # Las filas parciales no cumplen UserOut: se devuelven tal cual
+    return JSONResponse(users) if fields else users
 
 
 @router.post("", response_model=UserOut, status_code=201)
 async def create_user(data: UserCreate, service: UsersService = Depends(get_service)):
-    # Use logger instead of print for better control
-    logger.debug("Payload a Supabase: %s", data.dict())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Payload a Supabase: %s", data.model_dump(exclude={"psswd"}))
     return await service.create_user(data)
 
 
@@ -51,17 +55,18 @@ async def replace_user(id: int, data: UserCreate, service: UsersService = Depend
 
 # Bulk fetch users by ids: /users/bulk?ids=1,2,3
 @router.get("/bulk")
-async def bulk_users(ids: str = Query(""), service: UsersService = Depends(get_service)):
+async def bulk_users(ids: str = Query(""), fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (id,user,email)"), service: UsersService = Depends(get_service)):
     try:
         id_list = [int(x) for x in ids.split(",") if x.strip().isdigit()]
-        return await service.get_users_by_ids(id_list)
     except Exception as e:
         from fastapi import HTTPException
         raise HTTPException(status_code=400, detail=f"ids inválidos: {e}")
+    return await service.get_users_by_ids(id_list, fields)
 
 @router.get("/{id}", response_model=UserOut)
-async def get_user(id: int, service: UsersService = Depends(get_service)):
-    return await service.get_user(id)
+async def get_user(id: int, fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (id,user,email)"), service: UsersService = Depends(get_service)):
+    user = await service.get_user(id, fields)
+    return JSONResponse(user) if fields else user
 
 @router.post("/password/request-reset", response_model=PasswordResetResponse)
 async def request_password_reset(
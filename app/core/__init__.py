@@ -0,0 +1,5 @@
+"""core package
+
+Cross-cutting helpers (caching, serialization, field selection, ...) shared
+by repositories, services and controllers.
+"""
@@ -0,0 +1,122 @@
+"""Signed access tokens and a cached verification dependency.
+
+Token format: base64url(JSON claims) "." base64url(HMAC-SHA256(claims)),
+signed with settings.AUTH_SECRET_KEY. Claims: sub (user id), usr (username),
+iat, exp and jti (for revocation).
+
+Verified sessions are kept in an LRU with TTL so authenticated requests need
+neither an HMAC nor an upstream user lookup on the hot path. Revocations are
+per process; configure the same AUTH_SECRET_KEY on every worker so tokens
+verify everywhere.
+"""
+from dataclasses import dataclass
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app.config import settings
+from app.core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Session:
+    user_id: int
+    username: str
+    expires_at: int
+    jti: str
+
+
+_secret_key: bytes | None = None
+_sessions = TTLCache(maxsize=10_000, ttl=300.0)
+# jti revocados hasta que sus tokens expiren
+_revoked = TTLCache(maxsize=100_000, ttl=86_400.0)
+
+
+def _key() -> bytes:
+    global _secret_key
+    if _secret_key is None:
+        if settings.AUTH_SECRET_KEY:
+            _secret_key = settings.AUTH_SECRET_KEY.encode()
+        else:
+            logger.warning("AUTH_SECRET_KEY not set: using a random per-process key")
+            _secret_key = secrets.token_bytes(32)
+    return _secret_key
+
+
+def _b64encode(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_key(), payload.encode(), hashlib.sha256).digest())
+
+
+def issue_token(user_id: int, username: str) -> tuple[str, int]:
+    """Return (token, expires_in_seconds) for the given user."""
+    now = int(time.time())
+    ttl = settings.AUTH_TOKEN_TTL_SECONDS
+    claims = {"sub": user_id, "usr": username, "iat": now, "exp": now + ttl, "jti": secrets.token_urlsafe(12)}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}", ttl
+
+
+def verify_token(token: str) -> Session | None:
+    """Return the session for a valid, unexpired, unrevoked token (None otherwise)."""
+    session = _sessions.get(token)
+    now = time.time()
+    if session is None:
+        payload, _, signature = token.partition(".")
+        # compare_digest con str falla (TypeError) si hay caracteres no ASCII: se comparan bytes
+        if not payload or not signature or not hmac.compare_digest(signature.encode(), _sign(payload).encode()):
+            return None
+        try:
+            claims = json.loads(_b64decode(payload))
+            session = Session(int(claims["sub"]), str(claims["usr"]), int(claims["exp"]), str(claims["jti"]))
+        except (ValueError, KeyError, TypeError):
+            return None
+        if session.expires_at <= now:
+            return None
+        _sessions.set(token, session, ttl=min(_sessions.ttl, session.expires_at - now))
+    if session.expires_at <= now or session.jti in _revoked:
+        _sessions.pop(token)
+        return None
+    return session
+
+
+def revoke_token(token: str) -> bool:
+    session = verify_token(token)
+    if session is None:
+        return False
+    _revoked.set(session.jti, True, ttl=max(1.0, session.expires_at - time.time()))
+    _sessions.pop(token)
+    return True
+
+
+_bearer = HTTPBearer(auto_error=False)
+
+
+async def get_current_session(
+    credentials: HTTPAuthorizationCredentials | None = Depends(_bearer),
+) -> Session:
+    """FastAPI dependency: the caller's session, or 401."""
+    session = verify_token(credentials.credentials) if credentials else None
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token inválido o expirado",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return session
@@ -0,0 +1,20 @@
+"""Periodic background tasks started from the app lifespan."""
+from typing import Any, Awaitable, Protocol
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Refreshable(Protocol):
+    def refresh(self) -> Awaitable[Any]: ...
+
+
+async def run_refresher(service: Refreshable, interval_seconds: float) -> None:
+    """Call service.refresh() now and then every interval_seconds, logging failures."""
+    while True:
+        try:
+            await service.refresh()
+        except Exception:
+            logger.exception("%s refresh failed", type(service).__name__)
+        await asyncio.sleep(interval_seconds)
@@ -0,0 +1,129 @@
+"""Bulkheads: límites de concurrencia aislados por dependencia externa.
+
+Cada dependencia (lecturas de Supabase, escrituras de Supabase, Google Maps,
+SendGrid) tiene su propio semáforo y su propio pool de conexiones (o de hilos,
+en SendGrid), así que una dependencia degradada agota solo sus cupos. Las
+llamadas que no consiguen cupo esperan en cola hasta BULKHEAD_QUEUE_TIMEOUT_SECONDS
+(o lo que quede del deadline de la request) y, si la cola está llena o la
+espera se agota, fallan al instante con BulkheadFull (503 si nadie la maneja).
+"""
+from __future__ import annotations
+
+import asyncio
+import time
+
+import httpx
+
+from app.config import settings
+from app.core import deadline
+from app.core.metrics import REGISTRY
+
+SUPABASE_READ = "supabase_read"
+SUPABASE_WRITE = "supabase_write"
+GOOGLE_MAPS = "google_maps"
+SENDGRID = "sendgrid"
+
+BULKHEAD_IN_USE = REGISTRY.gauge("bulkhead_in_use", "Cupos ocupados por bulkhead.", ("bulkhead",))
+BULKHEAD_QUEUED = REGISTRY.gauge("bulkhead_queued", "Llamadas esperando cupo por bulkhead.", ("bulkhead",))
+BULKHEAD_REJECTIONS = REGISTRY.counter(
+    "bulkhead_rejections_total", "Llamadas rechazadas por bulkhead (cola llena o espera agotada).", ("bulkhead", "reason")
+)
+BULKHEAD_WAIT = REGISTRY.histogram(
+    "bulkhead_queue_wait_seconds", "Espera en cola antes de obtener cupo.", ("bulkhead",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+class BulkheadFull(httpx.TransportError):
+    """No slot became available in time for this dependency.
+
+    Subclasses httpx.TransportError so existing ``except httpx.HTTPError``
+    handlers degrade gracefully; the app maps an unhandled one to a 503.
+    """
+
+    def __init__(self, name: str, reason: str):
+        super().__init__(f"Bulkhead {name} saturado ({reason})")
+        self.bulkhead = name
+        self.reason = reason
+
+
+def limit_for(name: str) -> int:
+    return max(1, {
+        SUPABASE_READ: settings.BULKHEAD_SUPABASE_READ,
+        SUPABASE_WRITE: settings.BULKHEAD_SUPABASE_WRITE,
+        GOOGLE_MAPS: settings.BULKHEAD_GOOGLE_MAPS,
+        SENDGRID: settings.BULKHEAD_SENDGRID,
+    }[name])
+
+
+class Bulkhead:
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_use = 0
+        self.waiting = 0
+
+    def _reject(self, reason: str) -> BulkheadFull:
+        BULKHEAD_REJECTIONS.inc(self.name, reason)
+        return BulkheadFull(self.name, reason)
+
+    async def acquire(self) -> None:
+        if self._semaphore.locked():
+            if self.waiting >= settings.BULKHEAD_MAX_QUEUE:
+                raise self._reject("queue_full")
+            timeout = settings.BULKHEAD_QUEUE_TIMEOUT_SECONDS
+            left = deadline.remaining()
+            if left is not None:
+                timeout = min(timeout, max(left, 0.0))
+            start = time.perf_counter()
+            self.waiting += 1
+            BULKHEAD_QUEUED.inc(self.name)
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("queue_timeout") from None
+            finally:
+                self.waiting -= 1
+                BULKHEAD_QUEUED.dec(self.name)
+            BULKHEAD_WAIT.observe(self.name, value=time.perf_counter() - start)
+        else:
+            await self._semaphore.acquire()
+            BULKHEAD_WAIT.observe(self.name, value=0.0)
+        self.in_use += 1
+        BULKHEAD_IN_USE.inc(self.name)
+
+    def release(self) -> None:
+        self.in_use -= 1
+        BULKHEAD_IN_USE.dec(self.name)
+        self._semaphore.release()
+
+    async def __aenter__(self) -> "Bulkhead":
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.release()
+
+    def snapshot(self) -> dict:
+        return {"name": self.name, "limit": self.limit, "in_use": self.in_use, "waiting": self.waiting}
+
+
+_bulkheads: dict[str, Bulkhead] = {}
+
+
+def get_bulkhead(name: str) -> Bulkhead:
+    bulkhead = _bulkheads.get(name)
+    if bulkhead is None:
+        bulkhead = _bulkheads[name] = Bulkhead(name, limit_for(name))
+    return bulkhead
+
+
+def bulkhead_snapshot() -> list[dict]:
+    return [b.snapshot() for b in _bulkheads.values()]
+
+
+def pool_limits(name: str) -> httpx.Limits:
+    """Connection pool sized to the bulkhead, so each dependency has its own sockets."""
+    limit = limit_for(name)
+    return httpx.Limits(max_connections=limit, max_keepalive_connections=limit)
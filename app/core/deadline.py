@@ -0,0 +1,69 @@
+"""Deadline por request compartido por todas las llamadas externas del flujo.
+
+DeadlineMiddleware fija un instante límite (reloj monotónico) en una
+context variable; los clientes de Supabase, Google Maps y SendGrid recortan su
+timeout a lo que queda y fallan con DeadlineExceeded si ya no queda nada. Los
+servicios consultan `has_budget()` para saltarse pasos opcionales
+(geocodificación, emails, notificaciones) cuando el presupuesto se agotó.
+
+Fuera de una request (tareas de fondo, scripts) no hay deadline y todo se
+comporta como antes.
+"""
+from __future__ import annotations
+
+import time
+from contextvars import ContextVar
+
+import httpx
+
+from app.config import settings
+
+deadline_var: ContextVar[float | None] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(httpx.TimeoutException):
+    """The request's time budget ran out before (or while) calling an upstream.
+
+    Subclasses httpx.TimeoutException so handlers that already treat upstream
+    timeouts as a soft failure keep doing so; DeadlineMiddleware turns an
+    unhandled one into a 504.
+    """
+
+    def __init__(self, message: str = "Se agotó el tiempo de la request"):
+        super().__init__(message)
+
+
+def remaining() -> float | None:
+    """Seconds left in the current request's budget, or None without a deadline."""
+    deadline = deadline_var.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def expired() -> bool:
+    left = remaining()
+    return left is not None and left <= 0
+
+
+def has_budget(seconds: float | None = None) -> bool:
+    """True if at least ``seconds`` remain (default DEADLINE_OPTIONAL_MIN_SECONDS)."""
+    left = remaining()
+    if left is None:
+        return True
+    return left >= (settings.DEADLINE_OPTIONAL_MIN_SECONDS if seconds is None else seconds)
+
+
+def timeout_for(default: float) -> float:
+    """The upstream timeout to use now: ``default`` capped by the remaining budget."""
+    left = remaining()
+    if left is None:
+        return default
+    if left <= 0:
+        raise DeadlineExceeded()
+    return min(default, left)
+
+
+def httpx_timeout(default: float) -> httpx.Timeout:
+    total = timeout_for(default)
+    return httpx.Timeout(total, connect=min(settings.UPSTREAM_CONNECT_TIMEOUT_SECONDS, total))
@@ -0,0 +1,35 @@
+"""Sparse fieldsets: `?fields=a,b,c` passed through to the PostgREST `select`.
+
+Each resource declares an allow-list of columns that clients may request; the
+validated list becomes the `select` of the upstream query so that only those
+columns travel from the database.
+"""
+from typing import Iterable, TypeVar
+
+from fastapi import HTTPException, status
+from pydantic import BaseModel
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def parse_fields(fields: str | None, allowed: Iterable[str]) -> str | None:
+    """Validate a `fields` query value; returns the PostgREST select or None if absent."""
+    if not fields:
+        return None
+    allowed = set(allowed)
+    requested = list(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    invalid = [f for f in requested if f not in allowed]
+    if invalid or not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Campos no permitidos: {', '.join(invalid) or fields}. Permitidos: {', '.join(sorted(allowed))}",
+        )
+    return ",".join(requested)
+
+
+def partial_rows(model: type[M], rows: Iterable[dict], *, trusted: bool = False) -> list[dict]:
+    """Validate partial rows with an all-optional model, keeping only the columns present."""
+    if trusted:
+        # PostgREST ya devolvió solo las columnas pedidas
+        return list(rows)
+    return [model(**row).model_dump(exclude_unset=True) for row in rows]
@@ -0,0 +1,22 @@
+"""Distance helpers for lat/lon coordinates."""
+import math
+
+EARTH_RADIUS_M = 6_371_000.0
+# Metros por grado de latitud (aprox. constante)
+METERS_PER_DEGREE = 111_320.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in meters."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    a = (math.sin(math.radians(lat2 - lat1) / 2) ** 2
+         + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def degrees_around(lat: float, radius_m: float) -> tuple[float, float]:
+    """Half-size (dlat, dlon) in degrees of the box that contains a circle of radius_m."""
+    dlat = radius_m / METERS_PER_DEGREE
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    return dlat, min(180.0, dlat / cos_lat)
@@ -0,0 +1,149 @@
+"""Logging configuration: off-loop I/O, JSON records, request IDs and sampling.
+
+Records are enqueued by a QueueHandler on the calling thread (the event loop)
+and written to stdout by a QueueListener thread, so a slow stdout never blocks
+request handling. Filters run before the enqueue: the request ID is read from
+the context of the request that emitted the record, and high-volume
+DEBUG/INFO loggers can be sampled down (WARNING and above are never dropped).
+
+Environment:
+    LOG_LEVEL     root level (INFO)
+    LOG_LEVELS    per-logger levels, e.g. "httpx=WARNING,app.clients=DEBUG"
+    LOG_SAMPLING  per-logger keep ratio below WARNING, e.g. "app.clients.supabase_client=0.05"
+    LOG_FORMAT    "json" (default) or "text"
+"""
+from contextvars import ContextVar
+from datetime import datetime, timezone
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+
+from app.config import settings
+
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+_STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "request_id"}
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+def parse_mapping(spec: str | None) -> dict[str, str]:
+    """Parse "name=value,name=value" into a dict (blank entries ignored)."""
+    result: dict[str, str] = {}
+    for item in (spec or "").split(","):
+        name, sep, value = item.partition("=")
+        if sep and name.strip() and value.strip():
+            result[name.strip()] = value.strip()
+    return result
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of sub-WARNING records for the configured loggers.
+
+    The ratio of the longest matching logger prefix applies ("app.clients"
+    also covers "app.clients.supabase_client").
+    """
+
+    def __init__(self, rates: dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._resolved: dict[str, float] = {}
+
+    def _rate_for(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate = 1.0
+            candidate = name
+            while candidate:
+                if candidate in self.rates:
+                    rate = self.rates[candidate]
+                    break
+                candidate = candidate.rpartition(".")[0]
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self._rate_for(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        # Campos pasados con extra={...}
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        elif record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolver mensaje y traceback aquí (objetos vivos), pero dejar el
+        # formateo final (JSON/texto) al hilo del listener
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup_logging() -> None:
+    """Install the queue-based handler on the root logger (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    output = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "text":
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    else:
+        output.setFormatter(JsonFormatter())
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(log_queue)
+    handler.addFilter(RequestIdFilter())
+    rates = {name: float(value) for name, value in parse_mapping(settings.LOG_SAMPLING).items()}
+    handler.addFilter(SamplingFilter(rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+    for name, level in parse_mapping(settings.LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush pending records and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
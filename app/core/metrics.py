@@ -0,0 +1,214 @@
+"""Métricas en proceso con exposición en formato de texto de Prometheus.
+
+Registro mínimo (contadores, gauges, histogramas con labels) sin depender de
+prometheus_client. Cada worker expone sus propias series; Prometheus las
+distingue por instancia.
+"""
+from __future__ import annotations
+
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._series: dict[tuple[str, ...], object] = {}
+
+    def _key(self, labels: Sequence[str]) -> tuple[str, ...]:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera labels {self.labelnames}")
+        return tuple(str(v) for v in labels)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._series[key] = self._series.get(key, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._series.get(self._key(labels), 0.0)
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with self._lock:
+            items = list(self._series.items())
+        for key, value in items:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._series[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels: str, value: float) -> None:
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # [conteos por bucket (no acumulados) + overflow, suma, total]
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][idx] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with self._lock:
+            items = [(k, (list(s[0]), s[1], s[2])) for k, s in self._series.items()]
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.setdefault(metric.name, metric)
+        return self._metrics[metric.name]
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labelnames))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help_text, labelnames, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+# --- Llamadas a servicios externos (Supabase, Google Maps, SendGrid) ---------
+_UPSTREAM_LABELS = ("service", "target", "operation")
+
+UPSTREAM_LATENCY = REGISTRY.histogram(
+    "upstream_request_duration_seconds", "Latencia de llamadas a servicios externos.", _UPSTREAM_LABELS
+)
+UPSTREAM_REQUESTS = REGISTRY.counter(
+    "upstream_requests_total", "Llamadas a servicios externos por código de estado.", _UPSTREAM_LABELS + ("status",)
+)
+UPSTREAM_RESPONSE_BYTES = REGISTRY.histogram(
+    "upstream_response_bytes", "Tamaño del cuerpo de respuesta de servicios externos.", _UPSTREAM_LABELS, SIZE_BUCKETS
+)
+UPSTREAM_IN_FLIGHT = REGISTRY.gauge(
+    "upstream_in_flight_requests", "Llamadas a servicios externos en curso.", _UPSTREAM_LABELS
+)
+
+
+class UpstreamCall:
+    """Resultado de una llamada medida; el llamador completa status y bytes."""
+
+    __slots__ = ("status", "response_bytes")
+
+    def __init__(self) -> None:
+        self.status: str = "error"
+        self.response_bytes: int | None = None
+
+    def record_response(self, status_code: int, body: bytes | str | None) -> None:
+        self.status = str(status_code)
+        if body is not None:
+            self.response_bytes = len(body)
+
+
+@contextmanager
+def track_upstream(service: str, target: str, operation: str) -> Iterator[UpstreamCall]:
+    """Measure one upstream call: latency, status, response size and in-flight count.
+
+    An exception escaping the block is counted with status="error".
+    """
+    labels = (service, target or "-", operation)
+    call = UpstreamCall()
+    UPSTREAM_IN_FLIGHT.inc(*labels)
+    start = time.perf_counter()
+    try:
+        yield call
+    finally:
+        elapsed = time.perf_counter() - start
+        UPSTREAM_IN_FLIGHT.dec(*labels)
+        UPSTREAM_LATENCY.observe(*labels, value=elapsed)
+        UPSTREAM_REQUESTS.inc(*labels, call.status)
+        if call.response_bytes is not None:
+            UPSTREAM_RESPONSE_BYTES.observe(*labels, value=call.response_bytes)
+        threshold_ms = settings.UPSTREAM_SLOW_CALL_MS
+        if threshold_ms and elapsed * 1000 >= threshold_ms:
+            logger.warning(
+                "Llamada lenta %s %s %s: %.0f ms (status=%s)",
+                service, operation, labels[1], elapsed * 1000, call.status,
+            )
+
+
+def render_latest() -> str:
+    return REGISTRY.render()
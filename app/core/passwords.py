@@ -0,0 +1,113 @@
+"""Password hashing off the event loop.
+
+Hashes use scrypt from hashlib (no extra dependency) and are stored as
+`scrypt$<n>$<r>$<p>$<salt>$<hash>`. Hashing and verification run in a
+dedicated thread pool (hashlib.scrypt releases the GIL) behind a semaphore,
+so a login storm queues here instead of blocking other requests on the
+same worker. The semaphore has one slot per pool thread, so callers beyond
+that wait here (exported as password_hash_waiting) instead of in the
+executor's hidden queue. Legacy plaintext values are still accepted and flagged for
+rehash, as are hashes made with older cost parameters.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import hashlib
+import hmac
+import secrets
+
+from app.config import settings
+from app.core.metrics import REGISTRY
+
+PREFIX = "scrypt"
+
+_executor: ThreadPoolExecutor | None = None
+_semaphore: asyncio.Semaphore | None = None
+_waiting = 0
+_running = 0
+
+PASSWORD_HASH_WAITING = REGISTRY.gauge("password_hash_waiting", "Hashes de contraseña esperando un hilo libre.")
+PASSWORD_HASH_RUNNING = REGISTRY.gauge("password_hash_running", "Hashes de contraseña en ejecución.")
+
+
+def _pool() -> tuple[ThreadPoolExecutor, asyncio.Semaphore]:
+    global _executor, _semaphore
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash"
+        )
+        _semaphore = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS)
+    return _executor, _semaphore
+
+
+def _params() -> tuple[int, int, int]:
+    return settings.PASSWORD_SCRYPT_N, settings.PASSWORD_SCRYPT_R, settings.PASSWORD_SCRYPT_P
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+
+def _b64(raw: bytes) -> str:
+    return base64.b64encode(raw).decode()
+
+
+def _hash_sync(password: str) -> str:
+    n, r, p = _params()
+    salt = secrets.token_bytes(16)
+    digest = _scrypt(password, salt, n, r, p)
+    return f"{PREFIX}${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+
+def _verify_sync(password: str, stored: str) -> tuple[bool, bool]:
+    if not stored.startswith(PREFIX + "$"):
+        # Valor legado en texto plano: comparar en tiempo constante y migrar
+        return hmac.compare_digest(password.encode(), stored.encode()), True
+    try:
+        _, n, r, p, salt, digest = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        expected = base64.b64decode(digest)
+        actual = _scrypt(password, base64.b64decode(salt), n, r, p)
+    except (ValueError, TypeError):
+        return False, False
+    return hmac.compare_digest(actual, expected), (n, r, p) != _params()
+
+
+async def _run(fn, *args):
+    global _waiting, _running
+    executor, semaphore = _pool()
+    _waiting += 1
+    PASSWORD_HASH_WAITING.set(value=_waiting)
+    try:
+        await semaphore.acquire()
+    finally:
+        _waiting -= 1
+        PASSWORD_HASH_WAITING.set(value=_waiting)
+    _running += 1
+    PASSWORD_HASH_RUNNING.set(value=_running)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _running -= 1
+        PASSWORD_HASH_RUNNING.set(value=_running)
+        semaphore.release()
+
+
+async def hash_password(password: str) -> str:
+    return await _run(_hash_sync, password)
+
+
+async def verify_password(password: str, stored: str | None) -> tuple[bool, bool]:
+    """Return (matches, needs_rehash) for a login attempt."""
+    if not stored:
+        return False, False
+    return await _run(_verify_sync, password, stored)
+
+
+def is_hashed(value: str | None) -> bool:
+    return bool(value) and value.startswith(PREFIX + "$")
+
+
+def stats() -> dict:
+    """Queue depth (waiting for a slot) and in-flight hash operations."""
+    return {"waiting": _waiting, "running": _running}
@@ -0,0 +1,47 @@
+"""In-process notifications of writes to Reportes.
+
+ReportesRepository publishes every row it creates, updates or deletes (as
+returned by PostgREST) so that in-memory indexes can apply the change right
+away instead of waiting for their next refresh. Like table_versions this is
+per process: writes served by another worker only show up after the
+subscriber's own periodic refresh.
+
+Listeners run synchronously on the request path and must be cheap; errors are
+logged and never fail the write.
+"""
+from typing import Any, Callable, Dict, List
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPSERT = "upsert"
+DELETE = "delete"
+
+Listener = Callable[[str, List[Dict[str, Any]]], None]
+
+_listeners: List[Listener] = []
+
+
+def subscribe(listener: Listener) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def unsubscribe(listener: Listener) -> None:
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def publish(kind: str, rows: Any) -> None:
+    if not _listeners:
+        return
+    if isinstance(rows, dict):
+        rows = [rows]
+    rows = [r for r in rows or [] if isinstance(r, dict) and r.get("id") is not None]
+    if not rows:
+        return
+    for listener in list(_listeners):
+        try:
+            listener(kind, rows)
+        except Exception:
+            logger.exception("Reporte change listener failed")
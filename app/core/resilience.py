@@ -0,0 +1,243 @@
+"""Reintentos, circuit breakers y hedging para llamadas a servicios externos.
+
+`call_upstream()` envuelve un intento (la función `send`, que ya mide la
+llamada con track_upstream) con:
+
+- circuit breaker por host: tras N fallas consecutivas (transporte o 5xx) el
+  host queda abierto y las llamadas fallan al instante con CircuitOpenError;
+  pasado CIRCUIT_OPEN_SECONDS se deja pasar una sola llamada de prueba.
+- reintentos con backoff exponencial y jitter completo, solo para métodos
+  idempotentes (GET), solo ante errores de transporte o estados transitorios
+  y solo si al deadline de la request (app/core/deadline.py) le queda tiempo.
+- hedging opcional para GET: si el primer intento no respondió tras el p95
+  reciente de ese destino, se envía un segundo y gana el primero que responda.
+
+Cada worker mantiene su propio estado; las métricas salen en /metrics.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+import httpx
+
+from app.config import settings
+from app.core import deadline
+from app.core.bulkhead import BulkheadFull
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+UPSTREAM_RETRIES = REGISTRY.counter(
+    "upstream_retries_total", "Reintentos de llamadas a servicios externos.", ("service", "target", "reason")
+)
+CIRCUIT_STATE = REGISTRY.gauge(
+    "upstream_circuit_state", "Estado del circuit breaker por host (0=cerrado, 1=semiabierto, 2=abierto).",
+    ("service", "host"),
+)
+CIRCUIT_REJECTIONS = REGISTRY.counter(
+    "upstream_circuit_rejections_total", "Llamadas rechazadas por un circuit breaker abierto.", ("service", "host")
+)
+UPSTREAM_HEDGES = REGISTRY.counter(
+    "upstream_hedges_total", "Llamadas de respaldo (hedged) enviadas y ganadas.", ("service", "target", "outcome")
+)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUE = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised without touching the network while a host's breaker is open.
+
+    Subclasses httpx.TransportError so existing ``except httpx.HTTPError``
+    handlers treat it like any other unreachable upstream.
+    """
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker with a single half-open probe."""
+
+    def __init__(self, service: str, host: str):
+        self.service = service
+        self.host = host
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: float | None = None
+        CIRCUIT_STATE.set(service, host, value=0)
+
+    def _set_state(self, state: str) -> None:
+        if state != self.state:
+            logger.warning("Circuit breaker %s/%s: %s -> %s", self.service, self.host, self.state, state)
+        self.state = state
+        CIRCUIT_STATE.set(self.service, self.host, value=_STATE_VALUE[state])
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= settings.CIRCUIT_OPEN_SECONDS:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN:
+            # Una prueba a la vez; si la prueba quedó colgada (cancelada) se permite otra
+            now = time.monotonic()
+            if self._probe_started is None or now - self._probe_started >= settings.CIRCUIT_OPEN_SECONDS:
+                self._probe_started = now
+                return True
+        return False
+
+    def check(self) -> None:
+        if not self.allow():
+            CIRCUIT_REJECTIONS.inc(self.service, self.host)
+            raise CircuitOpenError(f"Circuito abierto para {self.service} ({self.host})")
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_started = None
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_started = None
+        threshold = settings.CIRCUIT_FAILURE_THRESHOLD
+        if self.state == HALF_OPEN or (threshold and self.failures >= threshold):
+            self.opened_at = time.monotonic()
+            self._set_state(OPEN)
+
+    def snapshot(self) -> dict:
+        return {"service": self.service, "host": self.host, "state": self.state, "failures": self.failures}
+
+
+class LatencyWindow:
+    """Recent successful latencies for one target, used to pick the hedge delay."""
+
+    def __init__(self, size: int = 256):
+        self.samples: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def quantile(self, q: float) -> float | None:
+        if len(self.samples) < settings.UPSTREAM_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_breakers: dict[tuple[str, str], CircuitBreaker] = {}
+_latencies: dict[tuple[str, str], LatencyWindow] = {}
+
+
+def breaker_for(service: str, host: str) -> CircuitBreaker:
+    key = (service, host)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        breaker = _breakers[key] = CircuitBreaker(service, host)
+    return breaker
+
+
+def circuit_snapshot() -> list[dict]:
+    return [b.snapshot() for b in _breakers.values()]
+
+
+def _retry_statuses() -> frozenset[int]:
+    return frozenset(int(s) for s in settings.UPSTREAM_RETRY_STATUSES.split(",") if s.strip())
+
+
+def _is_failure(res: httpx.Response) -> bool:
+    return res.status_code >= 500
+
+
+def _backoff_seconds(attempt: int) -> float:
+    # Jitter completo: uniforme entre 0 y el tope exponencial
+    cap = min(settings.UPSTREAM_RETRY_MAX_MS, settings.UPSTREAM_RETRY_BASE_MS * 2 ** attempt)
+    return random.uniform(0, cap) / 1000
+
+
+def _hedge_delay(window: LatencyWindow) -> float | None:
+    p = window.quantile(settings.UPSTREAM_HEDGE_QUANTILE)
+    if p is None:
+        return None
+    return min(max(p, settings.UPSTREAM_HEDGE_MIN_MS / 1000), settings.UPSTREAM_HEDGE_MAX_MS / 1000)
+
+
+async def _hedged(send: Callable[[], Awaitable[httpx.Response]], delay: float, service: str, target: str,
+                  retryable: frozenset[int]) -> httpx.Response:
+    primary = asyncio.ensure_future(send())
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        if done:
+            return primary.result()
+
+        UPSTREAM_HEDGES.inc(service, target, "sent")
+        backup = asyncio.ensure_future(send())
+        pending = {primary, backup}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None and task.result().status_code not in retryable:
+                    if task is backup:
+                        UPSTREAM_HEDGES.inc(service, target, "won")
+                    return task.result()
+        # Ambos fallaron: se devuelve (o se lanza) el resultado del intento original
+        return primary.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def call_upstream(service: str, host: str, target: str, method: str,
+                        send: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+    """Run ``send`` under the host's circuit breaker, with retries/hedging for GETs."""
+    breaker = breaker_for(service, host)
+    idempotent = method == "GET"
+    attempts = max(1, settings.UPSTREAM_RETRY_ATTEMPTS) if idempotent else 1
+    retryable = _retry_statuses()
+    window = _latencies.setdefault((service, target), LatencyWindow())
+
+    async def timed_send() -> httpx.Response:
+        start = time.perf_counter()
+        res = await send()
+        if not _is_failure(res):
+            window.add(time.perf_counter() - start)
+        return res
+
+    attempt = 0
+    while True:
+        breaker.check()
+        delay = _hedge_delay(window) if idempotent and settings.UPSTREAM_HEDGE_ENABLED else None
+        last = attempt + 1 >= attempts
+        try:
+            if delay is None:
+                res = await timed_send()
+            else:
+                res = await _hedged(timed_send, delay, service, target, retryable)
+        except (CircuitOpenError, BulkheadFull, deadline.DeadlineExceeded):
+            # Decisiones locales, no fallas del host: ni reintento ni breaker
+            raise
+        except httpx.TransportError as exc:
+            if isinstance(exc, httpx.TimeoutException) and deadline.expired():
+                # El timeout lo recortó el deadline de la request: no es culpa del host
+                raise deadline.DeadlineExceeded() from exc
+            breaker.record_failure()
+            if last or breaker.state == OPEN or not deadline.has_budget(settings.UPSTREAM_RETRY_MAX_MS / 1000):
+                raise
+            UPSTREAM_RETRIES.inc(service, target, type(exc).__name__)
+        else:
+            if _is_failure(res):
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if last or res.status_code not in retryable or breaker.state == OPEN:
+                return res
+            if not deadline.has_budget(settings.UPSTREAM_RETRY_MAX_MS / 1000):
+                return res
+            UPSTREAM_RETRIES.inc(service, target, str(res.status_code))
+            await res.aclose()
+        await asyncio.sleep(_backoff_seconds(attempt))
+        attempt += 1
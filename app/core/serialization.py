@@ -0,0 +1,51 @@
+"""Fast serialization path for hot list endpoints.
+
+Rows coming from our own PostgREST tables are already well-typed, so on routes
+listed in settings.FAST_JSON_ROUTES we build response models with
+`model_construct` (no validation) and return a FastJSONResponse, which FastAPI
+sends as-is instead of re-validating against `response_model` and encoding
+with the stdlib json module.
+"""
+from typing import Any, Iterable, TypeVar
+import json
+
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.config import settings
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+M = TypeVar("M", bound=BaseModel)
+
+
+def fast_path_enabled(route: str) -> bool:
+    """True if `route` (e.g. "reportes.list") is listed in FAST_JSON_ROUTES ("*" = all)."""
+    routes = {r.strip() for r in settings.FAST_JSON_ROUTES.split(",") if r.strip()}
+    return "*" in routes or route in routes
+
+
+def build_models(model: type[M], rows: Iterable[dict], *, trusted: bool = False) -> list[M]:
+    """Build response models from upstream rows, skipping validation when trusted."""
+    if trusted:
+        return [model.model_construct(**row) for row in rows]
+    return [model(**row) for row in rows]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # model_construct deja los campos en __dict__ (sin extras)
+        return obj.__dict__
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+class FastJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=_default)
+        return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
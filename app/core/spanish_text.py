@@ -0,0 +1,62 @@
+"""Spanish text normalization for search: accent folding, stopwords, light stemming.
+
+The stemmer is deliberately light (plurals, gender vowel, a few common
+derivational suffixes) so that "robos", "robo" and "robado" or "calles" and
+"calle" share a term without the over-stemming of a full Snowball stemmer.
+The same pipeline is applied to documents and queries.
+"""
+from typing import List
+import re
+import unicodedata
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOPWORDS = frozenset(
+    """
+    a al algo algun alguna algunas alguno algunos ante antes aqui asi cada como con contra cual cuando
+    de del desde donde durante e el ella ellas ellos en entre era es esa esas ese eso esos esta estaba
+    estan estas este esto estos fue fueron ha habia han hasta hay la las le les lo los mas me mi mis muy
+    nada ni no nos o otra otro para pero poco por porque que se sea ser si sin sobre solo son su sus
+    tambien tan te todo todos tu un una uno unos y ya
+    """.split()
+)
+
+# Más largos primero: se quita solo el primero que coincida
+_SUFFIXES = (
+    "amientos", "imientos", "aciones", "uciones", "amiento", "imiento", "idades", "mente",
+    "acion", "ucion", "idad", "ismos", "istas", "ismo", "ista", "ables", "ibles", "able", "ible",
+    "osas", "osos", "osa", "oso", "ados", "adas", "ado", "ada",
+)
+_MIN_STEM = 3
+
+
+def fold(text: str) -> str:
+    """Lowercase and strip accents (ñ becomes n)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def stem(word: str) -> str:
+    if len(word) <= _MIN_STEM or word.isdigit():
+        return word
+    for suffix in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= _MIN_STEM:
+            word = word[: -len(suffix)]
+            break
+    if word.endswith("ces") and len(word) > 4:
+        # luces -> luz, veces -> vez
+        return word[:-3] + "z"
+    if word.endswith("es") and len(word) > 4:
+        word = word[:-2]
+    elif word.endswith("s") and len(word) > 4:
+        word = word[:-1]
+    if word[-1] in "aeo" and len(word) > _MIN_STEM:
+        word = word[:-1]
+    return word
+
+
+def terms(text: str | None) -> List[str]:
+    """Search terms of `text`, in order (repeated terms are kept)."""
+    if not text:
+        return []
+    return [stem(word) for word in _WORD.findall(fold(text)) if word not in STOPWORDS]
@@ -0,0 +1,18 @@
+"""Per-table write counters used to build cheap validators (ETags).
+
+SupabaseClient bumps the counter of a table on every write it sends; code that
+changes a table through another path should call `bump` itself. Counters are
+per process, so consumers must tolerate other workers' writes being invisible
+(see app.middleware.etag, whose per-worker tag entries expire after a window).
+"""
+from typing import Iterable
+
+_versions: dict[str, int] = {}
+
+
+def bump(table: str) -> None:
+    _versions[table] = _versions.get(table, 0) + 1
+
+
+def current(tables: Iterable[str]) -> tuple[int, ...]:
+    return tuple(_versions.get(t, 0) for t in tables)
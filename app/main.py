@@ -1,97 +1,234 @@
-from fastapi import FastAPI
+"""Punto de entrada de la API.
+
+`create_app()` arma la aplicación; `uvicorn app.main:app` sigue funcionando
+porque `app` se construye la primera vez que se pide (y también se puede usar
+`uvicorn --factory app.main:create_app`). Importar este módulo no registra
+rutas, no configura logging ni importa sendgrid.
+"""
+from contextlib import asynccontextmanager
+import asyncio
+import logging
+
+from fastapi import APIRouter, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import PlainTextResponse
 from fastapi.middleware.gzip import GZipMiddleware
-import logging
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-
-# ⚠️ CRÍTICO: Cargar settings.env desde app/
-env_path = Path(__file__).parent / 'settings.env'
-print(f"\n🔍 Cargando variables desde: {env_path}")
-
-if env_path.exists():
-    load_dotenv(dotenv_path=env_path, verbose=True)
-    print(f"   ✅ Archivo encontrado y cargado")
-else:
-    print(f"   ❌ ERROR: {env_path} no existe")
-
-# Verificar carga de variables
-print("\n" + "=" * 60)
-print("🔧 VERIFICACIÓN DE VARIABLES DE ENTORNO")
-print("=" * 60)
-print(f"✅ SUPABASE_URL: {os.getenv('SUPABASE_URL', 'NO CONFIGURADA')[:50]}...")
-print(f"✅ SUPABASE_ANON_KEY: {'Configurada ✓' if os.getenv('SUPABASE_ANON_KEY') else '❌ NO CONFIGURADA'}")
-print(f"✅ SENDGRID_API_KEY: {'Configurada ✓' if os.getenv('SENDGRID_API_KEY') else '❌ NO CONFIGURADA'}")
-print(f"✅ GOOGLE_MAPS_API_KEY: {'Configurada ✓' if os.getenv('GOOGLE_MAPS_API_KEY') else '❌ NO CONFIGURADA'}")
-print("=" * 60 + "\n")
-
-# Ahora importar después de cargar .env
-from app.config import settings
-from app.controllers.users_controller import router as users_router
-from app.controllers.reportes_controller import router as reportes_router
-from app.controllers.adjunto_controller import router as adjuntos_router
-from app.controllers.reacciones_controller import router as reacciones_router
-from app.controllers.comentarios_controller import router as comentarios_router
-from app.controllers.auth_controller import router as auth_router
-from app.controllers.notas_comunidad_controller import router as notas_comunidad_router
-from app.controllers.seguidores_controller import router as seguidores_router
-from app.controllers.places_controller import router as places_router
-from app.controllers.areas_interes_controller import router as areas_interes_router
-
-# Basic logging to stdout to capture debug logs from clients/repos
-logging.basicConfig(level=logging.DEBUG)
-
-app = FastAPI(
-    title=settings.APP_TITLE,
-    version=settings.APP_VERSION,
-    description="API MVC con FastAPI + Supabase (PostgREST)",
-)
-
-# GZip para comprimir respuestas JSON grandes
-app.add_middleware(GZipMiddleware, minimum_size=1024)
-
-# CORS - permitir orígenes durante desarrollo (ajustar en producción)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # para desarrollo; en producción restringir a orígenes confiables
-    allow_credentials=True,
-    # declarar explícitamente OPTIONS y otros métodos
-    allow_methods=["OPTIONS", "GET", "POST", "PUT", "PATCH", "DELETE", "HEAD"],
-    allow_headers=["*"],
-    expose_headers=["*"],
-    max_age=600,
-)
-
-app.include_router(users_router)
-app.include_router(reportes_router)
-app.include_router(auth_router)
-app.include_router(adjuntos_router)
-app.include_router(reacciones_router)
-app.include_router(comentarios_router)
-app.include_router(notas_comunidad_router)
-app.include_router(seguidores_router)
-app.include_router(places_router)
-app.include_router(areas_interes_router)
+from fastapi.responses import JSONResponse, PlainTextResponse
+
+# settings.env se carga una sola vez, en Settings (ver app/config.py)
+from app.config import Settings, settings, use_settings
+from app.core.logging_setup import setup_logging, shutdown_logging
+from app.core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render_latest
+
+logger = logging.getLogger("app")
+
+# Rutas de sistema (health, métricas, utilidades); los routers de dominio
+# se incluyen en create_app
+system_router = APIRouter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from app.core import reporte_changes
+    from app.core.background import run_refresher
+    from app.services.indexes import IndexRefresher, enabled_indexes
+    from app.middleware.overload import run_lag_monitor
+    from app.stores.reset_token_store import get_reset_token_store, run_sweeper
+
+    logger.info(
+        "Servicios configurados: supabase=%s sendgrid=%s google_maps=%s",
+        bool(settings.SUPABASE_URL), bool(settings.SENDGRID_API_KEY), bool(settings.GOOGLE_MAPS_API_KEY),
+    )
+    # Barrido periódico de tokens de reset expirados
+    background_tasks = [
+        asyncio.create_task(run_sweeper(get_reset_token_store(), settings.RESET_TOKEN_SWEEP_SECONDS)),
+        # Retraso del event loop para el shedding por sobrecarga
+        asyncio.create_task(run_lag_monitor()),
+    ]
+    if settings.ROLLUPS_ENABLED:
+        from app.services.rollups_service import get_rollups_service
+
+        # Backfill inicial y refresco incremental de los rollups del ranking
+        background_tasks.append(
+            asyncio.create_task(run_refresher(get_rollups_service(), settings.ROLLUP_REFRESH_SECONDS))
+        )
+    # Índices en memoria (densidad, clusters, cercanos, búsqueda): se cargan al arrancar, se
+    # reconstruyen periódicamente (un solo recorrido de Reportes para todos los que
+    # vencen) y siguen las escrituras de este worker
+    indexes = list(enabled_indexes().values())
+    for index in indexes:
+        reporte_changes.subscribe(index.apply_changes)
+    if indexes:
+        refresher = IndexRefresher(indexes)
+        background_tasks.append(asyncio.create_task(run_refresher(refresher, refresher.interval_seconds)))
+    if settings.REPLICA_ENABLED and not settings.REPLICA_TOMBSTONES_TABLE:
+        logger.warning("REPLICA_ENABLED sin REPLICA_TOMBSTONES_TABLE: la réplica de Reportes no se carga")
+    elif settings.REPLICA_ENABLED:
+        from app.repositories.reportes_replica import get_reportes_replica
+
+        # Réplica de Reportes: carga inicial y sincronización por delta
+        replica = get_reportes_replica()
+        reporte_changes.subscribe(replica.apply_changes)
+        background_tasks.append(asyncio.create_task(replica.run()))
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        shutdown_logging()
+
+
+async def bulkhead_full_handler(request, exc):
+    # Dependencia saturada: fallar rápido y pedir reintento en vez de encolar sin límite
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Servicio temporalmente saturado, intente nuevamente"},
+        headers={"Retry-After": "1"},
+    )
+
+
+def create_app(app_settings: Settings | None = None) -> FastAPI:
+    """Construye la aplicación; `app_settings` reemplaza la configuración cargada del entorno."""
+    if app_settings is not None:
+        use_settings(app_settings)
+
+    # Logging estructurado con escritura fuera del event loop (LOG_LEVEL, LOG_LEVELS, ...)
+    setup_logging()
+
+    from app.controllers.admin_controller import router as admin_router
+    from app.controllers.adjunto_controller import router as adjuntos_router
+    from app.controllers.areas_interes_controller import router as areas_interes_router
+    from app.controllers.auth_controller import router as auth_router
+    from app.controllers.comentarios_controller import router as comentarios_router
+    from app.controllers.notas_comunidad_controller import router as notas_comunidad_router
+    from app.controllers.places_controller import router as places_router
+    from app.controllers.reacciones_controller import router as reacciones_router
+    from app.controllers.reportes_controller import router as reportes_router
+    from app.controllers.seguidores_controller import router as seguidores_router
+    from app.controllers.users_controller import router as users_router
+    from app.core.bulkhead import BulkheadFull
+    from app.middleware.deadline import DeadlineMiddleware
+    from app.middleware.etag import CachePolicy, ConditionalGetMiddleware
+    from app.middleware.overload import OverloadShedderMiddleware
+    from app.middleware.profiling import ProfilingMiddleware
+    from app.middleware.rate_limit import RateLimitMiddleware, RateLimitPolicy
+    from app.middleware.request_id import RequestIdMiddleware
+
+    app = FastAPI(
+        title=settings.APP_TITLE,
+        version=settings.APP_VERSION,
+        description="API MVC con FastAPI + Supabase (PostgREST)",
+        lifespan=lifespan,
+    )
+
+    # Perfilado bajo demanda (X-Profile: <ADMIN_TOKEN>) o por muestreo; el más
+    # interno para medir solo el handler y no GZip/CORS
+    app.add_middleware(ProfilingMiddleware)
+
+    # ETag / If-None-Match para endpoints que los clientes consultan en polling.
+    # Va dentro de GZip (el ETag es el hash del cuerpo sin comprimir) y de CORS
+    # (para que los 304 lleven headers CORS).
+    app.add_middleware(
+        ConditionalGetMiddleware,
+        policies=[
+            CachePolicy(r"/Reportes", tables=("Reportes",), max_age=15),
+            CachePolicy(r"/Reportes/ranking/distritos", tables=("Reportes",), max_age=60),
+            CachePolicy(r"/Reportes/estadisticas/distritos", tables=("Reportes",), max_age=60),
+            CachePolicy(r"/Reportes/densidad", tables=("Reportes",), max_age=30),
+            CachePolicy(r"/Reportes/clusters", tables=("Reportes",), max_age=15),
+            CachePolicy(r"/Reportes/cercanos", tables=("Reportes",), max_age=15),
+            CachePolicy(r"/Reportes/buscar", tables=("Reportes",), max_age=15),
+            CachePolicy(r"/AreasInteres/\d+/riesgo", tables=("AreasInteres", "Reportes"), max_age=60),
+        ],
+    )
+
+    # GZip para comprimir respuestas JSON grandes
+    app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+    # Deadline por request: acota el tiempo total de todas las llamadas externas
+    # del flujo; un DeadlineExceeded no manejado se responde con 504
+    app.add_middleware(DeadlineMiddleware)
+
+    # Límite de tasa por cliente y clase de ruta (429 antes de llegar al handler).
+    # Gana la primera política que coincide.
+    if settings.RATE_LIMIT_ENABLED:
+        app.add_middleware(
+            RateLimitMiddleware,
+            policies=[
+                RateLimitPolicy("expensive", r"/Reportes/actualizar-distritos-masivo|/alertas/enviar-ahora",
+                                settings.RATE_LIMIT_EXPENSIVE),
+                RateLimitPolicy("places", r"/places/.*", settings.RATE_LIMIT_PLACES),
+                RateLimitPolicy("auth", r"/auth/.*", settings.RATE_LIMIT_AUTH, methods=("POST",)),
+                RateLimitPolicy("writes", r"/.*", settings.RATE_LIMIT_WRITES, methods=("POST", "PUT", "PATCH", "DELETE")),
+                RateLimitPolicy("default", r"/(?!health|metrics|admin).*", settings.RATE_LIMIT_DEFAULT),
+            ],
+        )
+
+    # Shedding por sobrecarga (503): va por fuera del rate limit para que rechazar sea lo más barato posible
+    app.add_middleware(OverloadShedderMiddleware)
+
+    # Request ID para correlacionar logs (envuelve shedding, rate limit, deadline, ETag, GZip, perfilado y handlers)
+    app.add_middleware(RequestIdMiddleware)
+
+    # CORS - permitir orígenes durante desarrollo (ajustar en producción)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # para desarrollo; en producción restringir a orígenes confiables
+        allow_credentials=True,
+        # declarar explícitamente OPTIONS y otros métodos
+        allow_methods=["OPTIONS", "GET", "POST", "PUT", "PATCH", "DELETE", "HEAD"],
+        allow_headers=["*"],
+        expose_headers=["*"],
+        max_age=600,
+    )
+
+    app.add_exception_handler(BulkheadFull, bulkhead_full_handler)
+
+    app.include_router(users_router)
+    app.include_router(reportes_router)
+    app.include_router(auth_router)
+    app.include_router(adjuntos_router)
+    app.include_router(reacciones_router)
+    app.include_router(comentarios_router)
+    app.include_router(notas_comunidad_router)
+    app.include_router(seguidores_router)
+    app.include_router(places_router)
+    app.include_router(areas_interes_router)
+    app.include_router(admin_router)
+    app.include_router(system_router)
+    return app
+
+
+def __getattr__(name: str):
+    # `app` perezoso: se crea al primer acceso (uvicorn app.main:app)
+    if name == "app":
+        global app
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Health check con verificación de servicios
-@app.get("/health")
+@system_router.get("/health")
 async def health():
     return {
         "status": "ok",
         "environment": {
-            "supabase": "configured" if os.getenv("SUPABASE_URL") else "missing",
-            "sendgrid": "configured" if os.getenv("SENDGRID_API_KEY") else "missing",
-            "google_maps": "configured" if os.getenv("GOOGLE_MAPS_API_KEY") else "missing"
+            "supabase": "configured" if settings.SUPABASE_URL else "missing",
+            "sendgrid": "configured" if settings.SENDGRID_API_KEY else "missing",
+            "google_maps": "configured" if settings.GOOGLE_MAPS_API_KEY else "missing"
         }
     }
 
+# Métricas de llamadas externas en formato Prometheus (por worker)
+@system_router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_latest(), media_type=METRICS_CONTENT_TYPE)
+
 # Endpoint de prueba para SendGrid
-@app.get("/test-sendgrid")
+@system_router.get("/test-sendgrid")
 async def test_sendgrid():
     """Verifica configuración de SendGrid"""
-    api_key = os.getenv("SENDGRID_API_KEY")
+    api_key = settings.SENDGRID_API_KEY
     
     if not api_key:
         return {
@@ -107,7 +244,7 @@ async def test_sendgrid():
     }
 
 # Endpoint para enviar alertas de riesgo manualmente (útil para testing)
-@app.post("/alertas/enviar-ahora")
+@system_router.post("/alertas/enviar-ahora")
 async def enviar_alertas_manual():
     """
     Endpoint manual para enviar alertas de riesgo a todas las áreas activas.
@@ -210,6 +347,6 @@ async def enviar_alertas_manual():
         }
 
 # Fallback global OPTIONS handler para preflight (evita 405 si alguna ruta no responde a OPTIONS)
-@app.options("/{full_path:path}")
+@system_router.options("/{full_path:path}")
 async def preflight_handler(full_path: str):
     return PlainTextResponse('', status_code=200)
\ No newline at end of file
@@ -0,0 +1,22 @@
+"""middleware package
+
+ASGI middlewares registered in app.main.
+"""
+
+from .deadline import DeadlineMiddleware
+from .etag import CachePolicy, ConditionalGetMiddleware
+from .overload import OverloadShedderMiddleware
+from .profiling import ProfilingMiddleware
+from .rate_limit import RateLimitMiddleware, RateLimitPolicy
+from .request_id import RequestIdMiddleware
+
+__all__ = [
+    "CachePolicy",
+    "ConditionalGetMiddleware",
+    "DeadlineMiddleware",
+    "OverloadShedderMiddleware",
+    "ProfilingMiddleware",
+    "RateLimitMiddleware",
+    "RateLimitPolicy",
+    "RequestIdMiddleware",
+]
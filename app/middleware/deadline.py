@@ -0,0 +1,97 @@
+"""Per-request deadlines.
+
+The budget is the route default (``REQUEST_DEADLINE_ROUTES``, longest path
+prefix wins, else ``REQUEST_DEADLINE_SECONDS``), optionally shortened by the
+client with ``X-Request-Timeout: <seconds>``. A DeadlineExceeded that escapes
+the handler becomes a 504 if the response has not started yet.
+"""
+import json
+import logging
+import time
+
+from app.config import settings
+from app.core.deadline import DeadlineExceeded, deadline_var
+from app.core.logging_setup import parse_mapping
+from app.core.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_EXCEEDED = REGISTRY.counter(
+    "request_deadline_exceeded_total", "Requests cortadas con 504 por agotar su deadline.", ("method",)
+)
+
+
+def _route_budgets() -> list[tuple[str, float]]:
+    budgets = []
+    for prefix, value in parse_mapping(settings.REQUEST_DEADLINE_ROUTES).items():
+        try:
+            budgets.append((prefix, float(value)))
+        except ValueError:
+            logger.warning("REQUEST_DEADLINE_ROUTES: valor inválido para %s: %r", prefix, value)
+    # Prefijo más largo primero
+    return sorted(budgets, key=lambda item: len(item[0]), reverse=True)
+
+
+def _client_budget(headers: list[tuple[bytes, bytes]]) -> float | None:
+    for name, value in headers:
+        if name == b"x-request-timeout":
+            try:
+                seconds = float(value.decode("latin-1"))
+            except ValueError:
+                return None
+            return seconds if seconds > 0 else None
+    return None
+
+
+class DeadlineMiddleware:
+    def __init__(self, app):
+        self.app = app
+        self.routes = _route_budgets()
+
+    def budget_for(self, path: str, headers: list[tuple[bytes, bytes]]) -> float:
+        budget = settings.REQUEST_DEADLINE_SECONDS
+        for prefix, seconds in self.routes:
+            if path.startswith(prefix):
+                budget = seconds
+                break
+        client = _client_budget(headers)
+        if client is None:
+            return budget
+        # El cliente solo puede acortar el presupuesto, nunca alargarlo (0 = sin límite)
+        return client if budget <= 0 else min(budget, client)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        budget = self.budget_for(scope["path"], scope["headers"])
+        if budget <= 0:
+            await self.app(scope, receive, send)
+            return
+
+        token = deadline_var.set(time.monotonic() + budget)
+        started = False
+
+        async def send_tracking(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_tracking)
+        except DeadlineExceeded:
+            if started:
+                raise
+            DEADLINE_EXCEEDED.inc(scope["method"])
+            logger.warning("Deadline de %.1f s agotado: %s %s", budget, scope["method"], scope["path"])
+            body = json.dumps({"detail": "La solicitud excedió su tiempo máximo"}, ensure_ascii=False).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 504,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            })
+            await send({"type": "http.response.body", "body": body})
+        finally:
+            deadline_var.reset(token)
@@ -0,0 +1,118 @@
+"""Conditional GET support (ETag / If-None-Match) for hot polling endpoints.
+
+The ETag is a hash of the (uncompressed) 200 response body, so every worker
+produces the same tag for the same data and the tag only changes when the
+data does. A matching If-None-Match gets a 304 with no body.
+
+Each worker also remembers the last tag per (path, query, write counters of
+the route's tables; see app.core.table_versions) for `window` seconds. While
+that entry lives, a matching If-None-Match is answered before the endpoint
+runs: no upstream call, no serialization. Writes made by this worker change
+the counters and so skip the entry; writes made by other workers are seen
+once the entry expires and the endpoint runs again.
+"""
+from dataclasses import dataclass
+import hashlib
+import re
+
+from app.core import table_versions
+from app.core.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    path: str  # regex matched against the full request path
+    tables: tuple[str, ...]
+    max_age: int = 30
+    window: int | None = None  # defaults to max_age
+
+    def __post_init__(self):
+        object.__setattr__(self, "_regex", re.compile(self.path))
+
+    def matches(self, path: str) -> bool:
+        return self._regex.fullmatch(path) is not None
+
+
+# (path, query, versiones) -> último ETag calculado por este worker
+_known_tags = TTLCache(maxsize=10_000, ttl=60.0)
+
+
+def _etag_for(body: bytes) -> str:
+    return f'W/"{hashlib.blake2b(body, digest_size=12).hexdigest()}"'
+
+
+def _if_none_match(headers: list[tuple[bytes, bytes]]) -> list[str]:
+    for name, value in headers:
+        if name == b"if-none-match":
+            return [t.strip().removeprefix("W/") for t in value.decode("latin-1").split(",")]
+    return []
+
+
+def _cache_headers(policy: CachePolicy, etag: str) -> list[tuple[bytes, bytes]]:
+    return [
+        (b"etag", etag.encode()),
+        (b"cache-control", f"private, max-age={policy.max_age}".encode()),
+    ]
+
+
+class ConditionalGetMiddleware:
+    def __init__(self, app, policies: list[CachePolicy]):
+        self.app = app
+        self.policies = policies
+
+    def _policy_for(self, path: str) -> CachePolicy | None:
+        for policy in self.policies:
+            if policy.matches(path):
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+        policy = self._policy_for(scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = (scope["path"], scope.get("query_string", b""), table_versions.current(policy.tables))
+        candidates = _if_none_match(scope["headers"])
+
+        async def not_modified(etag: str) -> None:
+            await send({"type": "http.response.start", "status": 304, "headers": _cache_headers(policy, etag)})
+            await send({"type": "http.response.body", "body": b""})
+
+        known = _known_tags.get(key)
+        if known is not None and ("*" in candidates or known.removeprefix("W/") in candidates):
+            await not_modified(known)
+            return
+
+        start = None
+        chunks: list[bytes] = []
+
+        async def send_with_etag(message):
+            nonlocal start
+            if start is None and message["type"] == "http.response.start":
+                if message["status"] != 200:
+                    start = False
+                    await send(message)
+                    return
+                # Retener la respuesta hasta tener el cuerpo completo para calcular el ETag
+                start = message
+                return
+            if not start or message["type"] != "http.response.body":
+                await send(message)
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+            body = b"".join(chunks)
+            etag = _etag_for(body)
+            _known_tags.set(key, etag, ttl=max(1, policy.window or policy.max_age))
+            if "*" in candidates or etag.removeprefix("W/") in candidates:
+                await not_modified(etag)
+                return
+            await send({**start, "headers": [*start.get("headers", []), *_cache_headers(policy, etag)]})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_with_etag)
@@ -0,0 +1,154 @@
+"""On-demand request profiling with cProfile.
+
+A request is profiled when it carries ``X-Profile: <ADMIN_TOKEN>`` or when it
+falls within PROFILING_SAMPLE_RATE. Authorized requests get a summary in the
+response headers (Server-Timing with wall/CPU/await time, top functions by own
+time); every profile is kept in a bounded in-memory ring that the admin
+endpoints expose.
+
+cProfile hooks the event-loop thread, so only one request is profiled at a
+time and the profile also includes work of requests interleaved with it.
+"CPU" is the loop thread's CPU time during the request; "await" is the rest of
+the wall time (upstream I/O, waiting on the loop).
+"""
+from collections import deque
+import hmac
+import io
+import itertools
+import os
+import random
+import time
+
+from app.config import settings
+
+_TOP_IN_HEADER = 5
+_STATS_LINES = 60
+
+_profiles: deque[dict] = deque(maxlen=max(1, settings.PROFILING_MAX_PROFILES))
+_ids = itertools.count(1)
+_active = False
+
+
+def list_profiles() -> list[dict]:
+    """Summaries of the stored profiles, newest first (without the full stats)."""
+    return [{k: v for k, v in p.items() if k != "stats"} for p in reversed(_profiles)]
+
+
+def get_profile(profile_id: int) -> dict | None:
+    for profile in _profiles:
+        if profile["id"] == profile_id:
+            return profile
+    return None
+
+
+def is_admin_token(value: str | None) -> bool:
+    token = settings.ADMIN_TOKEN
+    return bool(token and value and hmac.compare_digest(value.encode(), token.encode()))
+
+
+def _header(headers: list[tuple[bytes, bytes]], name: bytes) -> str | None:
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def _top_functions(stats, n: int) -> list[dict]:
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:n]
+    top = []
+    for (filename, line, func), (_cc, calls, own, cumulative, _callers) in rows:
+        top.append({
+            "function": f"{os.path.basename(filename)}:{line}({func})",
+            "calls": calls,
+            "own_ms": round(own * 1000, 2),
+            "cumulative_ms": round(cumulative * 1000, 2),
+        })
+    return top
+
+
+def _stats_text(stats) -> str:
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats("cumulative").print_stats(_STATS_LINES)
+    return stream.getvalue()
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    def _should_profile(self, scope) -> tuple[bool, bool]:
+        authorized = is_admin_token(_header(scope["headers"], b"x-profile"))
+        if authorized:
+            return True, True
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and random.random() < rate, False
+
+    async def __call__(self, scope, receive, send):
+        global _active
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile_it, authorized = self._should_profile(scope)
+        if not profile_it or _active:
+            await self.app(scope, receive, send)
+            return
+
+        # cProfile/pstats solo se cargan cuando realmente se perfila
+        import cProfile
+        import pstats
+
+        _active = True
+        profiler = cProfile.Profile()
+        profile_id = next(_ids)
+        record: dict | None = None
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+
+        def finish(status: int | None) -> dict:
+            global _active
+            profiler.disable()
+            _active = False
+            wall = time.perf_counter() - wall_start
+            cpu = time.thread_time() - cpu_start
+            stats = pstats.Stats(profiler)
+            entry = {
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status,
+                "started_at": time.time() - wall,
+                "wall_ms": round(wall * 1000, 2),
+                "cpu_ms": round(cpu * 1000, 2),
+                "await_ms": round(max(0.0, wall - cpu) * 1000, 2),
+                "top": _top_functions(stats, _TOP_IN_HEADER),
+                "stats": _stats_text(stats),
+            }
+            _profiles.append(entry)
+            return entry
+
+        async def send_with_profile(message):
+            nonlocal record
+            if message["type"] == "http.response.start" and record is None:
+                # El handler ya terminó: cerrar el perfil antes de enviar headers
+                record = finish(message["status"])
+                if authorized:
+                    timing = (
+                        f"app;dur={record['wall_ms']}, cpu;dur={record['cpu_ms']}, "
+                        f"await;dur={record['await_ms']}"
+                    )
+                    top = ", ".join(f"{t['function']};own={t['own_ms']}ms" for t in record["top"])
+                    message = {**message, "headers": [
+                        *message.get("headers", []),
+                        (b"x-profile-id", str(profile_id).encode()),
+                        (b"server-timing", timing.encode()),
+                        (b"x-profile-top", top.encode("latin-1", "replace")),
+                    ]}
+            await send(message)
+
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            if record is None:
+                finish(None)
@@ -0,0 +1,133 @@
+"""Per-client token-bucket rate limiting by route class.
+
+Each request is matched to the first RateLimitPolicy whose method and path
+regex match; its bucket key is ``<policy>:<client>``, where the client is the
+authenticated user (valid Bearer token) or else the client IP (behind a
+trusted proxy, the rightmost X-Forwarded-For entry: the one the proxy added,
+since the client controls everything to its left). Requests over
+the limit get a 429 with Retry-After before reaching the handler, so abusive
+traffic never costs an upstream call.
+"""
+from dataclasses import dataclass
+import json
+import logging
+import math
+import re
+
+from app.config import settings
+from app.core.auth_tokens import verify_token
+from app.core.metrics import REGISTRY
+from app.stores.rate_limit_store import get_rate_limit_store
+
+logger = logging.getLogger(__name__)
+
+RATE_LIMITED = REGISTRY.counter(
+    "http_rate_limited_total", "Requests rechazadas con 429 por límite de tasa.", ("route_class",)
+)
+
+
+def parse_limit(spec: str) -> tuple[float, float] | None:
+    """Parse "<per_minute>/<burst>" (burst defaults to per_minute); None/0 disables."""
+    if not spec or not spec.strip():
+        return None
+    per_minute, _, burst = spec.partition("/")
+    per_minute_f = float(per_minute)
+    if per_minute_f <= 0:
+        return None
+    return per_minute_f, float(burst) if burst.strip() else per_minute_f
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    name: str
+    path: str  # regex matched against the full request path
+    limit: str  # "<per_minute>/<burst>"
+    methods: tuple[str, ...] | None = None  # None = any method
+
+    def __post_init__(self):
+        object.__setattr__(self, "_regex", re.compile(self.path))
+        object.__setattr__(self, "_parsed", parse_limit(self.limit))
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.methods is None or method in self.methods) and self._regex.fullmatch(path) is not None
+
+    @property
+    def rate(self) -> float:
+        return self._parsed[0] / 60.0
+
+    @property
+    def burst(self) -> float:
+        return self._parsed[1]
+
+    @property
+    def enabled(self) -> bool:
+        return self._parsed is not None
+
+
+def _header(headers: list[tuple[bytes, bytes]], wanted: bytes, *, last: bool = False) -> str | None:
+    found = None
+    for name, value in headers:
+        if name == wanted:
+            found = value.decode("latin-1")
+            if not last:
+                break
+    return found
+
+
+def client_key(scope) -> str:
+    headers = scope["headers"]
+    auth = _header(headers, b"authorization")
+    if auth and auth[:7].lower() == "bearer ":
+        session = verify_token(auth[7:].strip())
+        if session is not None:
+            return f"user:{session.user_id}"
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        # La entrada de la derecha la agrega el proxy; las anteriores las elige el cliente
+        forwarded = _header(headers, b"x-forwarded-for", last=True)
+        proxied = forwarded.rsplit(",", 1)[-1].strip() if forwarded else ""
+        if proxied:
+            return "ip:" + proxied
+    client = scope.get("client")
+    return f"ip:{client[0]}" if client else "ip:-"
+
+
+class RateLimitMiddleware:
+    def __init__(self, app, policies: list[RateLimitPolicy]):
+        self.app = app
+        self.policies = [p for p in policies if p.enabled]
+
+    def _policy_for(self, method: str, path: str) -> RateLimitPolicy | None:
+        for policy in self.policies:
+            if policy.matches(method, path):
+                return policy
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        policy = self._policy_for(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        key = f"{policy.name}:{client_key(scope)}"
+        allowed, retry_after = get_rate_limit_store().take(key, policy.rate, policy.burst)
+        if allowed:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.inc(policy.name)
+        logger.info("Rate limit %s excedido por %s", policy.name, key.partition(":")[2])
+        body = json.dumps({"detail": "Demasiadas solicitudes, intente más tarde"}, ensure_ascii=False).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,43 @@
+"""Request IDs for log correlation.
+
+Reuses a well-formed incoming ``X-Request-ID`` (e.g. from a load balancer) or
+generates one, exposes it to logging through a context variable and echoes it
+in the response.
+"""
+import re
+import uuid
+
+from app.core.logging_setup import request_id_var
+
+_VALID_ID = re.compile(r"[A-Za-z0-9._-]{1,64}")
+
+
+def _incoming_id(headers: list[tuple[bytes, bytes]]) -> str | None:
+    for name, value in headers:
+        if name == b"x-request-id":
+            candidate = value.decode("latin-1")
+            return candidate if _VALID_ID.fullmatch(candidate) else None
+    return None
+
+
+class RequestIdMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_id = _incoming_id(scope["headers"]) or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-request-id", request_id.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
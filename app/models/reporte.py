@@ -38,3 +38,26 @@ class ReporteUpdate(BaseModel):
     veracidad_porcentaje: Optional[float] = None
     cantidad_upvotes: Optional[int] = None
     cantidad_downvotes: Optional[int] = None
+
+
+
+class ReporteParcialOut(BaseModel):
+    """Reporte con solo las columnas pedidas vía `fields=` (todas opcionales)."""
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    titulo: Optional[str] = None
+    descripcion: Optional[str] = None
+    categoria: Optional[str] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    direccion: Optional[str] = None
+    distrito: Optional[str] = None
+    estado: Optional[str] = None
+    veracidad_porcentaje: Optional[float] = None
+    cantidad_upvotes: Optional[int] = None
+    cantidad_downvotes: Optional[int] = None
+    created_at: Optional[str] = None
+
+
+# Columnas que los clientes pueden pedir con `fields=`
+REPORTE_FIELDS = frozenset(ReporteParcialOut.model_fields)
@@ -9,10 +9,22 @@ class UserCreate(BaseModel):
     psswd: str | None = None
 
 class UserOut(BaseModel):
+    # Sin psswd: las respuestas de escritura (return=representation) traen el hash
     id: int | None = None
     user: str
     email: str | None = None
-    psswd: str | None = None
+
+
+class UserParcialOut(BaseModel):
+    """Usuario con solo las columnas pedidas vía `fields=`."""
+    id: int | None = None
+    user: str | None = None
+    email: str | None = None
+
+
+# Columnas públicas de Usuarios: nunca incluir psswd en lecturas
+USER_PUBLIC_FIELDS = ("id", "user", "email")
+USER_PUBLIC_SELECT = ",".join(USER_PUBLIC_FIELDS)
 
 
 class UserUpdate(BaseModel):
@@ -30,8 +42,15 @@ class LoginRequest(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    expires_in: int | None = None
     user: UserOut | None = None
 
+
+class SessionOut(BaseModel):
+    user_id: int
+    username: str
+    expires_at: int
+
 class PasswordResetRequest(BaseModel):
     """Solicitud de reset de contraseña"""
     email: EmailStr
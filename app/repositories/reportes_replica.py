@@ -0,0 +1,233 @@
+"""Warm in-memory replica of the Reportes table (optional, REPLICA_ENABLED).
+
+Each worker keeps a columnar copy of the table (app/stores/replica_store.py):
+- bootstrap: the whole table is read in keyset-paginated pages;
+- delta sync: every REPLICA_SYNC_SECONDS the rows with
+  REPLICA_WATERMARK_COLUMN after the previous sync's start, minus
+  REPLICA_CLOCK_SKEW_SECONDS, are fetched. Re-reading that trailing window
+  catches rows committed late with an older timestamp (long transactions,
+  clock skew); upserts are idempotent;
+- deletes: read the same way from REPLICA_TOMBSTONES_TABLE (reporte_id,
+  deleted_at), and applied at once for deletes done by this worker. Without
+  a tombstones table other workers' deletes would stay invisible until the
+  next full reload, so the replica does not serve reads then;
+- a full re-bootstrap every REPLICA_RESYNC_SECONDS corrects anything the
+  delta loop cannot see (e.g. updates when the watermark is created_at).
+
+ReportesRepository serves reads from the replica only while the last
+successful sync is at most REPLICA_MAX_STALENESS_SECONDS old, otherwise it
+goes to Supabase as before.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+import asyncio
+import logging
+import time
+
+import httpx
+
+from app.clients.supabase_client import SupabaseClient, decode_json, table_url
+from app.config import settings
+from app.core import reporte_changes
+from app.core.metrics import REGISTRY
+from app.stores.replica_store import ReplicaStore
+
+logger = logging.getLogger(__name__)
+
+REPORTES_TABLE = "Reportes"
+
+REPLICA_ROWS = REGISTRY.gauge("reportes_replica_rows", "Filas en la réplica en memoria de Reportes.")
+REPLICA_STALENESS = REGISTRY.gauge(
+    "reportes_replica_staleness_seconds", "Antigüedad de la última sincronización exitosa de la réplica."
+)
+REPLICA_SYNCED = REGISTRY.counter(
+    "reportes_replica_synced_rows_total", "Filas aplicadas a la réplica por sincronización.", ("kind",)
+)
+REPLICA_READS = REGISTRY.counter(
+    "reportes_replica_reads_total", "Lecturas de Reportes según si las respondió la réplica.", ("result",)
+)
+
+Mark = Tuple[str, int]
+
+
+def _window_start(started_at: datetime) -> Mark:
+    return (started_at - timedelta(seconds=settings.REPLICA_CLOCK_SKEW_SECONDS)).isoformat(), 0
+
+
+def _keyset_filter(column: str, id_column: str, mark: Mark) -> str:
+    value, last_id = mark
+    return f'({column}.gt."{value}",and({column}.eq."{value}",{id_column}.gt.{last_id}))'
+
+
+class ReportesReplica:
+    def __init__(self, client: SupabaseClient | None = None):
+        self.client = client or SupabaseClient()
+        self.store = ReplicaStore(settings.REPLICA_MAX_SORTED_VIEWS)
+        self.ready = False
+        self._synced_at: float | None = None
+        self._bootstrapped_at: float | None = None
+        # Inicio (reloj de pared) de la última sincronización exitosa
+        self._since: datetime | None = None
+        # Cambios de este worker recibidos durante un bootstrap
+        self._pending: List[Tuple[str, List[Dict[str, Any]]]] | None = None
+
+    def is_fresh(self) -> bool:
+        return (
+            self.ready
+            and self._synced_at is not None
+            and time.monotonic() - self._synced_at <= settings.REPLICA_MAX_STALENESS_SECONDS
+        )
+
+    def _apply(self, store: ReplicaStore, kind: str, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if kind == reporte_changes.DELETE:
+                store.delete(row["id"])
+            else:
+                store.upsert(row)
+
+    def apply_changes(self, kind: str, rows: List[Dict[str, Any]]) -> None:
+        """Listener of reporte_changes: this worker's writes are visible at once."""
+        if self._pending is not None:
+            self._pending.append((kind, rows))
+        self._apply(self.store, kind, rows)
+
+    def _replay_pending(self, store: ReplicaStore) -> None:
+        pending, self._pending = self._pending, []
+        for kind, rows in pending:
+            self._apply(store, kind, rows)
+
+    async def _get(self, url: str, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        res = await self.client.get(url, params=params)
+        try:
+            res.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            logger.error("Replica sync failed: status=%s body=%s", exc.response.status_code, exc.response.text)
+            raise
+        return decode_json(res)
+
+    async def bootstrap(self) -> dict:
+        from app.repositories.reportes_repository import ReportesRepository
+
+        start = time.perf_counter()
+        # Desde aquí (menos el margen de reloj) el delta vuelve a leer lo que cambie durante la carga
+        since = datetime.now(timezone.utc)
+        store = ReplicaStore(settings.REPLICA_MAX_SORTED_VIEWS)
+        self._pending = []
+        try:
+            async for page in ReportesRepository(self.client).scan_reportes(
+                page_size=settings.REPORTES_SCAN_PAGE_SIZE, use_replica=False
+            ):
+                for row in page:
+                    store.upsert(row)
+                await asyncio.sleep(0)
+            self._replay_pending(store)
+            # Ponerse al día antes de reemplazar la copia que se está sirviendo
+            await self._sync(store, since)
+            self._replay_pending(store)
+        finally:
+            self._pending = None
+        self.store = store
+        self._bootstrapped_at = time.monotonic()
+        self.ready = True
+        elapsed = time.perf_counter() - start
+        logger.info("Réplica de Reportes cargada: %s filas en %.1f s", len(store), elapsed)
+        return {"filas": len(store), "segundos": round(elapsed, 2)}
+
+    async def _pull(self, url: str, column: str, id_column: str, select: str, mark: Mark) -> Tuple[List[Dict[str, Any]], Mark]:
+        """Every row after `mark` in (column, id_column) order; returns the rows and the new mark."""
+        rows: List[Dict[str, Any]] = []
+        page_size = settings.REPORTES_SCAN_PAGE_SIZE
+        while True:
+            page = await self._get(url, {
+                "select": select,
+                "or": _keyset_filter(column, id_column, mark),
+                "order": f"{column}.asc,{id_column}.asc",
+                "limit": page_size,
+            })
+            rows.extend(page)
+            if page:
+                mark = (page[-1][column], page[-1][id_column])
+            if len(page) < page_size:
+                return rows, mark
+
+    async def sync_once(self) -> int:
+        """Apply the changes since the last sync; returns how many rows changed."""
+        return await self._sync(self.store, self._since)
+
+    async def _sync(self, store: ReplicaStore, since: datetime) -> int:
+        started_at = datetime.now(timezone.utc)
+        mark = _window_start(since)
+        column = settings.REPLICA_WATERMARK_COLUMN
+        changed, _ = await self._pull(table_url(REPORTES_TABLE), column, "id", "*", mark)
+        for row in changed:
+            store.upsert(row)
+        REPLICA_SYNCED.inc("upsert", amount=len(changed))
+
+        deleted: List[Dict[str, Any]] = []
+        if settings.REPLICA_TOMBSTONES_TABLE:
+            deleted, _ = await self._pull(
+                table_url(settings.REPLICA_TOMBSTONES_TABLE),
+                "deleted_at",
+                "reporte_id",
+                "reporte_id,deleted_at",
+                mark,
+            )
+            for tombstone in deleted:
+                store.delete(tombstone["reporte_id"])
+            REPLICA_SYNCED.inc("delete", amount=len(deleted))
+
+        self._since = started_at
+        self._synced_at = time.monotonic()
+        REPLICA_ROWS.set(value=len(store))
+        REPLICA_STALENESS.set(value=0)
+        return len(changed) + len(deleted)
+
+    async def run(self) -> None:
+        """Background task: bootstrap, then delta sync every REPLICA_SYNC_SECONDS."""
+        while True:
+            try:
+                resync_due = (
+                    self._bootstrapped_at is None
+                    or time.monotonic() - self._bootstrapped_at >= settings.REPLICA_RESYNC_SECONDS
+                )
+                if not self.ready or resync_due:
+                    await self.bootstrap()
+                else:
+                    await self.sync_once()
+            except Exception:
+                logger.exception("Reportes replica sync failed")
+            if self._synced_at is not None:
+                REPLICA_STALENESS.set(value=time.monotonic() - self._synced_at)
+            await asyncio.sleep(settings.REPLICA_SYNC_SECONDS)
+
+    def status(self) -> dict:
+        return {
+            "habilitada": settings.REPLICA_ENABLED,
+            "lista": self.ready,
+            "fresca": self.is_fresh(),
+            "filas": len(self.store),
+            "sincronizado_desde": _window_start(self._since)[0] if self._since else None,
+            "ultima_sincronizacion_hace_s": (
+                round(time.monotonic() - self._synced_at, 1) if self._synced_at is not None else None
+            ),
+        }
+
+
+_replica: ReportesReplica | None = None
+
+
+def get_reportes_replica() -> ReportesReplica:
+    global _replica
+    if _replica is None:
+        _replica = ReportesReplica()
+    return _replica
+
+
+def fresh_replica() -> ReplicaStore | None:
+    """The replica's store if it may serve reads now, else None."""
+    if not settings.REPLICA_ENABLED or not settings.REPLICA_TOMBSTONES_TABLE or _replica is None:
+        return None
+    if not _replica.is_fresh():
+        REPLICA_READS.inc("stale")
+        return None
+    return _replica.store
@@ -1,10 +1,16 @@
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 from datetime import datetime, timedelta, timezone
+import asyncio
 import logging
+import time
 import httpx
 from fastapi import HTTPException
-from app.clients.supabase_client import SupabaseClient, table_url
+from app.clients.google_maps_client import GoogleMapsClient
+from app.clients.supabase_client import SupabaseClient, decode_json, rpc_url, table_url
 from app.config import settings
+from app.core import reporte_changes
+from app.repositories.reportes_replica import REPLICA_READS, fresh_replica
+from app.repositories.seguidores_repository import SeguidoresRepository
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +20,26 @@ MIN_VERACIDAD_PORCENTAJE = 33
 ESTADO_ACTIVO = "Activo"
 SIN_DISTRITO = "Sin distrito"
 SIN_CATEGORIA = "Sin categoría"
+FEED_RPC = "reportes_de_seguidos"
+# Tras un 404 de la RPC del feed se vuelve a probar pasado este tiempo (p. ej. tras
+# recargar el schema cache de PostgREST)
+FEED_RPC_RETRY_SECONDS = 300
+# IDs por filtro in.(...): acota el largo de la URL con muchos seguidos
+USER_IDS_PER_QUERY = 150
+
+# time.monotonic() hasta el que no se usa la RPC del feed (0 = probarla)
+_feed_rpc_unavailable_until = 0.0
+
+
+def ilike_exact(value: str) -> str:
+    """PostgREST filter: equal to `value` ignoring case ('%' and '_' escaped).
+
+    PostgREST turns every '*' into '%' even when escaped, so '*' is sent as
+    '_' (any single character) rather than widening to a prefix match;
+    callers drop rows whose folded value differs.
+    """
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
+    return f"ilike.{escaped}"
 
 
 class ReportesRepository:
@@ -57,66 +83,252 @@ class ReportesRepository:
         """Extract the first result from Supabase response."""
         return data[0] if isinstance(data, list) and data else data
 
+    def _from_replica(self, select: str = "*", **query) -> List[Dict[str, Any]] | None:
+        """Answer a read from the warm replica when it is fresh; None means ask Supabase."""
+        store = fresh_replica()
+        if store is None:
+            return None
+        rows = store.query(select, **query)
+        REPLICA_READS.inc("hit" if rows is not None else "unsupported")
+        return rows
+
     async def list_reportes(
         self,
         *,
         limit: int | None = None,
         offset: int | None = None,
-        order: str | None = None
+        order: str | None = None,
+        select: str = "*"
     ) -> List[Dict[str, Any]]:
-        """List all reportes with optional pagination and ordering."""
-        params = self._build_query_params(limit=limit, offset=offset, order=order)
+        """List all reportes with optional pagination, ordering and column selection."""
+        rows = self._from_replica(select, order=order, limit=limit, offset=offset)
+        if rows is not None:
+            return rows
+        params = self._build_query_params(select=select, limit=limit, offset=offset, order=order)
         res = await self.client.get(table_url(REPORTES_TABLE), params=params)
         res.raise_for_status()
-        return res.json()
+        return decode_json(res)
 
-    async def list_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+    async def scan_reportes(
+        self,
+        *,
+        select: str = "*",
+        created_from: str | None = None,
+        page_size: int = 1000,
+        where: Dict[str, Any] | None = None,
+        use_replica: bool = True,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield every reporte in pages of `page_size`, keyset-paginated on id.
+
+        `select` must include `id`. With `created_from` (ISO date or timestamp)
+        only reportes created at or after it are returned. `where` adds raw
+        PostgREST filters (e.g. {"categoria": "in.(Robo)"}). Without `where`
+        the pages come from the warm replica when it is fresh.
+        """
+        store = fresh_replica() if use_replica and not where else None
+        last_id: int | None = None
+        while store is not None:
+            rows = store.query(
+                select,
+                order="id.asc",
+                limit=page_size,
+                at_least={"created_at": created_from} if created_from else None,
+                beyond=(last_id,) if last_id is not None else None,
+            )
+            if rows is None:
+                break
+            REPLICA_READS.inc("hit")
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+            # Cede el event loop entre páginas: recorrer la réplica es todo CPU
+            await asyncio.sleep(0)
+        while True:
+            filters: Dict[str, Any] = dict(where or {})
+            if created_from:
+                filters["created_at"] = f"gte.{created_from}"
+            if last_id is not None:
+                filters["id"] = f"gt.{last_id}"
+            params = self._build_query_params(select=select, limit=page_size, order="id.asc", **filters)
+            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+            try:
+                res.raise_for_status()
+            except httpx.HTTPStatusError as exc:
+                self._handle_http_error(exc, "scan_reportes", last_id=last_id)
+            rows = decode_json(res)
+            if rows:
+                yield rows
+            if len(rows) < page_size:
+                return
+            last_id = rows[-1]["id"]
+
+    async def list_by_user(self, user_id: int, select: str = "*") -> List[Dict[str, Any]]:
         """List all reportes for a specific user."""
-        params = self._build_query_params(user_id=f"eq.{user_id}")
+        rows = self._from_replica(select, equals={"user_id": {user_id}})
+        if rows is not None:
+            return rows
+        params = self._build_query_params(select=select, user_id=f"eq.{user_id}")
         res = await self.client.get(table_url(REPORTES_TABLE), params=params)
         res.raise_for_status()
-        return res.json()
-
-    async def list_reportes_from_followed_users(self, user_id: int) -> List[Dict[str, Any]]:
-        """List reportes from users that user_id follows."""
-        # Primero obtenemos la lista de usuarios seguidos
-        seguidores_params = {"select": "seguido_id", "seguidor_id": f"eq.{user_id}"}
-        seguidores_res = await self.client.get(table_url('Seguidores'), params=seguidores_params)
-        seguidores_res.raise_for_status()
-        seguidos_data = seguidores_res.json()
-        
-        if not seguidos_data:
-            return []
-        
-        # Extraer los IDs de los usuarios seguidos
-        seguido_ids = [item['seguido_id'] for item in seguidos_data if 'seguido_id' in item]
-        
-        if not seguido_ids:
+        return decode_json(res)
+
+    async def list_reportes_from_followed_users(
+        self,
+        user_id: int,
+        *,
+        limit: int = 20,
+        before: tuple[str, int] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """List reportes from users that user_id follows, newest first.
+
+        Keyset-paginated on (created_at, id): pass the last row of the previous
+        page as `before`. A page is one `reportes_de_seguidos` RPC call (join
+        done in Postgres) or, when that function is not deployed, bounded
+        `in.(...)` queries over the cached followed-ID set (see list_by_users).
+        """
+        # Con la réplica fresca el filtro in.(...) se resuelve en memoria
+        if time.monotonic() >= _feed_rpc_unavailable_until and fresh_replica() is None:
+            rows = await self._followed_feed_via_rpc(user_id, limit, before)
+            if rows is not None:
+                return rows
+
+        seguido_ids = await SeguidoresRepository(self.client).list_seguido_ids(user_id)
+        return await self.list_by_users(seguido_ids, limit=limit, before=before)
+
+    async def list_by_users(
+        self,
+        user_ids: List[int],
+        *,
+        limit: int = 20,
+        before: tuple[str, int] | None = None,
+    ) -> List[Dict[str, Any]]:
+        """List the newest reportes of several users, keyset-paginated on (created_at, id).
+
+        The IDs go in chunks of USER_IDS_PER_QUERY (one query each, run
+        concurrently) so the URL stays short; the pages are merged here.
+        """
+        if not user_ids:
             return []
-        
-        # Obtener reportes de esos usuarios
-        # Usar el operador 'in' de PostgREST
-        seguido_ids_str = f"({','.join(map(str, seguido_ids))})"
+
+        rows = self._from_replica(
+            order="created_at.desc,id.desc", limit=limit, equals={"user_id": set(user_ids)}, beyond=before
+        )
+        if rows is not None:
+            return rows
+        chunks = [user_ids[i:i + USER_IDS_PER_QUERY] for i in range(0, len(user_ids), USER_IDS_PER_QUERY)]
+        if len(chunks) == 1:
+            return await self._list_by_user_chunk(chunks[0], limit, before)
+        pages = await asyncio.gather(*(self._list_by_user_chunk(chunk, limit, before) for chunk in chunks))
+        merged = [row for page in pages for row in page]
+        merged.sort(key=lambda r: (r.get("created_at") or "", r.get("id") or 0), reverse=True)
+        return merged[:limit]
+
+    async def _list_by_user_chunk(
+        self, user_ids: List[int], limit: int, before: tuple[str, int] | None
+    ) -> List[Dict[str, Any]]:
         params = self._build_query_params(
-            user_id=f"in.{seguido_ids_str}",
-            order="created_at.desc"
+            limit=limit,
+            order="created_at.desc,id.desc",
+            user_id=f"in.({','.join(map(str, user_ids))})",
         )
+        if before is not None:
+            created_at, last_id = before
+            params["or"] = (
+                f'(created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{last_id}))'
+            )
         res = await self.client.get(table_url(REPORTES_TABLE), params=params)
-        res.raise_for_status()
-        return res.json()
+        try:
+            res.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            self._handle_http_error(exc, "list_by_users", user_ids=len(user_ids))
+        return decode_json(res)
+
+    async def _followed_feed_via_rpc(
+        self, user_id: int, limit: int, before: tuple[str, int] | None
+    ) -> List[Dict[str, Any]] | None:
+        """Call the feed RPC; returns None (and skips it for a while) if it is not deployed."""
+        global _feed_rpc_unavailable_until
+        payload = {
+            "p_user_id": user_id,
+            "p_limit": limit,
+            "p_before_created_at": before[0] if before else None,
+            "p_before_id": before[1] if before else None,
+        }
+        res = await self.client.post(rpc_url(FEED_RPC), json=payload)
+        if res.status_code == 404:
+            logger.info("RPC %s not available, using followed-ID fallback", FEED_RPC)
+            _feed_rpc_unavailable_until = time.monotonic() + FEED_RPC_RETRY_SECONDS
+            return None
+        try:
+            res.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            self._handle_http_error(exc, "followed_feed_rpc", user_id=user_id)
+        return decode_json(res)
 
-    async def get_by_id(self, reporte_id: int) -> Dict[str, Any] | None:
+    async def get_by_id(self, reporte_id: int, select: str = "*") -> Dict[str, Any] | None:
         """Get a single reporte by ID."""
-        params = self._build_query_params(id=f"eq.{reporte_id}", limit=1)
+        rows = self._from_replica(select, equals={"id": {reporte_id}}, limit=1)
+        if rows is not None:
+            return rows[0] if rows else None
+        params = self._build_query_params(select=select, id=f"eq.{reporte_id}", limit=1)
         res = await self.client.get(table_url(REPORTES_TABLE), params=params)
         try:
             res.raise_for_status()
         except httpx.HTTPStatusError as exc:
             self._handle_http_error(exc, "get_by_id", params=params)
 
-        data = res.json()
+        data = decode_json(res)
         return data[0] if isinstance(data, list) and data else None
 
+    async def get_by_ids(self, ids: List[int]) -> List[Dict[str, Any]]:
+        """Get several reportes in one request, returned in the order of `ids`.
+
+        IDs that no longer exist are skipped.
+        """
+        if not ids:
+            return []
+        rows = self._from_replica(equals={"id": set(ids)})
+        if rows is not None:
+            by_id = {row["id"]: row for row in rows}
+            return [by_id[i] for i in ids if i in by_id]
+        params = self._build_query_params(id=f"in.({','.join(map(str, ids))})")
+        res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+        try:
+            res.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            self._handle_http_error(exc, "get_by_ids", ids=len(ids))
+        by_id = {row.get("id"): row for row in decode_json(res)}
+        return [by_id[i] for i in ids if i in by_id]
+
+    async def search_fts(
+        self,
+        column: str,
+        query: str,
+        *,
+        distrito: str | None = None,
+        categoria: str | None = None,
+        limit: int = 20,
+    ) -> List[Dict[str, Any]]:
+        """Full-text search pushed down to Postgres (websearch syntax) on a tsvector column.
+
+        PostgREST cannot order by ts_rank, so the newest matches come first.
+        """
+        filters: Dict[str, Any] = {column: f"wfts(spanish).{query}"}
+        if distrito:
+            filters["distrito"] = ilike_exact(distrito)
+        if categoria:
+            filters["categoria"] = ilike_exact(categoria)
+        params = self._build_query_params(limit=limit, order="created_at.desc,id.desc", **filters)
+        res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+        try:
+            res.raise_for_status()
+        except httpx.HTTPStatusError as exc:
+            self._handle_http_error(exc, "search_fts", query=query)
+        return decode_json(res)
+
     async def create_reporte(self, payload: dict) -> Dict[str, Any]:
         """Create a new reporte."""
         res = await self.client.post(table_url(REPORTES_TABLE), json=payload)
@@ -125,7 +337,9 @@ class ReportesRepository:
         except httpx.HTTPStatusError as exc:
             self._handle_http_error(exc, "create_reporte", payload=payload)
 
-        return self._extract_first_result(res.json())
+        data = decode_json(res)
+        reporte_changes.publish(reporte_changes.UPSERT, data)
+        return self._extract_first_result(data)
 
     async def update_reporte(self, reporte_id: int, payload: dict) -> Dict[str, Any]:
         """Update an existing reporte."""
@@ -136,7 +350,9 @@ class ReportesRepository:
         except httpx.HTTPStatusError as exc:
             self._handle_http_error(exc, "update_reporte", reporte_id=reporte_id, payload=payload)
 
-        return self._extract_first_result(res.json())
+        data = decode_json(res)
+        reporte_changes.publish(reporte_changes.UPSERT, data)
+        return self._extract_first_result(data)
 
     async def delete_reporte(self, reporte_id: int) -> int:
         """Delete a reporte by ID."""
@@ -148,10 +364,11 @@ class ReportesRepository:
             self._handle_http_error(exc, "delete_reporte", reporte_id=reporte_id)
 
         try:
-            data = res.json()
-            return len(data) if isinstance(data, list) else 0
+            data = decode_json(res)
         except Exception:
             return 0
+        reporte_changes.publish(reporte_changes.DELETE, data)
+        return len(data) if isinstance(data, list) else 0
 
     def _is_valid_reporte(self, reporte: Dict[str, Any]) -> bool:
         """Check if a reporte is valid (active and meets minimum veracidad)."""
@@ -168,10 +385,12 @@ class ReportesRepository:
         Get statistics grouped by district.
         Returns: {distrito: {total: int, por_categoria: {categoria: count}}}
         """
-        params = self._build_query_params(select="distrito,categoria,estado,veracidad_porcentaje")
-        res = await self.client.get(table_url(REPORTES_TABLE), params=params)
-        res.raise_for_status()
-        reportes = res.json()
+        reportes = self._from_replica("distrito,categoria,estado,veracidad_porcentaje")
+        if reportes is None:
+            params = self._build_query_params(select="distrito,categoria,estado,veracidad_porcentaje")
+            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+            res.raise_for_status()
+            reportes = decode_json(res)
 
         stats = {}
         for reporte in reportes:
@@ -211,10 +430,30 @@ class ReportesRepository:
         except (ValueError, AttributeError):
             return None
 
+    async def _fetch_ranking_rows(self, start: datetime, end: datetime, explicit: bool) -> List[Dict[str, Any]]:
+        params = self._build_query_params(
+            select="distrito,estado,veracidad_porcentaje,created_at,categoria"
+        )
+        if explicit:
+            params["and"] = f"(created_at.gte.{start.isoformat()},created_at.lt.{end.isoformat()})"
+        try:
+            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+            res.raise_for_status()
+            return decode_json(res)
+        except httpx.HTTPStatusError as e:
+            logger.error(f"Error in Supabase: {e.response.status_code} - {e.response.text}")
+            # Fallback: fetch all columns
+            params = self._build_query_params()
+            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
+            res.raise_for_status()
+            return decode_json(res)
+
     async def get_district_ranking(
         self,
         period: str = "week",
-        categorias: Optional[List[str]] = None
+        categorias: Optional[List[str]] = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
     ) -> list[dict]:
         """
         Get district ranking (safer districts have fewer valid reports).
@@ -222,30 +461,23 @@ class ReportesRepository:
         Args:
             period: "week" | "month" | "year"
             categorias: Optional list of categories to filter
+            start, end: Optional explicit range [start, end) overriding period;
+                the date filter is then pushed down to PostgREST
 
         Returns:
             List ordered by total_delitos (ascending):
             [{distrito, total_delitos, resoluciones_autoridades, porcentaje_resoluciones, 
               periodo, desde, hasta, por_categoria}]
         """
-        start = self._calculate_period_start(period)
-        now = datetime.now(timezone.utc)
-
-        # Fetch all reportes with necessary fields
-        params = self._build_query_params(
-            select="distrito,estado,veracidad_porcentaje,created_at,categoria"
-        )
-        try:
-            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
-            res.raise_for_status()
-            rows = res.json()
-        except httpx.HTTPStatusError as e:
-            logger.error(f"Error in Supabase: {e.response.status_code} - {e.response.text}")
-            # Fallback: fetch all columns
-            params = self._build_query_params()
-            res = await self.client.get(table_url(REPORTES_TABLE), params=params)
-            res.raise_for_status()
-            rows = res.json()
+        explicit = start is not None
+        if start is None:
+            start = self._calculate_period_start(period)
+        now = end or datetime.now(timezone.utc)
+
+        # Fetch all reportes with necessary fields (the date filter is applied below)
+        rows = self._from_replica("distrito,estado,veracidad_porcentaje,created_at,categoria")
+        if rows is None:
+            rows = await self._fetch_ranking_rows(start, now, explicit)
         
         start_iso = start.strftime("%Y-%m-%dT%H:%M:%S")
         end_iso = now.strftime("%Y-%m-%dT%H:%M:%S")
@@ -255,7 +487,7 @@ class ReportesRepository:
         for reporte in rows:
             # Filter by creation date
             created_at = self._parse_created_at(reporte.get("created_at"))
-            if created_at and created_at < start:
+            if created_at and (created_at < start or (explicit and created_at >= now)):
                 continue
             
             distrito = self._normalize_distrito(reporte.get("distrito"))
@@ -342,7 +574,6 @@ class ReportesRepository:
             logger.error("GOOGLE_MAPS_API_KEY is not configured")
             return None
         
-        url = "https://maps.googleapis.com/maps/api/geocode/json"
         params = {
             "latlng": f"{lat},{lon}",
             "key": settings.GOOGLE_MAPS_API_KEY,
@@ -350,44 +581,43 @@ class ReportesRepository:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                if data.get("status") != "OK":
-                    logger.error(
-                        f"Google Maps API error: {data.get('status')} - {data.get('error_message', '')}"
-                    )
-                    return None
-                
-                results = data.get("results", [])
-                if not results:
-                    logger.warning(f"No results found for lat={lat}, lon={lon}")
-                    return None
-                
-                logger.info(f"Processing {len(results)} Google Maps results for lat={lat}, lon={lon}")
-                
-                # Search for district in all results
-                for result in results:
-                    address_components = result.get("address_components", [])
-                    formatted_address = result.get("formatted_address", "")
-                    logger.debug(f"Formatted address: {formatted_address}")
-                    
-                    distrito = self._find_district_in_components(address_components)
-                    if distrito:
-                        return distrito
-                
-                # Log available components if nothing found
-                if results:
-                    logger.warning("No district found. Available components:")
-                    for component in results[0].get("address_components", []):
-                        logger.warning(
-                            f"  - {component.get('long_name')} ({', '.join(component.get('types', []))})"
-                        )
-                
+            response = await GoogleMapsClient().get("geocode", params)
+            response.raise_for_status()
+            data = response.json()
+            
+            if data.get("status") != "OK":
+                logger.error(
+                    f"Google Maps API error: {data.get('status')} - {data.get('error_message', '')}"
+                )
                 return None
+            
+            results = data.get("results", [])
+            if not results:
+                logger.warning(f"No results found for lat={lat}, lon={lon}")
+                return None
+            
+            logger.info(f"Processing {len(results)} Google Maps results for lat={lat}, lon={lon}")
+            
+            # Search for district in all results
+            for result in results:
+                address_components = result.get("address_components", [])
+                formatted_address = result.get("formatted_address", "")
+                logger.debug(f"Formatted address: {formatted_address}")
                 
+                distrito = self._find_district_in_components(address_components)
+                if distrito:
+                    return distrito
+            
+            # Log available components if nothing found
+            if results:
+                logger.warning("No district found. Available components:")
+                for component in results[0].get("address_components", []):
+                    logger.warning(
+                        f"  - {component.get('long_name')} ({', '.join(component.get('types', []))})"
+                    )
+            
+            return None
+            
         except httpx.HTTPError as e:
             logger.error(f"HTTP error querying Google Maps API: {e}")
             return None
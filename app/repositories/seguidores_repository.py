@@ -3,9 +3,24 @@ import logging
 import httpx
 from fastapi import HTTPException
 from app.clients.supabase_client import SupabaseClient, table_url
+from app.core.cache import TTLCache
 
 logger = logging.getLogger(__name__)
 
+# Caché corto (por proceso) de los IDs que sigue cada usuario. SeguidoresService
+# lo invalida al seguir/dejar de seguir; el TTL acota la desactualización en
+# otros workers.
+SEGUIDOS_CACHE_TTL_SECONDS = 30.0
+_seguidos_cache = TTLCache(maxsize=10_000, ttl=SEGUIDOS_CACHE_TTL_SECONDS)
+
+
+def invalidate_seguidos_cache(user_id: int | None = None) -> None:
+    """Drop the cached followed-ID set for user_id (or for everyone if None)."""
+    if user_id is None:
+        _seguidos_cache.clear()
+    else:
+        _seguidos_cache.pop(user_id)
+
 
 class SeguidoresRepository:
     def __init__(self, client: SupabaseClient | None = None):
@@ -33,6 +48,18 @@ class SeguidoresRepository:
         res.raise_for_status()
         return res.json()
 
+    async def list_seguido_ids(self, user_id: int) -> List[int]:
+        """IDs de los usuarios que user_id sigue (cacheado unos segundos)"""
+        cached = _seguidos_cache.get(user_id)
+        if cached is not None:
+            return list(cached)
+        params = {"select": "seguido_id", "seguidor_id": f"eq.{user_id}"}
+        res = await self.client.get(self._url(), params=params)
+        res.raise_for_status()
+        ids = tuple(row["seguido_id"] for row in res.json() if row.get("seguido_id") is not None)
+        _seguidos_cache.set(user_id, ids)
+        return list(ids)
+
     async def get_by_id(self, seguidor_id: int) -> Dict[str, Any] | None:
         params = {"select": "*", "id": f"eq.{seguidor_id}", "limit": 1}
         res = await self.client.get(self._url(), params=params)
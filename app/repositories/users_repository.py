@@ -3,30 +3,98 @@ import logging
 import httpx
 from fastapi import HTTPException
 from app.clients.supabase_client import SupabaseClient, table_url
+from app.config import settings
+from app.core.cache import MISSING, TTLCache
+from app.models.user import USER_PUBLIC_SELECT
 
 logger = logging.getLogger(__name__)
 
+# Caché username (casefold) -> id, con entradas negativas de vida corta para
+# que reintentos/fuerza bruta sobre usuarios inexistentes no lleguen a Supabase.
+USERNAME_CACHE_TTL_SECONDS = 300.0
+USERNAME_NEGATIVE_TTL_SECONDS = 5.0
+_NOT_FOUND = object()
+_username_ids = TTLCache(maxsize=50_000, ttl=USERNAME_CACHE_TTL_SECONDS)
+
+
+def invalidate_username_cache(username: str | None = None) -> None:
+    """Drop one username (or the whole cache if None)."""
+    if username is None:
+        _username_ids.clear()
+    else:
+        _username_ids.pop(username.casefold())
+
+
+def _escape_like(value: str) -> str:
+    # Sin escapar, '%' y '_' en el username actúan como comodines de ilike. PostgREST
+    # convierte todo '*' en '%' (aun escapado), así que se busca como '_' (un carácter)
+    # y la coincidencia exacta se filtra después de la consulta
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_").replace("*", "_")
+
 
 class UsersRepository:
     def __init__(self, client: SupabaseClient | None = None):
         self.client = client or SupabaseClient()
 
-    async def list_users(self) -> List[Dict[str, Any]]:
-        # SELECT * FROM Usuarios
-        res = await self.client.get(table_url(), params={"select": "*"})
+    async def list_users(self, select: str = USER_PUBLIC_SELECT) -> List[Dict[str, Any]]:
+        # SELECT id,user,email FROM Usuarios (sin psswd salvo que se pida)
+        res = await self.client.get(table_url(), params={"select": select})
         res.raise_for_status()
         return res.json()
 
     async def get_by_username_ci(self, username: str) -> List[Dict[str, Any]]:
-        # Búsqueda case-insensitive exacta con ilike (sin comodines = exacta)
-        params = {"select": "*", "user": f"ilike.{username}", "limit": 1}
+        # Búsqueda case-insensitive exacta; devuelve la fila completa (incluye psswd)
+        key = username.casefold()
+        cached = _username_ids.get(key, MISSING)
+        if cached is _NOT_FOUND:
+            return []
+        if cached is not MISSING:
+            row = await self.get_by_id(cached, select="*")
+            if row and str(row.get("user", "")).casefold() == key:
+                return [row]
+            _username_ids.pop(key)
+
+        rows = await self._query_username(username)
+        self._remember_username(key, rows)
+        return rows
+
+    async def username_exists(self, username: str) -> bool:
+        """Duplicate check served from the username cache when possible."""
+        key = username.casefold()
+        cached = _username_ids.get(key, MISSING)
+        if cached is not MISSING:
+            return cached is not _NOT_FOUND
+        rows = await self._query_username(username, select="id,user")
+        self._remember_username(key, rows)
+        return bool(rows)
+
+    async def _query_username(self, username: str, select: str = "*") -> List[Dict[str, Any]]:
+        column = settings.USERS_USERNAME_NORMALIZED_COLUMN
+        if column:
+            # Igualdad exacta sobre columna normalizada (indexable con btree)
+            params = {"select": select, column: f"eq.{username.casefold()}", "limit": 1}
+        else:
+            # ilike sin comodines = exacta, pero no puede usar un índice btree simple
+            params = {"select": select, "user": f"ilike.{_escape_like(username)}"}
+            if "*" not in username:
+                params["limit"] = 1
         res = await self.client.get(table_url(), params=params)
         res.raise_for_status()
-        return res.json()
+        rows = res.json()
+        if not column:
+            key = username.casefold()
+            rows = [row for row in rows if str(row.get("user", "")).casefold() == key][:1]
+        return rows
 
-    async def get_by_id(self, user_id: int) -> Dict[str, Any] | None:
-        # Obtener un usuario por su id (limit 1)
-        params = {"select": "*", "id": f"eq.{user_id}", "limit": 1}
+    def _remember_username(self, key: str, rows: List[Dict[str, Any]]) -> None:
+        if rows and rows[0].get("id") is not None:
+            _username_ids.set(key, rows[0]["id"])
+        else:
+            _username_ids.set(key, _NOT_FOUND, ttl=USERNAME_NEGATIVE_TTL_SECONDS)
+
+    async def get_by_id(self, user_id: int, select: str = USER_PUBLIC_SELECT) -> Dict[str, Any] | None:
+        # Obtener un usuario por su id (limit 1); por defecto sin psswd
+        params = {"select": select, "id": f"eq.{user_id}", "limit": 1}
         res = await self.client.get(table_url(), params=params)
         try:
             res.raise_for_status()
@@ -43,7 +111,14 @@ class UsersRepository:
         data = res.json()
         return data[0] if isinstance(data, list) and data else None
 
+    def _with_normalized_username(self, payload: dict) -> dict:
+        column = settings.USERS_USERNAME_NORMALIZED_COLUMN
+        if column and payload.get("user"):
+            return {**payload, column: str(payload["user"]).casefold()}
+        return payload
+
     async def create_user(self, payload: dict) -> Dict[str, Any]:
+        payload = self._with_normalized_username(payload)
         res = await self.client.post(table_url(), json=payload)
         try:
             res.raise_for_status()
@@ -66,12 +141,19 @@ class UsersRepository:
 
         data = res.json()
         # Supabase devuelve lista cuando Prefer=return=representation
-        return data[0] if isinstance(data, list) and data else data
+        created = data[0] if isinstance(data, list) and data else data
+        if isinstance(created, dict) and created.get("id") is not None and created.get("user"):
+            _username_ids.set(str(created["user"]).casefold(), created["id"])
+        return created
 
     async def update_user(self, user_id: int, payload: dict) -> Dict[str, Any]:
         # PostgREST update by filter using id
         params = {"id": f"eq.{user_id}", "select": "*"}
+        payload = self._with_normalized_username(payload)
         res = await self.client.patch(table_url(), params=params, json=payload)
+        if "user" in payload:
+            # No conocemos el nombre anterior sin otra consulta: invalidar todo
+            invalidate_username_cache()
         try:
             res.raise_for_status()
         except httpx.HTTPStatusError as exc:
@@ -91,6 +173,7 @@ class UsersRepository:
         # Delete returns number of deleted rows when Prefer header not set; with Prefer=return=representation it returns list
         params = {"id": f"eq.{user_id}"}
         res = await self.client.delete(table_url(), params=params)
+        invalidate_username_cache()
         try:
             res.raise_for_status()
         except httpx.HTTPStatusError as exc:
@@ -116,7 +199,7 @@ class UsersRepository:
         Obtiene un usuario por su email.
         Retorna None si no existe.
         """
-        params = {"select": "*", "email": f"eq.{email}", "limit": 1}
+        params = {"select": USER_PUBLIC_SELECT, "email": f"eq.{email}", "limit": 1}
         res = await self.client.get(table_url(), params=params)
         
         try:
@@ -139,12 +222,12 @@ class UsersRepository:
         data = res.json()
         return data[0] if isinstance(data, list) and data else None
 
-    async def get_by_ids(self, ids: list[int]) -> List[Dict[str, Any]]:
+    async def get_by_ids(self, ids: list[int], select: str = USER_PUBLIC_SELECT) -> List[Dict[str, Any]]:
         if not ids:
             return []
         # PostgREST in filter: id=in.(1,2,3)
         values = ",".join(str(i) for i in ids)
-        params = {"select": "*", "id": f"in.({values})"}
+        params = {"select": select, "id": f"in.({values})"}
         res = await self.client.get(table_url(), params=params)
         res.raise_for_status()
         return res.json()
@@ -0,0 +1,70 @@
+"""Clustering de marcadores por zoom para la vista de mapa.
+
+Cada worker mantiene la jerarquía de clusters en memoria
+(app/stores/cluster_store.py), reconstruida cada CLUSTER_REFRESH_SECONDS y
+actualizada con las escrituras del propio worker (ver ReporteIndexService).
+Mientras no está lista se agrupan solo los reportes del bbox.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict
+import logging
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.services.reporte_index_service import ReporteIndexService, bbox_filter, coords_of, parse_bbox
+from app.stores.cluster_store import ClusterIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ClusterService(ReporteIndexService):
+    select = "id,lat,lon"
+    label = "Índice de clusters"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.CLUSTER_REFRESH_SECONDS
+
+    def new_index(self) -> ClusterIndex:
+        return ClusterIndex(settings.CLUSTER_MIN_ZOOM, settings.CLUSTER_MAX_ZOOM, settings.CLUSTER_RADIUS)
+
+    def add_row(self, index: ClusterIndex, row: Dict[str, Any]) -> None:
+        coords = coords_of(row)
+        if coords is None:
+            index.remove(int(row["id"]))
+        else:
+            index.add(int(row["id"]), coords[0], coords[1])
+
+    def remove_row(self, index: ClusterIndex, reporte_id: int) -> None:
+        index.remove(reporte_id)
+
+    async def clusters(self, bbox: str, zoom: float) -> dict:
+        """Clusters y reportes sueltos del bbox en arreglos paralelos (ids es null en los clusters)."""
+        box = parse_bbox(bbox)
+        index = self.index if self.ready else await self.load(self.new_index(), where=bbox_filter(box))
+        used_zoom, ids, lats, lons, counts = index.query(box, int(zoom))
+        if len(ids) > settings.CLUSTER_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Demasiados marcadores: reduzca el área o cambie el zoom",
+            )
+        return {
+            "zoom": used_zoom,
+            "total": sum(counts),
+            "ids": ids,
+            "lats": [round(v, 6) for v in lats],
+            "lons": [round(v, 6) for v in lons],
+            "counts": counts,
+        }
+
+
+_cluster_service: ClusterService | None = None
+
+
+def get_cluster_service() -> ClusterService:
+    global _cluster_service
+    if _cluster_service is None:
+        _cluster_service = ClusterService()
+    return _cluster_service
@@ -0,0 +1,130 @@
+"""Grilla de densidad (geohash) para los mapas de calor del dashboard.
+
+Cada worker mantiene en memoria conteos por celda para las precisiones de
+DENSITY_PRECISIONS (app/stores/density_store.py), reconstruidos cada
+DENSITY_REFRESH_SECONDS y actualizados con las escrituras del propio worker
+(ver ReporteIndexService).
+
+Mientras la grilla no está lista se calcula la respuesta leyendo solo los
+reportes del bbox, como hacía antes el cliente.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+import logging
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.repositories.reportes_repository import ESTADO_ACTIVO, MIN_VERACIDAD_PORCENTAJE, SIN_CATEGORIA
+from app.services.reporte_index_service import ReporteIndexService, bbox_filter, coords_of, parse_bbox
+from app.services.rollups_service import day_of
+from app.stores.density_store import DensityGrid
+
+logger = logging.getLogger(__name__)
+
+DENSITY_SELECT = "id,lat,lon,categoria,estado,veracidad_porcentaje,created_at"
+
+
+def configured_precisions() -> List[int]:
+    return sorted({int(p) for p in settings.DENSITY_PRECISIONS.split(",") if p.strip()})
+
+
+def add_to_grid(grid: DensityGrid, row: Dict[str, Any]) -> None:
+    """Cuenta el reporte en la grilla (o lo saca si ya no tiene coordenadas válidas)."""
+    reporte_id = int(row["id"])
+    coords = coords_of(row)
+    if coords is None:
+        grid.remove(reporte_id)
+        return
+    day = day_of(row.get("created_at"))
+    valido = row.get("estado") == ESTADO_ACTIVO and (row.get("veracidad_porcentaje") or 0) >= MIN_VERACIDAD_PORCENTAJE
+    grid.add(
+        reporte_id,
+        coords[0],
+        coords[1],
+        date.fromisoformat(day).toordinal() if day else 0,
+        row.get("categoria") or SIN_CATEGORIA,
+        valido,
+    )
+
+
+class DensityService(ReporteIndexService):
+    select = DENSITY_SELECT
+    label = "Grilla de densidad"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.DENSITY_REFRESH_SECONDS
+
+    def new_index(self) -> DensityGrid:
+        return DensityGrid(configured_precisions())
+
+    def add_row(self, index: DensityGrid, row: Dict[str, Any]) -> None:
+        add_to_grid(index, row)
+
+    def remove_row(self, index: DensityGrid, reporte_id: int) -> None:
+        index.remove(reporte_id)
+
+    async def _grid_from_bbox(
+        self, precision: int, bbox: Tuple[float, float, float, float], desde: date | None, categorias: Optional[List[str]]
+    ) -> DensityGrid:
+        """Grilla temporal con solo los reportes del bbox (mientras la principal se construye)."""
+        where = bbox_filter(bbox)
+        if categorias:
+            quoted = ",".join('"' + c.replace('"', '') + '"' for c in categorias)
+            where["categoria"] = f"in.({quoted})"
+        return await self.load(
+            DensityGrid([precision]), created_from=desde.isoformat() if desde else None, where=where
+        )
+
+    async def densidad(
+        self,
+        bbox: str,
+        precision: int,
+        desde: date | None = None,
+        categorias: Optional[List[str]] = None,
+        solo_validos: bool = False,
+    ) -> dict:
+        """Conteo de reportes por celda geohash dentro del bbox, como arreglos paralelos."""
+        box = parse_bbox(bbox)
+        if precision not in self.index.precisions:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"precision debe ser una de {list(self.index.precisions)}",
+            )
+        grid = self.index if self.ready else await self._grid_from_bbox(precision, box, desde, categorias)
+        celdas, conteos = grid.query(
+            precision,
+            box,
+            min_day=desde.toordinal() if desde else 0,
+            categorias=set(categorias) if categorias else None,
+            solo_validos=solo_validos,
+        )
+        if len(celdas) > settings.DENSITY_MAX_CELLS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Demasiadas celdas: reduzca el área o la precisión",
+            )
+        return {
+            "precision": precision,
+            "bbox": list(box),
+            "desde": desde.isoformat() if desde else None,
+            "total": sum(conteos),
+            "celdas": celdas,
+            "conteos": conteos,
+        }
+
+    def status(self) -> dict:
+        return {**super().status(), "celdas": {p: self.index.cell_count(p) for p in self.index.precisions}}
+
+
+_density_service: DensityService | None = None
+
+
+def get_density_service() -> DensityService:
+    global _density_service
+    if _density_service is None:
+        _density_service = DensityService()
+    return _density_service
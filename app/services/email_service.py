@@ -1,10 +1,24 @@
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content
-from dotenv import load_dotenv
+import logging
+from app.clients.sendgrid_client import send_mail
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+FROM_EMAIL = "20213320@aloe.ulima.edu.pe"  # DEBES VERIFICAR ESTE EMAIL EN SENDGRID
+FROM_NAME = "Safe_2_Gether!"
+
+
+def _build_message(to_email: str, subject: str, html_content: str):
+    # sendgrid se importa al primer envío, no al arrancar la app
+    from sendgrid.helpers.mail import Content, Email, Mail, To
+
+    return Mail(
+        from_email=Email(FROM_EMAIL, FROM_NAME),
+        to_emails=To(to_email),
+        subject=subject,
+        html_content=Content("text/html", html_content),
+    )
 
-# Cargar variables de entorno
-load_dotenv()
 
 async def send_new_report_notification(
     to_email: str,
@@ -60,31 +74,25 @@ async def send_new_report_notification(
     """
     
     try:
-        sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
+        sendgrid_api_key = settings.SENDGRID_API_KEY
         
         if not sendgrid_api_key:
-            print("❌ SENDGRID_API_KEY NO ENCONTRADA para notificación de reporte")
+            logger.error("SENDGRID_API_KEY NO ENCONTRADA para notificación de reporte")
             return False
         
-        message = Mail(
-            from_email=Email("20213320@aloe.ulima.edu.pe", "Safe_2_Gether!"),
-            to_emails=To(to_email),
-            subject=f"🚨 Nuevo reporte de {author_username} en {report_district}",
-            html_content=Content("text/html", html_content)
-        )
+        message = _build_message(to_email, f"🚨 Nuevo reporte de {author_username} en {report_district}", html_content)
         
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        response = await send_mail(sendgrid_api_key, message, "new_report")
         
         if response.status_code in [200, 201, 202]:
-            print(f"✅ Notificación de reporte enviada exitosamente a {to_email}")
+            logger.info("Notificación de reporte enviada exitosamente a %s", to_email)
             return True
         else:
-            print(f"⚠️ Error SendGrid Status: {response.status_code}")
+            logger.warning("Error SendGrid Status: %s", response.status_code)
             return False
             
     except Exception as e:
-        print(f"❌ Error en send_new_report_notification: {str(e)}")
+        logger.error("Error en send_new_report_notification: %s", e)
         return False
 
 
@@ -139,45 +147,36 @@ async def send_password_reset_email(
     
     try:
         # Obtener API key de SendGrid desde variables de entorno
-        sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
+        sendgrid_api_key = settings.SENDGRID_API_KEY
         
         # Debug: Mostrar si la key existe (sin revelar el valor completo)
         if sendgrid_api_key:
             key_preview = f"{sendgrid_api_key[:10]}...{sendgrid_api_key[-5:]}"
-            print(f"🔑 SendGrid API Key cargada: {key_preview}")
+            logger.debug("SendGrid API Key cargada: %s", key_preview)
         else:
-            print("❌ SENDGRID_API_KEY NO ENCONTRADA en variables de entorno")
-            print("📋 Variables disponibles:", list(os.environ.keys()))
+            logger.error("SENDGRID_API_KEY NO ENCONTRADA en variables de entorno")
             return False
         
         # Crear mensaje con email verificado de SendGrid
-        message = Mail(
-            from_email=Email("20213320@aloe.ulima.edu.pe", "Safe_2_Gether!"),  # DEBES VERIFICAR ESTE EMAIL EN SENDGRID
-            to_emails=To(to_email),
-            subject="Recupera tu contraseña - Safe2Gether",
-            html_content=Content("text/html", html_content)
-        )
+        message = _build_message(to_email, "Recupera tu contraseña - Safe2Gether", html_content)
         
         # Enviar
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        response = await send_mail(sendgrid_api_key, message, "password_reset")
         
-        print(f"📤 SendGrid Response Status: {response.status_code}")
-        print(f"📤 SendGrid Response Body: {response.body}")
-        print(f"📤 SendGrid Response Headers: {response.headers}")
+        logger.debug("SendGrid Response Status: %s", response.status_code)
+        logger.debug("SendGrid Response Body: %s", response.body)
+        logger.debug("SendGrid Response Headers: %s", response.headers)
         
         if response.status_code in [200, 201, 202]:
-            print(f"✅ Email enviado exitosamente a {to_email}")
+            logger.info("Email enviado exitosamente a %s", to_email)
             return True
         else:
-            print(f"⚠️ Error SendGrid Status: {response.status_code}")
-            print(f"⚠️ Error Body: {response.body}")
+            logger.warning("Error SendGrid Status: %s", response.status_code)
+            logger.warning("Error Body: %s", response.body)
             return False
             
     except Exception as e:
-        print(f"❌ Error en send_password_reset_email: {str(e)}")
-        import traceback
-        print(f"🔍 Traceback completo:\n{traceback.format_exc()}")
+        logger.exception("Error en send_password_reset_email: %s", e)
         return False
 
 
@@ -267,51 +266,45 @@ async def send_risk_alert_email(
     """
     
     try:
-        sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
+        sendgrid_api_key = settings.SENDGRID_API_KEY
         
         if not sendgrid_api_key:
-            print("❌ SENDGRID_API_KEY NO ENCONTRADA para alerta de riesgo")
+            logger.error("SENDGRID_API_KEY NO ENCONTRADA para alerta de riesgo")
             return False
         
-        message = Mail(
-            from_email=Email("20213320@aloe.ulima.edu.pe", "Safe_2_Gether!"),
-            to_emails=To(to_email),
-            subject=f"{emoji} Alerta de Seguridad: {area_nombre} - Nivel {nivel_peligro}",
-            html_content=Content("text/html", html_content)
-        )
+        message = _build_message(to_email, f"{emoji} Alerta de Seguridad: {area_nombre} - Nivel {nivel_peligro}", html_content)
         
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        response = await send_mail(sendgrid_api_key, message, "risk_alert")
         
         if response.status_code in [200, 201, 202]:
-            print(f"✅ Alerta de riesgo enviada exitosamente a {to_email} para área {area_nombre}")
+            logger.info("Alerta de riesgo enviada exitosamente a %s para área %s", to_email, area_nombre)
             return True
         else:
-            print(f"⚠️ Error SendGrid Status: {response.status_code}")
+            logger.warning("Error SendGrid Status: %s", response.status_code)
             return False
             
     except Exception as e:
-        print(f"❌ Error en send_risk_alert_email: {str(e)}")
+        logger.error("Error en send_risk_alert_email: %s", e)
         return False
 
 
 # Función de prueba para verificar configuración
 async def test_sendgrid_config():
     """Prueba la configuración de SendGrid sin enviar email"""
-    api_key = os.getenv("SENDGRID_API_KEY")
+    api_key = settings.SENDGRID_API_KEY
     
     if not api_key:
-        print("❌ SENDGRID_API_KEY no configurada")
+        logger.error("SENDGRID_API_KEY no configurada")
         return False
     
-    print(f"✅ API Key encontrada: {api_key[:10]}...{api_key[-5:]}")
-    print(f"📏 Longitud de API Key: {len(api_key)} caracteres")
+    logger.info("API Key encontrada: %s...%s", api_key[:10], api_key[-5:])
+    logger.debug("Longitud de API Key: %s caracteres", len(api_key))
     
     # Verificar formato
     if api_key.startswith("SG."):
-        print("✅ Formato de API Key correcto (comienza con SG.)")
+        logger.info("Formato de API Key correcto (comienza con SG.)")
     else:
-        print("⚠️ Formato de API Key incorrecto (debería comenzar con SG.)")
+        logger.warning("Formato de API Key incorrecto (debería comenzar con SG.)")
     
     return True
 
@@ -362,30 +355,22 @@ async def send_report_confirmation_email(
     """
 
     try:
-        sendgrid_api_key = os.getenv("SENDGRID_API_KEY")
+        sendgrid_api_key = settings.SENDGRID_API_KEY
         if not sendgrid_api_key:
-            print("❌ SENDGRID_API_KEY NO ENCONTRADA en variables de entorno")
+            logger.error("SENDGRID_API_KEY NO ENCONTRADA en variables de entorno")
             return False
 
-        message = Mail(
-            from_email=Email("20213320@aloe.ulima.edu.pe", "Safe_2_Gether!"),
-            to_emails=To(to_email),
-            subject=f"Reporte #{reporte_id} registrado - Safe2Gether",
-            html_content=Content("text/html", html_content),
-        )
+        message = _build_message(to_email, f"Reporte #{reporte_id} registrado - Safe2Gether", html_content)
 
-        sg = SendGridAPIClient(sendgrid_api_key)
-        response = sg.send(message)
+        response = await send_mail(sendgrid_api_key, message, "report_confirmation")
 
-        print(f"📤 SendGrid Response Status: {response.status_code}")
+        logger.debug("SendGrid Response Status: %s", response.status_code)
         if response.status_code in [200, 201, 202]:
-            print(f"✅ Email de confirmación de reporte enviado a {to_email}")
+            logger.info("Email de confirmación de reporte enviado a %s", to_email)
             return True
-        print(f"⚠️ Error SendGrid Status: {response.status_code}")
+        logger.warning("Error SendGrid Status: %s", response.status_code)
         return False
 
     except Exception as e:
-        print(f"❌ Error en send_report_confirmation_email: {str(e)}")
-        import traceback
-        print(f"🔍 Traceback completo:\n{traceback.format_exc()}")
+        logger.exception("Error en send_report_confirmation_email: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""Índices en memoria sobre Reportes habilitados en la configuración."""
+from typing import Dict, List
+
+from app.config import settings
+from app.services.cluster_service import get_cluster_service
+from app.services.density_service import get_density_service
+from app.services.nearby_service import get_nearby_service
+from app.services.reporte_index_service import ReporteIndexService, rebuild_together
+from app.services.search_service import get_search_service
+
+
+def enabled_indexes() -> Dict[str, ReporteIndexService]:
+    indexes: Dict[str, ReporteIndexService] = {}
+    if settings.DENSITY_ENABLED:
+        indexes["densidad"] = get_density_service()
+    if settings.CLUSTERS_ENABLED:
+        indexes["clusters"] = get_cluster_service()
+    if settings.NEARBY_ENABLED:
+        indexes["cercanos"] = get_nearby_service()
+    if settings.SEARCH_ENABLED:
+        indexes["busqueda"] = get_search_service()
+    return indexes
+
+
+class IndexRefresher:
+    """Reconstruye juntos, con un solo recorrido de Reportes, los índices que vencieron."""
+
+    def __init__(self, indexes: List[ReporteIndexService]):
+        self.indexes = indexes
+
+    @property
+    def interval_seconds(self) -> float:
+        return min(index.refresh_seconds for index in self.indexes)
+
+    async def refresh(self) -> Dict[str, dict] | None:
+        due = [index for index in self.indexes if index.refresh_due()]
+        if not due:
+            return None
+        return await rebuild_together(due)
@@ -0,0 +1,85 @@
+"""Reportes cercanos a un punto (radio y k más cercanos).
+
+Cada worker mantiene una grilla de puntos en memoria
+(app/stores/nearby_store.py), reconstruida cada NEARBY_REFRESH_SECONDS y
+actualizada con las escrituras del propio worker (ver ReporteIndexService).
+La búsqueda devuelve los IDs ordenados por distancia y luego se traen esas
+filas en una sola consulta. Mientras la grilla no está lista se leen solo
+los reportes del cuadrado que contiene al círculo.
+"""
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List
+import logging
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.geo import degrees_around
+from app.services.reporte_index_service import ReporteIndexService, bbox_filter, coords_of
+from app.services.rollups_service import day_of
+from app.stores.nearby_store import PointGrid
+
+logger = logging.getLogger(__name__)
+
+
+class NearbyService(ReporteIndexService):
+    select = "id,lat,lon,created_at"
+    label = "Índice de cercanía"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.NEARBY_REFRESH_SECONDS
+
+    def new_index(self) -> PointGrid:
+        return PointGrid(settings.NEARBY_CELL_DEGREES)
+
+    def add_row(self, index: PointGrid, row: Dict[str, Any]) -> None:
+        coords = coords_of(row)
+        if coords is None:
+            index.remove(int(row["id"]))
+            return
+        day = day_of(row.get("created_at"))
+        index.add(int(row["id"]), coords[0], coords[1], date.fromisoformat(day).toordinal() if day else 0)
+
+    def remove_row(self, index: PointGrid, reporte_id: int) -> None:
+        index.remove(reporte_id)
+
+    async def cercanos(
+        self, lat: float, lon: float, radio: float = 1000, k: int = 20, desde: date | None = None
+    ) -> List[Dict[str, Any]]:
+        """Reportes a `radio` metros o menos de (lat, lon), los k más cercanos primero.
+
+        Cada reporte incluye `distancia_m`.
+        """
+        if radio > settings.NEARBY_MAX_RADIUS_M:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"radio no puede superar {settings.NEARBY_MAX_RADIUS_M} metros",
+            )
+        if self.ready:
+            index = self.index
+        else:
+            dlat, dlon = degrees_around(lat, radio)
+            box = (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+            index = await self.load(
+                self.new_index(), created_from=desde.isoformat() if desde else None, where=bbox_filter(box)
+            )
+        found = index.nearest(lat, lon, radio, k, min_day=desde.toordinal() if desde else 0)
+        if not found:
+            return []
+        # Una sola consulta por las filas; los reportes borrados entretanto se omiten
+        rows = await self.repo.get_by_ids([reporte_id for _, reporte_id in found])
+        distances = {reporte_id: distance for distance, reporte_id in found}
+        return [{**row, "distancia_m": round(distances[row["id"]], 1)} for row in rows]
+
+
+_nearby_service: NearbyService | None = None
+
+
+def get_nearby_service() -> NearbyService:
+    global _nearby_service
+    if _nearby_service is None:
+        _nearby_service = NearbyService()
+    return _nearby_service
@@ -0,0 +1,178 @@
+"""Base para índices en memoria construidos sobre Reportes.
+
+Cada worker arma su propio índice:
+
+- al arrancar y cada `refresh_seconds` se reconstruye con un recorrido
+  paginado de Reportes (así también se ven las escrituras de otros workers).
+  Los índices que vencen juntos comparten un único recorrido
+  (`rebuild_together`, ver app/services/indexes.py);
+- las escrituras de este worker se aplican al instante vía reporte_changes;
+- los cambios que llegan durante una reconstrucción se reaplican sobre el
+  índice nuevo antes de reemplazar al anterior.
+
+Las subclases definen las columnas a leer y cómo agregar/quitar un reporte.
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Sequence, Tuple
+import asyncio
+import logging
+import math
+import time
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core import reporte_changes
+from app.repositories.reportes_repository import ReportesRepository
+
+logger = logging.getLogger(__name__)
+
+# Una reconstrucción a la vez por worker (aunque cubra varios índices)
+_rebuild_lock = asyncio.Lock()
+
+
+def parse_bbox(value: str) -> Tuple[float, float, float, float]:
+    """Parsea "min_lon,min_lat,max_lon,max_lat" (orden GeoJSON)."""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in value.split(","))
+    except (AttributeError, ValueError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="bbox debe ser 'min_lon,min_lat,max_lon,max_lat'",
+        )
+    if not (-180 <= min_lon <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="bbox fuera de rango o invertido")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def coords_of(row: Dict[str, Any]) -> Tuple[float, float] | None:
+    lat, lon = row.get("lat"), row.get("lon")
+    if lat is None or lon is None:
+        return None
+    try:
+        lat, lon = float(lat), float(lon)
+    except (TypeError, ValueError):
+        return None
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def bbox_filter(bbox: Tuple[float, float, float, float]) -> Dict[str, Any]:
+    """Filtro PostgREST (para scan_reportes) de los reportes dentro del bbox."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    return {"and": f"(lat.gte.{min_lat},lat.lte.{max_lat},lon.gte.{min_lon},lon.lte.{max_lon})"}
+
+
+class ReporteIndexService(ABC):
+    # Columnas a leer de Reportes (debe incluir id)
+    select = "id"
+    label = "índice"
+
+    def __init__(self, repo: ReportesRepository | None = None):
+        self.repo = repo or ReportesRepository()
+        self.index = self.new_index()
+        self.ready = False
+        self._built_at: float | None = None
+        self._pending: List[Tuple[str, List[Dict[str, Any]]]] | None = None
+
+    @property
+    @abstractmethod
+    def refresh_seconds(self) -> float: ...
+
+    @abstractmethod
+    def new_index(self) -> Any: ...
+
+    @abstractmethod
+    def add_row(self, index: Any, row: Dict[str, Any]) -> None:
+        """Agrega (o reemplaza) el reporte en el índice."""
+
+    @abstractmethod
+    def remove_row(self, index: Any, reporte_id: int) -> None: ...
+
+    def _apply(self, index: Any, kind: str, rows: List[Dict[str, Any]]) -> None:
+        for row in rows:
+            if kind == reporte_changes.DELETE:
+                self.remove_row(index, int(row["id"]))
+            else:
+                self.add_row(index, row)
+
+    def apply_changes(self, kind: str, rows: List[Dict[str, Any]]) -> None:
+        """Listener de reporte_changes."""
+        if self._pending is not None:
+            self._pending.append((kind, rows))
+        self._apply(self.index, kind, rows)
+
+    async def load(self, index: Any, **scan_kwargs) -> Any:
+        """Llena `index` con un recorrido paginado de Reportes (filtros opcionales de scan_reportes)."""
+        async for page in self.repo.scan_reportes(
+            select=self.select, page_size=settings.REPORTES_SCAN_PAGE_SIZE, **scan_kwargs
+        ):
+            for row in page:
+                self.add_row(index, row)
+        return index
+
+    async def rebuild(self) -> dict:
+        return (await rebuild_together([self]))[self.label]
+
+    def refresh_due(self) -> bool:
+        return not self.ready or time.time() - self._built_at >= self.refresh_seconds * 0.9
+
+    async def refresh(self, *, force: bool = False) -> dict | None:
+        if not force and not self.refresh_due():
+            return None
+        return await self.rebuild()
+
+    def status(self) -> dict:
+        return {
+            "listo": self.ready,
+            "reportes": len(self.index),
+            "ultimo_refresco_hace_s": round(time.time() - self._built_at, 1) if self._built_at else None,
+        }
+
+
+def _union_select(services: Sequence[ReporteIndexService]) -> str:
+    columns: List[str] = []
+    for service in services:
+        for column in service.select.split(","):
+            if column not in columns:
+                columns.append(column)
+    return ",".join(columns)
+
+
+async def rebuild_together(services: Sequence[ReporteIndexService]) -> Dict[str, dict]:
+    """Reconstruye los índices con un único recorrido paginado de Reportes.
+
+    Cada página alimenta a todos los índices nuevos; los cambios que llegan
+    mientras tanto se reaplican antes de reemplazar a los anteriores.
+    """
+    async with _rebuild_lock:
+        start = time.perf_counter()
+        fresh = [(service, service.new_index()) for service in services]
+        for service in services:
+            service._pending = []
+        try:
+            async for page in services[0].repo.scan_reportes(
+                select=_union_select(services), page_size=settings.REPORTES_SCAN_PAGE_SIZE
+            ):
+                for service, index in fresh:
+                    for row in page:
+                        service.add_row(index, row)
+            for service, index in fresh:
+                for kind, rows in service._pending:
+                    service._apply(index, kind, rows)
+        finally:
+            for service in services:
+                service._pending = None
+        elapsed = time.perf_counter() - start
+        built_at = time.time()
+        result: Dict[str, dict] = {}
+        for service, index in fresh:
+            service.index = index
+            service.ready = True
+            service._built_at = built_at
+            logger.info("%s reconstruido: %s reportes en %.1f s", service.label, len(index), elapsed)
+            result[service.label] = {"reportes": len(index), "segundos": round(elapsed, 2)}
+        return result
@@ -1,30 +1,121 @@
 from fastapi import HTTPException, status
+from datetime import date, datetime, timedelta, timezone
 from typing import Any, Optional
+import base64
+import logging
 from app.repositories.reportes_repository import ReportesRepository
 from app.repositories.users_repository import UsersRepository
 from app.repositories.seguidores_repository import SeguidoresRepository
 from app.services.email_service import send_report_confirmation_email, send_new_report_notification
-from app.models.reporte import ReporteCreate, ReporteOut, ReporteUpdate
+from app.services.rollups_service import MAX_RANGE_DAYS, get_rollups_service
+from app.models.reporte import REPORTE_FIELDS, ReporteCreate, ReporteOut, ReporteParcialOut, ReporteUpdate
+from app.stores.timeline_store import TimelineStore, get_timeline_store
+from app.core import deadline
+from app.core.serialization import build_models
+from app.core.fieldsets import parse_fields, partial_rows
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _encode_cursor(created_at: str, reporte_id: int) -> str:
+    raw = f"{created_at}|{reporte_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[str, int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, reporte_id = base64.urlsafe_b64decode(padded).decode().rsplit("|", 1)
+        return created_at, int(reporte_id)
+    except Exception:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
 
 
 class ReportesService:
-    def __init__(self, repo: ReportesRepository | None = None, users_repo: UsersRepository | None = None, seguidores_repo: SeguidoresRepository | None = None):
+    def __init__(self, repo: ReportesRepository | None = None, users_repo: UsersRepository | None = None, seguidores_repo: SeguidoresRepository | None = None, timelines: TimelineStore | None = None):
         self.repo = repo or ReportesRepository()
         self.users_repo = users_repo or UsersRepository()
         self.seguidores_repo = seguidores_repo or SeguidoresRepository()
+        self.timelines = timelines or get_timeline_store()
+
+    async def list_reportes(self, *, limit: int | None = 20, offset: int | None = 0, order: str | None = "created_at.desc", trusted: bool = False, fields: str | None = None) -> list[ReporteOut] | list[dict]:
+        """Lista reportes; con `fields` devuelve dicts parciales con solo esas columnas."""
+        select = parse_fields(fields, REPORTE_FIELDS)
+        rows = await self.repo.list_reportes(limit=limit, offset=offset, order=order, select=select or "*")
+        if select:
+            return partial_rows(ReporteParcialOut, rows, trusted=trusted)
+        return build_models(ReporteOut, rows, trusted=trusted)
 
-    async def list_reportes(self, *, limit: int | None = 20, offset: int | None = 0, order: str | None = "created_at.desc") -> list[ReporteOut]:
-        rows = await self.repo.list_reportes(limit=limit, offset=offset, order=order)
-        return [ReporteOut(**row) for row in rows]
+    async def list_by_user(self, user_id: int, *, trusted: bool = False, fields: str | None = None) -> list[ReporteOut] | list[dict]:
+        select = parse_fields(fields, REPORTE_FIELDS)
+        rows = await self.repo.list_by_user(user_id, select=select or "*")
+        if select:
+            return partial_rows(ReporteParcialOut, rows, trusted=trusted)
+        return build_models(ReporteOut, rows, trusted=trusted)
 
-    async def list_by_user(self, user_id: int) -> list[ReporteOut]:
-        rows = await self.repo.list_by_user(user_id)
-        return [ReporteOut(**row) for row in rows]
+    async def list_reportes_from_followed_users(
+        self, user_id: int, *, limit: int = 20, cursor: str | None = None, trusted: bool = False
+    ) -> tuple[list[ReporteOut], str | None]:
+        """Obtiene una página de reportes de los usuarios que user_id sigue.
 
-    async def list_reportes_from_followed_users(self, user_id: int) -> list[ReporteOut]:
-        """Obtiene reportes de los usuarios que user_id sigue"""
-        rows = await self.repo.list_reportes_from_followed_users(user_id)
-        return [ReporteOut(**row) for row in rows]
+        Primero intenta la timeline materializada (IDs + multi-get); si no puede
+        responder la página, cae al pull paginado y siembra la timeline.
+        Retorna (reportes, cursor_siguiente); el cursor es None en la última página.
+        """
+        before = _decode_cursor(cursor) if cursor else None
+        page = await self._timeline_page(user_id, limit, before)
+        if page is not None:
+            rows, has_more = page
+        else:
+            rows = await self.repo.list_reportes_from_followed_users(user_id, limit=limit, before=before)
+            has_more = len(rows) == limit
+            if before is None:
+                ids = [int(r["id"]) for r in rows if r.get("id") is not None]
+                self.timelines.seed(user_id, ids, complete=not has_more)
+
+        next_cursor = None
+        if has_more and rows:
+            last = rows[-1]
+            if last.get("created_at") and last.get("id") is not None:
+                next_cursor = _encode_cursor(last["created_at"], int(last["id"]))
+        return build_models(ReporteOut, rows, trusted=trusted), next_cursor
+
+    async def _timeline_page(
+        self, user_id: int, limit: int, before: tuple[str, int] | None
+    ) -> tuple[list[dict], bool] | None:
+        """Lee una página desde la timeline; None si la timeline no alcanza."""
+        ids = self.timelines.read(user_id, before_id=before[1] if before else None, limit=limit)
+        if ids is None:
+            return None
+        rows = await self.repo.get_by_ids(ids)
+        has_more = len(ids) == limit
+
+        # Autores "pesados" no hacen fan-out: traer sus reportes en pull y mezclar
+        heavy = self.timelines.heavy_authors()
+        if heavy:
+            seguidos = await self.seguidores_repo.list_seguido_ids(user_id)
+            heavy_seguidos = [a for a in seguidos if a in heavy]
+            if heavy_seguidos:
+                extra = await self.repo.list_by_users(heavy_seguidos, limit=limit, before=before)
+                has_more = has_more or len(extra) == limit
+                merged = {r.get("id"): r for r in rows}
+                for r in extra:
+                    merged.setdefault(r.get("id"), r)
+                rows = sorted(
+                    merged.values(),
+                    key=lambda r: (r.get("created_at") or "", r.get("id") or 0),
+                    reverse=True,
+                )[:limit]
+        return rows, has_more
+
+    def _fan_out(self, author_id: int, reporte_id: int, seguidores: list[dict]) -> None:
+        """Empuja el nuevo reporte a la timeline de cada seguidor (o marca al autor como pesado)."""
+        if len(seguidores) > settings.TIMELINE_FANOUT_MAX_FOLLOWERS:
+            self.timelines.mark_heavy_author(author_id)
+            return
+        follower_ids = [s["seguidor_id"] for s in seguidores if s.get("seguidor_id") is not None]
+        self.timelines.push(follower_ids, reporte_id)
 
     async def create_reporte(self, payload: ReporteCreate) -> ReporteOut:
         # sanitize payload
@@ -52,21 +143,24 @@ class ReportesService:
         # 🆕 NUEVO: Obtener distrito automáticamente desde coordenadas
         lat = sanitized.get("lat")
         lon = sanitized.get("lon")
-        if lat is not None and lon is not None:
+        if lat is not None and lon is not None and not deadline.has_budget():
+            # Paso opcional: con el deadline casi agotado se guarda sin distrito calculado
+            logger.warning("Deadline casi agotado: se omite la geocodificación del reporte")
+        elif lat is not None and lon is not None:
             try:
                 distrito = await self.repo.get_distrito_from_coordinates(lat, lon)
                 if distrito:
                     sanitized["distrito"] = distrito
-                    print(f"✓ Distrito obtenido automáticamente: {distrito}")
+                    logger.info("Distrito obtenido automáticamente: %s", distrito)
             except Exception as e:
-                print(f"⚠️ No se pudo obtener distrito automáticamente: {e}")
+                logger.warning("No se pudo obtener distrito automáticamente: %s", e)
         
         created = await self.repo.create_reporte(sanitized)
 
-        # Enviar email de confirmación al usuario si es posible
+        # Enviar email de confirmación al usuario si es posible (y si queda tiempo)
         try:
             user_id = sanitized.get("user_id")
-            if user_id is not None:
+            if user_id is not None and deadline.has_budget():
                 user = await self.users_repo.get_by_id(int(user_id))
                 if user and user.get("email"):
                     email = user["email"]
@@ -89,21 +183,35 @@ class ReportesService:
                         )
         except Exception as e:
             # No bloquear creación por errores de email
-            print(f"⚠️ No se pudo enviar email de confirmación: {e}")
+            logger.warning("No se pudo enviar email de confirmación: %s", e)
+
+        # Seguidores del autor: se usan para el fan-out de timelines y las notificaciones
+        seguidores: list[dict] = []
+        user_id = sanitized.get("user_id")
+        if user_id is not None:
+            try:
+                seguidores = await self.seguidores_repo.list_seguidores_by_user(int(user_id))
+            except Exception as e:
+                logger.warning("No se pudo obtener seguidores del autor: %s", e)
+
+        try:
+            if user_id is not None and created.get("id") is not None:
+                self._fan_out(int(user_id), int(created["id"]), seguidores)
+        except Exception as e:
+            logger.warning("Error al actualizar timelines de seguidores: %s", e)
 
         # 🆕 NUEVO: Notificar a seguidores que tienen notificar_reportes=True
         try:
-            user_id = sanitized.get("user_id")
-            if user_id is not None:
+            if user_id is not None and deadline.has_budget():
                 # Obtener autor del reporte
                 author = await self.users_repo.get_by_id(int(user_id))
                 author_username = author.get("user", "Usuario") if author else "Usuario"
                 
-                # Obtener seguidores del autor
-                seguidores = await self.seguidores_repo.list_seguidores_by_user(int(user_id))
-                
                 # Filtrar solo los que tienen notificar_reportes=True
                 for seguidor in seguidores:
+                    if not deadline.has_budget():
+                        logger.warning("Deadline casi agotado: se omiten las notificaciones restantes del reporte")
+                        break
                     if seguidor.get("notificar_reportes") is True:
                         seguidor_id = seguidor.get("seguidor_id")
                         if seguidor_id:
@@ -119,18 +227,21 @@ class ReportesService:
                                     report_id=int(created.get("id")),
                                     report_district=str(created.get("distrito") or sanitized.get("distrito") or "Desconocido")
                                 )
-                                print(f"✉️ Notificación enviada a {follower['email']} por nuevo reporte")
+                                logger.info("Notificación enviada a %s por nuevo reporte", follower['email'])
         except Exception as e:
             # No bloquear creación por errores de notificación
-            print(f"⚠️ Error al enviar notificaciones a seguidores: {e}")
+            logger.warning("Error al enviar notificaciones a seguidores: %s", e)
 
         return ReporteOut(**created)
 
-    async def get_reporte(self, reporte_id: int) -> ReporteOut:
-        row = await self.repo.get_by_id(reporte_id)
+    async def get_reporte(self, reporte_id: int, *, trusted: bool = False, fields: str | None = None) -> ReporteOut | dict:
+        select = parse_fields(fields, REPORTE_FIELDS)
+        row = await self.repo.get_by_id(reporte_id, select=select or "*")
         if not row:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Reporte not found")
-        return ReporteOut(**row)
+        if select:
+            return partial_rows(ReporteParcialOut, [row], trusted=trusted)[0]
+        return build_models(ReporteOut, [row], trusted=trusted)[0]
 
     async def update_reporte(self, reporte_id: int, payload: ReporteUpdate | ReporteCreate) -> ReporteOut:
         allowed = {"titulo", "descripcion", "categoria", "lat", "lon", "direccion", "distrito", "estado", "veracidad_porcentaje", "cantidad_upvotes", "cantidad_downvotes"}
@@ -180,13 +291,73 @@ class ReportesService:
         """
         return await self.repo.get_district_statistics()
 
-    async def get_district_ranking(self, period: str = "week", categorias: Optional[list[str]] = None) -> list[dict]:
+    async def get_district_ranking(
+        self,
+        period: str = "week",
+        categorias: Optional[list[str]] = None,
+        desde: date | None = None,
+        hasta: date | None = None,
+        comparar: bool = False,
+    ) -> list[dict]:
         """Devuelve ranking de distritos para el período indicado.
 
         "Más seguro" => menos reportes válidos (estado Activo y veracidad >=33).
         Nota: No existe campo explícito de resolución por autoridad; usamos veracidad >=33 como proxy.
+
+        Con `desde`/`hasta` (días UTC inclusive, máximo 366) se usa ese rango en vez
+        de `period`. Con `comparar` cada distrito incluye `anterior` (el rango de
+        igual largo inmediatamente previo) y `variacion_porcentaje`.
+        Se responde desde los rollups diarios cuando están listos.
         """
-        return await self.repo.get_district_ranking(period, categorias)
+        today = datetime.now(timezone.utc).date()
+        if desde is not None or hasta is not None:
+            hasta = hasta or today
+            desde = desde or hasta
+            if hasta < desde:
+                raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'hasta' debe ser posterior a 'desde'")
+            if (hasta - desde).days + 1 > MAX_RANGE_DAYS:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"El rango no puede superar {MAX_RANGE_DAYS} días",
+                )
+            periodo = "custom"
+        else:
+            days = {"year": 365, "month": 30, "week": 7}.get((period or "week").lower().strip(), 7)
+            # `days` días calendario contando hoy (hasta es inclusive)
+            desde, hasta, periodo = today - timedelta(days=days - 1), today, period
+
+        ranking = await self._ranking_for(desde, hasta, categorias, periodo, rolling=periodo != "custom")
+        if not comparar:
+            return ranking
+
+        span = hasta - desde + timedelta(days=1)
+        anterior = await self._ranking_for(desde - span, desde - timedelta(days=1), categorias, periodo, rolling=False)
+        previos = {r["distrito"]: r for r in anterior}
+        for row in ranking:
+            prev = previos.get(row["distrito"])
+            prev_total = prev["total_delitos"] if prev else 0
+            row["anterior"] = {
+                "total_delitos": prev_total,
+                "desde": (desde - span).isoformat(),
+                "hasta": (desde - timedelta(days=1)).isoformat(),
+            }
+            row["variacion_porcentaje"] = (
+                round((row["total_delitos"] - prev_total) / prev_total * 100.0, 2) if prev_total else None
+            )
+        return ranking
+
+    async def _ranking_for(
+        self, desde: date, hasta: date, categorias: Optional[list[str]], periodo: str, *, rolling: bool
+    ) -> list[dict]:
+        rollups = get_rollups_service() if settings.ROLLUPS_ENABLED else None
+        if rollups is not None and rollups.ready:
+            return rollups.ranking(desde, hasta, categorias, periodo)
+        # Sin rollups: recorrido de la tabla (ventana móvil como antes, o rango explícito)
+        if rolling:
+            return await self.repo.get_district_ranking(periodo, categorias)
+        start = datetime.combine(desde, datetime.min.time(), tzinfo=timezone.utc)
+        end = datetime.combine(hasta + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+        return await self.repo.get_district_ranking(periodo, categorias, start=start, end=end)
 
     async def actualizar_distrito_desde_coordenadas(self, reporte_id: int) -> dict:
         """Actualiza el distrito de un reporte usando sus coordenadas lat/lon.
@@ -0,0 +1,192 @@
+"""Rollups diarios para el ranking de distritos.
+
+En vez de recorrer todos los reportes en cada consulta, se mantienen conteos
+por día (UTC), distrito y categoría (app/stores/rollup_store.py):
+
+- backfill: un recorrido paginado de toda la tabla arma todos los buckets.
+- refresco incremental: cada ROLLUP_REFRESH_SECONDS se recalculan solo los
+  días "abiertos" (los últimos ROLLUP_MUTABLE_DAYS, donde todavía cambian
+  estado y veracidad) más los días nuevos desde el último refresco.
+
+Los días más antiguos quedan congelados: un cambio de estado en un reporte
+viejo se refleja con un rebuild (POST /admin/rollups/rebuild).
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+import asyncio
+import logging
+import time
+
+from app.config import settings
+from app.repositories.reportes_repository import (
+    ESTADO_ACTIVO,
+    MIN_VERACIDAD_PORCENTAJE,
+    SIN_CATEGORIA,
+    SIN_DISTRITO,
+    ReportesRepository,
+)
+from app.stores.rollup_store import Counts, RollupStore, get_rollup_store
+
+logger = logging.getLogger(__name__)
+
+BACKFILLED_AT = "backfilled_at"
+REFRESHED_AT = "refreshed_at"
+REFRESHED_DAY = "refreshed_day"
+
+ROLLUP_SELECT = "id,distrito,categoria,estado,veracidad_porcentaje,created_at"
+MAX_RANGE_DAYS = 366
+
+
+def _today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def day_of(created_at: str | None) -> str | None:
+    """Día UTC (YYYY-MM-DD) de un created_at de PostgREST."""
+    if not created_at:
+        return None
+    # Camino rápido: timestamps en UTC (lo normal en Supabase) o sin zona horaria
+    tail = created_at[19:]
+    if created_at.endswith(("+00:00", "Z")) or ("+" not in tail and "-" not in tail):
+        return created_at[:10]
+    try:
+        return datetime.fromisoformat(created_at.replace("Z", "+00:00")).astimezone(timezone.utc).date().isoformat()
+    except ValueError:
+        return None
+
+
+def _is_valid(row: Dict[str, Any]) -> bool:
+    return row.get("estado") == ESTADO_ACTIVO and (row.get("veracidad_porcentaje") or 0) >= MIN_VERACIDAD_PORCENTAJE
+
+
+def accumulate(buckets: Dict[str, Counts], rows: List[Dict[str, Any]]) -> None:
+    """Suma las filas a sus buckets diarios (filas sin created_at se ignoran)."""
+    for row in rows:
+        day = day_of(row.get("created_at"))
+        if day is None:
+            continue
+        distrito = row.get("distrito")
+        distrito = distrito if distrito and distrito.strip() else SIN_DISTRITO
+        key = (distrito, row.get("categoria") or SIN_CATEGORIA)
+        counts = buckets.setdefault(day, {})
+        bucket = counts.get(key)
+        if bucket is None:
+            bucket = counts[key] = [0, 0]
+        bucket[1] += 1
+        if _is_valid(row):
+            bucket[0] += 1
+
+
+def build_ranking(
+    counts: Counts,
+    categorias: Optional[List[str]],
+    periodo: str,
+    desde: str,
+    hasta: str,
+) -> list[dict]:
+    """Arma el ranking (mismo formato que ReportesRepository.get_district_ranking)."""
+    agg: Dict[str, Dict[str, Any]] = {}
+    for (distrito, categoria), (validos, total) in counts.items():
+        if categorias and categoria not in categorias:
+            continue
+        if not total:
+            continue
+        data = agg.setdefault(distrito, {"total_delitos": 0, "por_categoria": {}})
+        if validos:
+            data["total_delitos"] += validos
+            data["por_categoria"][categoria] = data["por_categoria"].get(categoria, 0) + validos
+    ranking = [
+        {
+            "distrito": distrito,
+            "total_delitos": data["total_delitos"],
+            "resoluciones_autoridades": data["total_delitos"],
+            "porcentaje_resoluciones": 100.0 if data["total_delitos"] > 0 else 0.0,
+            "periodo": periodo,
+            "desde": desde,
+            "hasta": hasta,
+            "por_categoria": data["por_categoria"],
+        }
+        for distrito, data in agg.items()
+    ]
+    ranking.sort(key=lambda x: x["total_delitos"])
+    return ranking
+
+
+class RollupsService:
+    def __init__(self, repo: ReportesRepository | None = None, store: RollupStore | None = None):
+        self.repo = repo or ReportesRepository()
+        self.store = store or get_rollup_store()
+        self._lock = asyncio.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self.store.get_meta(BACKFILLED_AT) is not None
+
+    async def _collect(self, created_from: str | None) -> Dict[str, Counts]:
+        buckets: Dict[str, Counts] = {}
+        async for page in self.repo.scan_reportes(
+            select=ROLLUP_SELECT, created_from=created_from, page_size=settings.ROLLUP_PAGE_SIZE
+        ):
+            accumulate(buckets, page)
+        return buckets
+
+    async def rebuild(self) -> dict:
+        """Backfill completo: recorre toda la tabla y reemplaza todos los buckets."""
+        async with self._lock:
+            start = time.perf_counter()
+            buckets = await self._collect(None)
+            today = _today().isoformat()
+            self.store.replace_days("0000-01-01", "9999-12-31", buckets)
+            now = str(time.time())
+            self.store.set_meta(BACKFILLED_AT, now)
+            self.store.set_meta(REFRESHED_AT, now)
+            self.store.set_meta(REFRESHED_DAY, today)
+            elapsed = time.perf_counter() - start
+            logger.info("Rollups reconstruidos: %s días en %.1f s", len(buckets), elapsed)
+            return {"dias": len(buckets), "segundos": round(elapsed, 2)}
+
+    async def refresh(self, *, force: bool = False) -> dict | None:
+        """Recalcula los días abiertos y los nuevos; hace el backfill si aún no existe."""
+        if not self.ready:
+            return await self.rebuild()
+        last = self.store.get_meta(REFRESHED_AT)
+        # Con el backend SQLite compartido, otro worker puede haber refrescado recién
+        if not force and last and time.time() - float(last) < settings.ROLLUP_REFRESH_SECONDS * 0.9:
+            return None
+        async with self._lock:
+            today = _today()
+            first = today - timedelta(days=settings.ROLLUP_MUTABLE_DAYS)
+            refreshed_day = self.store.get_meta(REFRESHED_DAY)
+            if refreshed_day and refreshed_day < first.isoformat():
+                first = date.fromisoformat(refreshed_day)
+            buckets = await self._collect(first.isoformat())
+            # Hasta el final: también reportes con fecha futura (relojes desfasados)
+            self.store.replace_days(first.isoformat(), "9999-12-31", buckets)
+            self.store.set_meta(REFRESHED_AT, str(time.time()))
+            self.store.set_meta(REFRESHED_DAY, today.isoformat())
+            return {"desde": first.isoformat(), "dias": len(buckets)}
+
+    def ranking(self, desde: date, hasta: date, categorias: Optional[List[str]], periodo: str) -> list[dict]:
+        counts = self.store.sum_range(desde.isoformat(), hasta.isoformat())
+        return build_ranking(counts, categorias, periodo, f"{desde.isoformat()}T00:00:00", f"{hasta.isoformat()}T23:59:59")
+
+    def status(self) -> dict:
+        refreshed = self.store.get_meta(REFRESHED_AT)
+        return {
+            "backend": settings.ROLLUP_BACKEND,
+            "listo": self.ready,
+            "dias": self.store.day_count(),
+            "ultimo_refresco_hace_s": round(time.time() - float(refreshed), 1) if refreshed else None,
+        }
+
+
+_rollups_service: RollupsService | None = None
+
+
+def get_rollups_service() -> RollupsService:
+    global _rollups_service
+    if _rollups_service is None:
+        _rollups_service = RollupsService()
+    return _rollups_service
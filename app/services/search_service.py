@@ -0,0 +1,107 @@
+"""Búsqueda de texto sobre título y descripción de los reportes.
+
+Cada worker mantiene un índice invertido en memoria (app/stores/search_store.py)
+con normalización en español (app/core/spanish_text.py) y ranking BM25,
+reconstruido cada SEARCH_REFRESH_SECONDS y actualizado con las escrituras del
+propio worker (ver ReporteIndexService). La búsqueda devuelve los IDs mejor
+puntuados y luego se traen esas filas en una sola consulta.
+
+Mientras el índice no está listo (o con SEARCH_ENABLED=false) se busca en
+Postgres vía PostgREST `fts` si existe la columna SEARCH_FTS_COLUMN; si no,
+se indexan al vuelo solo los reportes del distrito/categoría pedidos, y sin
+esos filtros se responde 503 (recorrer toda la tabla por búsqueda no escala).
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, List
+import logging
+
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.core.spanish_text import fold, terms
+from app.repositories.reportes_repository import ilike_exact
+from app.services.reporte_index_service import ReporteIndexService
+from app.stores.search_store import SearchIndex
+
+logger = logging.getLogger(__name__)
+
+# El título pesa el doble que la descripción
+TITLE_WEIGHT = 2
+
+
+def _key(value: Any) -> str | None:
+    return fold(str(value)).strip() if value else None
+
+
+class SearchService(ReporteIndexService):
+    select = "id,titulo,descripcion,distrito,categoria"
+    label = "Índice de búsqueda"
+
+    @property
+    def refresh_seconds(self) -> float:
+        return settings.SEARCH_REFRESH_SECONDS
+
+    def new_index(self) -> SearchIndex:
+        return SearchIndex()
+
+    def add_row(self, index: SearchIndex, row: Dict[str, Any]) -> None:
+        document = terms(row.get("titulo")) * TITLE_WEIGHT + terms(row.get("descripcion"))
+        index.add(int(row["id"]), document, _key(row.get("distrito")), _key(row.get("categoria")))
+
+    def remove_row(self, index: SearchIndex, reporte_id: int) -> None:
+        index.remove(reporte_id)
+
+    async def buscar(
+        self, q: str, distrito: str | None = None, categoria: str | None = None, limit: int = 20
+    ) -> List[Dict[str, Any]]:
+        """Reportes que contienen alguno de los términos de `q`, los más relevantes primero.
+
+        Cada reporte incluye `puntaje` (BM25); es null si la búsqueda la hizo Postgres.
+        """
+        query_terms = terms(q)
+        if not query_terms:
+            return []
+        if not self.ready and settings.SEARCH_FTS_COLUMN:
+            rows = await self.repo.search_fts(
+                settings.SEARCH_FTS_COLUMN, q, distrito=distrito, categoria=categoria, limit=limit
+            )
+            # ilike_exact envía '*' como comodín de un carácter: quedarse con la coincidencia exacta
+            return [
+                {**row, "puntaje": None}
+                for row in rows
+                if (not distrito or _key(row.get("distrito")) == _key(distrito))
+                and (not categoria or _key(row.get("categoria")) == _key(categoria))
+            ]
+        if self.ready:
+            index = self.index
+        elif not distrito and not categoria:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="El índice de búsqueda se está cargando, intente nuevamente",
+                headers={"Retry-After": "10"},
+            )
+        else:
+            where = {}
+            if distrito:
+                where["distrito"] = ilike_exact(distrito)
+            if categoria:
+                where["categoria"] = ilike_exact(categoria)
+            index = await self.load(self.new_index(), where=where or None)
+        found = index.search(query_terms, limit, _key(distrito), _key(categoria))
+        if not found:
+            return []
+        # Una sola consulta por las filas; los reportes borrados entretanto se omiten
+        rows = await self.repo.get_by_ids([reporte_id for _, reporte_id in found])
+        scores = {reporte_id: score for score, reporte_id in found}
+        return [{**row, "puntaje": round(scores[row["id"]], 3)} for row in rows]
+
+
+_search_service: SearchService | None = None
+
+
+def get_search_service() -> SearchService:
+    global _search_service
+    if _search_service is None:
+        _search_service = SearchService()
+    return _search_service
@@ -1,7 +1,8 @@
 from fastapi import HTTPException, status
 from typing import Any
-from app.repositories.seguidores_repository import SeguidoresRepository
+from app.repositories.seguidores_repository import SeguidoresRepository, invalidate_seguidos_cache
 from app.models.seguidor import SeguidorCreate, SeguidorOut, SeguidorUpdate
+from app.stores.timeline_store import get_timeline_store
 
 
 class SeguidoresService:
@@ -51,6 +52,8 @@ class SeguidoresService:
             )
         
         created = await self.repo.create_seguidor(sanitized)
+        invalidate_seguidos_cache(sanitized["seguidor_id"])
+        get_timeline_store().drop(sanitized["seguidor_id"])
         return SeguidorOut(**created)
 
     async def get_seguidor(self, seguidor_id: int) -> SeguidorOut:
@@ -73,6 +76,10 @@ class SeguidoresService:
                 )
 
         updated = await self.repo.update_seguidor(seguidor_id, sanitized)
+        # No sabemos qué par cambió sin otra consulta: invalidar todo
+        if "seguidor_id" in sanitized or "seguido_id" in sanitized:
+            invalidate_seguidos_cache()
+            get_timeline_store().clear()
         if isinstance(updated, list):
             if not updated:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Seguidor not found")
@@ -82,11 +89,16 @@ class SeguidoresService:
 
     async def delete_seguidor(self, seguidor_id: int) -> dict:
         deleted_count = await self.repo.delete_seguidor(seguidor_id)
+        if deleted_count:
+            invalidate_seguidos_cache()
+            get_timeline_store().clear()
         return {"deleted": deleted_count}
 
     async def unfollow(self, seguidor_id: int, seguido_id: int) -> dict:
         """Elimina una relación de seguimiento específica entre dos usuarios"""
         deleted_count = await self.repo.delete_by_users(seguidor_id, seguido_id)
+        invalidate_seguidos_cache(seguidor_id)
+        get_timeline_store().drop(seguidor_id)
         if deleted_count == 0:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND, 
@@ -1,29 +1,44 @@
 from fastapi import HTTPException, status
 from typing import Any
-import os
-from datetime import datetime, timedelta
+import logging
+from datetime import datetime, timezone
 import secrets
 from app.repositories.users_repository import UsersRepository
-from app.models.user import UserCreate, UserOut, UserUpdate
+from app.models.user import USER_PUBLIC_FIELDS, USER_PUBLIC_SELECT, UserCreate, UserOut, UserParcialOut, UserUpdate
+from app.core.fieldsets import parse_fields, partial_rows
 from app.clients.supabase_client import SupabaseClient
+from app.config import settings
+from app.core.auth_tokens import issue_token
+from app.core.passwords import hash_password, verify_password
+from app.stores.reset_token_store import ResetTokenStore, ResetTokenStoreBusy, get_reset_token_store
 
-# 🔐 Almacenamiento temporal de tokens de reset
-# En producción, migrar a Redis o tabla en BD
-_reset_tokens = {}
+logger = logging.getLogger(__name__)
+
+
+def _store_busy(exc: ResetTokenStoreBusy) -> HTTPException:
+    # Archivo de tokens bloqueado por otro worker: pedir reintento en vez de frenar el event loop
+    logger.warning("Reset token store busy: %s", exc)
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Servicio temporalmente saturado, intente nuevamente",
+        headers={"Retry-After": "1"},
+    )
 
 
 class UsersService:
     def __init__(self, repo: UsersRepository | None = None):
         self.repo = repo or UsersRepository()
 
-    async def list_users(self) -> list[UserOut]:
+    async def list_users(self, fields: str | None = None) -> list[UserOut] | list[dict]:
+        select = parse_fields(fields, USER_PUBLIC_FIELDS)
+        if select:
+            return partial_rows(UserParcialOut, await self.repo.list_users(select=select))
         rows = await self.repo.list_users()
         return [UserOut(**row) for row in rows]
 
     async def create_user(self, payload: UserCreate) -> UserOut:
         # 1) Validación de duplicado (case-insensitive)
-        existing = await self.repo.get_by_username_ci(payload.user)
-        if existing:
+        if await self.repo.username_exists(payload.user):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail=f"El usuario '{payload.user}' ya existe."
@@ -33,13 +48,18 @@ class UsersService:
         allowed = {"user", "email", "psswd"}
         raw = payload.model_dump()  # pydantic v2
         sanitized = {k: v for k, v in raw.items() if k in allowed}
+        if sanitized.get("psswd"):
+            sanitized["psswd"] = await hash_password(sanitized["psswd"])
         created = await self.repo.create_user(sanitized)
         return UserOut(**created)
 
-    async def get_user(self, user_id: int) -> UserOut:
-        row = await self.repo.get_by_id(user_id)
+    async def get_user(self, user_id: int, fields: str | None = None) -> UserOut | dict:
+        select = parse_fields(fields, USER_PUBLIC_FIELDS)
+        row = await self.repo.get_by_id(user_id, select=select or USER_PUBLIC_SELECT)
         if not row:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
+        if select:
+            return partial_rows(UserParcialOut, [row])[0]
         return UserOut(**row)
 
     async def update_user(self, user_id: int, payload: UserUpdate | UserCreate) -> UserOut:
@@ -47,6 +67,8 @@ class UsersService:
         allowed = {"user", "email", "psswd"}
         raw = payload.model_dump()
         sanitized: dict[str, Any] = {k: v for k, v in raw.items() if k in allowed and v is not None}
+        if sanitized.get("psswd"):
+            sanitized["psswd"] = await hash_password(sanitized["psswd"])
 
         updated = await self.repo.update_user(user_id, sanitized)
         # repo may return a list when Prefer=return=representation is used
@@ -68,23 +90,28 @@ class UsersService:
         if not user_row:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="User not found")
 
-        stored = user_row.get("psswd")
-        # Simple password compare (replace with secure compare + hashing)
-        if stored is None or stored != psswd:
+        # Verificación scrypt fuera del event loop (acepta valores legados en texto plano)
+        ok, needs_rehash = await verify_password(psswd, user_row.get("psswd"))
+        if not ok:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+        if needs_rehash:
+            # Migrar a hash con los parámetros actuales; no bloquear el login si falla
+            try:
+                await self.repo.update_password(int(user_row["id"]), await hash_password(psswd))
+            except Exception as e:
+                logger.warning("No se pudo re-hashear la contraseña del usuario %s: %s", user_row.get('id'), e)
 
-        # Crear token HMAC simple (no dependencia externa)
-        import time, hmac, hashlib, base64
-        secret = hashlib.sha256(str(time.time()).encode()).hexdigest()
-        payload = f"{user_row.get('id')}:{user_row.get('user')}:{int(time.time())}"
-        sig = hmac.new(secret.encode(), payload.encode(), hashlib.sha256).digest()
-        token = base64.urlsafe_b64encode(payload.encode() + b"." + sig).decode()
+        # Token firmado con clave fija (verificable con app.core.auth_tokens)
+        token, expires_in = issue_token(int(user_row["id"]), str(user_row.get("user", "")))
+        public_user = {k: v for k, v in user_row.items() if k != "psswd"}
 
-        return {"access_token": token, "token_type": "bearer", "user": user_row}
+        return {"access_token": token, "token_type": "bearer", "expires_in": expires_in, "user": public_user}
 
-    def __init__(self, repo: UsersRepository | None = None):
+    def __init__(self, repo: UsersRepository | None = None, reset_tokens: ResetTokenStore | None = None):
         self.repo = repo or UsersRepository()
         self.supabase = SupabaseClient()  # 🆕 Cliente de Supabase
+        # 🔐 Tokens de reset: en memoria o SQLite compartido entre workers (RESET_TOKEN_BACKEND)
+        self.reset_tokens = reset_tokens or get_reset_token_store()
 
     # 🆕 ====================================================================
     # MÉTODOS PARA RECUPERACIÓN DE CONTRASEÑA
@@ -110,18 +137,18 @@ class UsersService:
             token = secrets.token_urlsafe(32)
             
             # 3. Guardar token con metadata y expiración
-            _reset_tokens[token] = {
+            ttl = settings.RESET_TOKEN_TTL_SECONDS
+            expires_at = self.reset_tokens.put(token, {
                 "user_id": user["id"],
                 "email": email,
                 "username": user.get("user", ""),
-                "created_at": datetime.now(),
-                "expires": datetime.now() + timedelta(hours=1)
-            }
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }, ttl)
             
             # 4. Construir link de recuperación usando FRONTEND_URL (si está configurada)
             #    - Define FRONTEND_URL en app/settings.env, por ejemplo:
             #      FRONTEND_URL=http://localhost:61804
-            frontend = os.getenv('FRONTEND_URL', 'http://localhost:52802').rstrip('/')
+            frontend = settings.FRONTEND_URL.rstrip('/')
             reset_link = f"{frontend}/#/password-reset?token={token}"
             
             # 5. 📧 ENVIAR EMAIL CON SUPABASE
@@ -133,32 +160,30 @@ class UsersService:
                     username=user.get("user", "Usuario"),
                     reset_link=reset_link
                 )
-                print(f"✅ Email enviado exitosamente a {email}")
+                logger.info("Email enviado exitosamente a %s", email)
             except Exception as e:
-                print(f"⚠️ Error enviando email: {str(e)}")
+                logger.warning("Error enviando email: %s", e)
                 # Continuar aunque falle el email (para debugging)
             
-            # 6. Log para desarrollo
-            print(f"\n{'='*60}")
-            print(f"🔑 RECUPERACIÓN DE CONTRASEÑA")
-            print(f"{'='*60}")
-            print(f"📧 Email: {email}")
-            print(f"👤 Usuario: {user.get('user', 'N/A')}")
-            print(f"🔐 Token: {token}")
-            print(f"🔗 Link: {reset_link}")
-            print(f"⏰ Expira: {_reset_tokens[token]['expires'].strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"{'='*60}\n")
+            # 6. Log para desarrollo (el link contiene el token: solo en DEBUG)
+            logger.debug(
+                "Recuperación de contraseña: email=%s usuario=%s link=%s expira=%s",
+                email, user.get("user", "N/A"), reset_link,
+                datetime.fromtimestamp(expires_at).strftime("%Y-%m-%d %H:%M:%S"),
+            )
             
             return {
                 "message": base_message,
                 # En desarrollo, también retornar el token para facilitar testing
                 "token": token,
                 "reset_link": reset_link,
-                "expires_in_seconds": 3600
+                "expires_in_seconds": ttl
             }
             
+        except ResetTokenStoreBusy as e:
+            raise _store_busy(e)
         except Exception as e:
-            print(f"❌ Error en request_password_reset: {str(e)}")
+            logger.error("Error en request_password_reset: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error al procesar la solicitud"
@@ -171,31 +196,24 @@ class UsersService:
         Raises:
             HTTPException 400: Si el token es inválido o expiró
         """
-        # Verificar que el token existe
-        if token not in _reset_tokens:
+        # El store solo devuelve tokens existentes y no expirados
+        try:
+            token_data = self.reset_tokens.get(token)
+        except ResetTokenStoreBusy as e:
+            raise _store_busy(e)
+        if token_data is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Token inválido o expirado"
             )
         
-        token_data = _reset_tokens[token]
-        
-        # Verificar expiración
-        if datetime.now() > token_data["expires"]:
-            # Limpiar token expirado
-            del _reset_tokens[token]
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Token expirado. Solicita uno nuevo."
-            )
-        
         # Token válido
         return {
             "valid": True,
             "email": token_data["email"],
             "user_id": token_data["user_id"],
             "username": token_data.get("username", ""),
-            "expires_at": token_data["expires"].isoformat()
+            "expires_at": datetime.fromtimestamp(token_data["expires_at"], timezone.utc).isoformat()
         }
 
     async def reset_password_with_token(self, token: str, new_password: str) -> dict:
@@ -203,37 +221,50 @@ class UsersService:
         Resetea la contraseña usando un token válido.
         
         Pasos:
-        1. Valida el token
-        2. Actualiza la contraseña en la BD
-        3. Elimina el token usado (un solo uso)
+        1. Valida la contraseña
+        2. Consume el token de forma atómica (un solo uso, aun entre workers)
+        3. Actualiza la contraseña en la BD (si falla, el token se restaura)
         
         Raises:
             HTTPException 400: Si el token es inválido o la contraseña no cumple requisitos
             HTTPException 500: Si falla la actualización en la BD
         """
         try:
-            # 1. Validar token (lanza HTTPException si es inválido)
-            token_data = await self.validate_reset_token(token)
-            user_id = token_data["user_id"]
-            
-            # 2. Validar contraseña (mínimo 6 caracteres)
+            # 1. Validar contraseña (mínimo 6 caracteres)
             if not new_password or len(new_password) < 6:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail="La contraseña debe tener al menos 6 caracteres"
                 )
-            
+
+            # 2. Consumir token (atómico: dos requests concurrentes no pueden usarlo)
+            token_data = self.reset_tokens.consume(token)
+            if token_data is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Token inválido o expirado"
+                )
+            user_id = token_data["user_id"]
+
             # 3. Actualizar contraseña en la BD
-            await self.repo.update_password(
-                user_id=user_id,
-                new_password=new_password
-            )
-            
-            # 4. Eliminar token usado (un solo uso)
-            del _reset_tokens[token]
+            try:
+                await self.repo.update_password(
+                    user_id=user_id,
+                    new_password=await hash_password(new_password)
+                )
+            except Exception:
+                # Restaurar el token para permitir reintentar
+                expires_at = token_data.pop("expires_at")
+                remaining = expires_at - datetime.now(timezone.utc).timestamp()
+                if remaining > 0:
+                    try:
+                        self.reset_tokens.put(token, token_data, remaining)
+                    except ResetTokenStoreBusy:
+                        logger.warning("No se pudo restaurar el token de reset (store ocupado)")
+                raise
             
-            # 5. Log de éxito
-            print(f"✅ Contraseña actualizada para usuario ID: {user_id}")
+            # 4. Log de éxito
+            logger.info("Contraseña actualizada para usuario ID: %s", user_id)
             
             return {
                 "message": "Contraseña actualizada exitosamente",
@@ -243,9 +274,11 @@ class UsersService:
         except HTTPException:
             # Re-lanzar excepciones HTTP tal cual
             raise
+        except ResetTokenStoreBusy as e:
+            raise _store_busy(e)
         except Exception as e:
             # Errores inesperados
-            print(f"❌ Error en reset_password_with_token: {str(e)}")
+            logger.error("Error en reset_password_with_token: %s", e)
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Error al resetear la contraseña"
@@ -255,29 +288,23 @@ class UsersService:
         """
         Limpia tokens expirados del almacenamiento.
         
-        Útil para ejecutar periódicamente (ej: cada hora con un cron job).
-        Retorna la cantidad de tokens eliminados.
+        El barrido periódico ya corre en segundo plano (ver app.main); esto
+        permite forzarlo. Retorna la cantidad de tokens eliminados.
         """
-        now = datetime.now()
-        expired_tokens = [
-            token for token, data in _reset_tokens.items()
-            if data["expires"] < now
-        ]
-        
-        for token in expired_tokens:
-            del _reset_tokens[token]
-        
-        if expired_tokens:
-            print(f"🧹 Limpiados {len(expired_tokens)} tokens expirados")
-        
-        return len(expired_tokens)
+        removed = self.reset_tokens.sweep()
+        if removed:
+            logger.info("Limpiados %s tokens expirados", removed)
+        return removed
 
     async def get_active_reset_tokens_count(self) -> int:
         """
         Retorna la cantidad de tokens activos (para debugging).
         """
-        return len(_reset_tokens)
+        return self.reset_tokens.count()
 
-    async def get_users_by_ids(self, ids: list[int]) -> list[UserOut]:
+    async def get_users_by_ids(self, ids: list[int], fields: str | None = None) -> list[UserOut] | list[dict]:
+        select = parse_fields(fields, USER_PUBLIC_FIELDS)
+        if select:
+            return partial_rows(UserParcialOut, await self.repo.get_by_ids(ids, select=select))
         rows = await self.repo.get_by_ids(ids)
         return [UserOut(**row) for row in rows]
\ No newline at end of file
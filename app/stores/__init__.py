@@ -0,0 +1,32 @@
+"""stores package
+
+Local stores (in-memory or SQLite) that sit next to Supabase to avoid
+repeating expensive upstream queries.
+"""
+
+from .cluster_store import ClusterIndex
+from .density_store import DensityGrid
+from .nearby_store import PointGrid
+from .rate_limit_store import RateLimitStore, get_rate_limit_store
+from .replica_store import ReplicaStore
+from .reset_token_store import ResetTokenStore, ResetTokenStoreBusy, get_reset_token_store
+from .rollup_store import RollupStore, get_rollup_store
+from .search_store import SearchIndex
+from .timeline_store import TimelineStore, get_timeline_store
+
+__all__ = [
+    "ClusterIndex",
+    "DensityGrid",
+    "PointGrid",
+    "RateLimitStore",
+    "ReplicaStore",
+    "ResetTokenStore",
+    "ResetTokenStoreBusy",
+    "RollupStore",
+    "SearchIndex",
+    "TimelineStore",
+    "get_rate_limit_store",
+    "get_reset_token_store",
+    "get_rollup_store",
+    "get_timeline_store",
+]
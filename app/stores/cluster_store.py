@@ -0,0 +1,138 @@
+"""Zoom-aware hierarchical clustering of report points for map markers.
+
+Points are projected to Web Mercator ([0, 1] on both axes). For every zoom
+from min_zoom to max_zoom the plane is split into square cells of `radius`
+pixels (on 512-pixel tiles, as in supercluster) and each cell keeps
+[count, sum_x, sum_y, sum_id]: the cluster is drawn at the centroid and, when
+count is 1, sum_id is the id of its only point. Adding or removing a point
+touches one cell per zoom, so writes are applied incrementally instead of
+rebuilding the hierarchy. Above max_zoom the individual points are returned.
+
+A query walks only the cells under the bbox, so its cost and response size
+depend on the screen size and radius, not on how many reportes exist.
+"""
+from typing import Dict, List, Optional, Set, Tuple
+import math
+
+EXTENT = 512
+MAX_LATITUDE = 85.05112878
+
+Cell = Tuple[int, int]
+
+
+def project(lat: float, lon: float) -> Tuple[float, float]:
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    sin = math.sin(math.radians(lat))
+    y = 0.5 - 0.25 * math.log((1 + sin) / (1 - sin)) / math.pi
+    return lon / 360 + 0.5, min(1.0, max(0.0, y))
+
+
+def unproject(x: float, y: float) -> Tuple[float, float]:
+    lat = 360 * math.atan(math.exp((180 - y * 360) * math.pi / 180)) / math.pi - 90
+    return lat, (x - 0.5) * 360
+
+
+class ClusterIndex:
+    def __init__(self, min_zoom: int = 0, max_zoom: int = 16, radius: float = 40):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self._sizes = [radius / (EXTENT * 2 ** z) for z in range(max_zoom + 1)]
+        self._cells: List[Dict[Cell, list]] = [{} for _ in range(max_zoom + 1)]
+        # Puntos individuales por celda de max_zoom (para zooms mayores)
+        self._leaves: Dict[Cell, Set[int]] = {}
+        self._points: Dict[int, Tuple[float, float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, x: float, y: float, zoom: int) -> Cell:
+        size = self._sizes[zoom]
+        return int(x / size), int(y / size)
+
+    def add(self, reporte_id: int, lat: float, lon: float) -> None:
+        """Add (or move) a point."""
+        self.remove(reporte_id)
+        x, y = project(lat, lon)
+        self._points[reporte_id] = (lat, lon, x, y)
+        for zoom in range(self.min_zoom, self.max_zoom + 1):
+            cell = self._cell(x, y, zoom)
+            entry = self._cells[zoom].get(cell)
+            if entry is None:
+                entry = self._cells[zoom][cell] = [0, 0.0, 0.0, 0]
+            entry[0] += 1
+            entry[1] += x
+            entry[2] += y
+            entry[3] += reporte_id
+        self._leaves.setdefault(self._cell(x, y, self.max_zoom), set()).add(reporte_id)
+
+    def remove(self, reporte_id: int) -> None:
+        point = self._points.pop(reporte_id, None)
+        if point is None:
+            return
+        _, _, x, y = point
+        for zoom in range(self.min_zoom, self.max_zoom + 1):
+            cell = self._cell(x, y, zoom)
+            entry = self._cells[zoom][cell]
+            if entry[0] == 1:
+                del self._cells[zoom][cell]
+                continue
+            entry[0] -= 1
+            entry[1] -= x
+            entry[2] -= y
+            entry[3] -= reporte_id
+        leaf = self._cell(x, y, self.max_zoom)
+        self._leaves[leaf].discard(reporte_id)
+        if not self._leaves[leaf]:
+            del self._leaves[leaf]
+
+    def _cells_in(self, cells: Dict, zoom: int, bbox: Tuple[float, float, float, float]):
+        min_lon, min_lat, max_lon, max_lat = bbox
+        x0, y0 = self._cell(*project(max_lat, min_lon), zoom)
+        x1, y1 = self._cell(*project(min_lat, max_lon), zoom)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) <= len(cells):
+            for cx in range(x0, x1 + 1):
+                for cy in range(y0, y1 + 1):
+                    value = cells.get((cx, cy))
+                    if value is not None:
+                        yield value
+        else:
+            for (cx, cy), value in cells.items():
+                if x0 <= cx <= x1 and y0 <= cy <= y1:
+                    yield value
+
+    def query(
+        self, bbox: Tuple[float, float, float, float], zoom: int
+    ) -> Tuple[int, List[Optional[int]], List[float], List[float], List[int]]:
+        """Clusters and single points under bbox (min_lon, min_lat, max_lon, max_lat).
+
+        Returns (zoom used, ids, lats, lons, counts) as parallel lists; ids is
+        None for clusters of more than one point.
+        """
+        zoom = max(self.min_zoom, min(zoom, self.max_zoom + 1))
+        ids: List[Optional[int]] = []
+        lats: List[float] = []
+        lons: List[float] = []
+        counts: List[int] = []
+        if zoom > self.max_zoom:
+            min_lon, min_lat, max_lon, max_lat = bbox
+            for leaf in self._cells_in(self._leaves, self.max_zoom, bbox):
+                for reporte_id in leaf:
+                    lat, lon, _, _ = self._points[reporte_id]
+                    if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon:
+                        ids.append(reporte_id)
+                        lats.append(lat)
+                        lons.append(lon)
+                        counts.append(1)
+            return zoom, ids, lats, lons, counts
+
+        for count, sum_x, sum_y, sum_id in self._cells_in(self._cells[zoom], zoom, bbox):
+            if count == 1:
+                lat, lon, _, _ = self._points[sum_id]
+                ids.append(sum_id)
+            else:
+                lat, lon = unproject(sum_x / count, sum_y / count)
+                ids.append(None)
+            lats.append(lat)
+            lons.append(lon)
+            counts.append(count)
+        return zoom, ids, lats, lons, counts
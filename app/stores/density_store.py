@@ -0,0 +1,97 @@
+"""Geohash density grid of reportes for heatmaps.
+
+For every configured geohash precision the grid keeps, per cell, counts keyed
+by (day ordinal, categoria, valido), so a query can filter by start day,
+categories and validity without touching individual reportes. The grid also
+remembers each reporte's current key, so an update or delete removes exactly
+what the reporte contributed before.
+
+In memory and per process: each worker builds its own grid from a scan of
+Reportes (see app/services/density_service.py).
+"""
+from typing import Collection, Dict, List, Sequence, Tuple
+
+from app.core import geohash
+
+# (day ordinal, categoria, valido); day 0 = sin fecha
+Key = Tuple[int, str, bool]
+
+
+class DensityGrid:
+    def __init__(self, precisions: Sequence[int]):
+        self.precisions = tuple(sorted(set(precisions)))
+        self._max_precision = self.precisions[-1]
+        self._cells: Dict[int, Dict[str, Dict[Key, int]]] = {p: {} for p in self.precisions}
+        self._bounds: Dict[str, Tuple[float, float, float, float]] = {}
+        # reporte_id -> (celda a la máxima precisión, key)
+        self._by_id: Dict[int, Tuple[str, Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def cell_count(self, precision: int) -> int:
+        return len(self._cells.get(precision, ()))
+
+    def add(self, reporte_id: int, lat: float, lon: float, day: int, categoria: str, valido: bool) -> None:
+        """Count (or move) a reporte; any previous contribution is removed first."""
+        self.remove(reporte_id)
+        cell = geohash.encode(lat, lon, self._max_precision)
+        key = (day, categoria, valido)
+        self._by_id[reporte_id] = (cell, key)
+        for precision in self.precisions:
+            counts = self._cells[precision].setdefault(cell[:precision], {})
+            counts[key] = counts.get(key, 0) + 1
+
+    def remove(self, reporte_id: int) -> None:
+        entry = self._by_id.pop(reporte_id, None)
+        if entry is None:
+            return
+        cell, key = entry
+        for precision in self.precisions:
+            prefix = cell[:precision]
+            counts = self._cells[precision].get(prefix)
+            if counts is None or key not in counts:
+                continue
+            if counts[key] > 1:
+                counts[key] -= 1
+            else:
+                del counts[key]
+                if not counts:
+                    del self._cells[precision][prefix]
+
+    def _cell_bounds(self, cell: str) -> Tuple[float, float, float, float]:
+        box = self._bounds.get(cell)
+        if box is None:
+            box = self._bounds[cell] = geohash.bounds(cell)
+        return box
+
+    def query(
+        self,
+        precision: int,
+        bbox: Tuple[float, float, float, float],
+        *,
+        min_day: int = 0,
+        categorias: Collection[str] | None = None,
+        solo_validos: bool = False,
+    ) -> Tuple[List[str], List[int]]:
+        """Counts of the cells that intersect bbox (min_lon, min_lat, max_lon, max_lat).
+
+        Returns parallel lists (cells, counts), sorted by cell, without empty cells.
+        """
+        min_lon, min_lat, max_lon, max_lat = bbox
+        found: List[Tuple[str, int]] = []
+        for cell, counts in self._cells[precision].items():
+            cell_min_lat, cell_min_lon, cell_max_lat, cell_max_lon = self._cell_bounds(cell)
+            if cell_min_lat > max_lat or cell_max_lat < min_lat or cell_min_lon > max_lon or cell_max_lon < min_lon:
+                continue
+            total = 0
+            for (day, categoria, valido), n in counts.items():
+                if day < min_day or (solo_validos and not valido):
+                    continue
+                if categorias and categoria not in categorias:
+                    continue
+                total += n
+            if total:
+                found.append((cell, total))
+        found.sort()
+        return [cell for cell, _ in found], [total for _, total in found]
@@ -0,0 +1,77 @@
+"""Uniform lat/lon grid of report points for radius and k-nearest queries.
+
+Each point lives in one cell of `cell_degrees` x `cell_degrees`; a query only
+visits the cells overlapping the search circle's bounding box (or, when that
+box spans more cells than are occupied, e.g. near the poles, walks the
+occupied cells instead), so its cost depends on how many reportes are near
+the point, not on the table size.
+Adding, moving or removing a point is O(1).
+"""
+from typing import Dict, Iterator, List, Set, Tuple
+import heapq
+import math
+
+from app.core.geo import degrees_around, haversine_m
+
+Cell = Tuple[int, int]
+
+
+class PointGrid:
+    def __init__(self, cell_degrees: float = 0.01):
+        self.cell_degrees = cell_degrees
+        self._cells: Dict[Cell, Set[int]] = {}
+        # reporte_id -> (lat, lon, day ordinal; 0 = sin fecha)
+        self._points: Dict[int, Tuple[float, float, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, lat: float, lon: float) -> Cell:
+        return math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees)
+
+    def add(self, reporte_id: int, lat: float, lon: float, day: int = 0) -> None:
+        """Add (or move) a point."""
+        self.remove(reporte_id)
+        self._points[reporte_id] = (lat, lon, day)
+        self._cells.setdefault(self._cell(lat, lon), set()).add(reporte_id)
+
+    def remove(self, reporte_id: int) -> None:
+        point = self._points.pop(reporte_id, None)
+        if point is None:
+            return
+        cell = self._cell(point[0], point[1])
+        members = self._cells[cell]
+        members.discard(reporte_id)
+        if not members:
+            del self._cells[cell]
+
+    def _cells_in(self, lat0: int, lon0: int, lat1: int, lon1: int) -> Iterator[Set[int]]:
+        # Cerca de los polos el rango abarca muchísimas celdas: recorrer entonces las ocupadas
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) <= len(self._cells):
+            for cell_lat in range(lat0, lat1 + 1):
+                for cell_lon in range(lon0, lon1 + 1):
+                    members = self._cells.get((cell_lat, cell_lon))
+                    if members:
+                        yield members
+        else:
+            for (cell_lat, cell_lon), members in self._cells.items():
+                if lat0 <= cell_lat <= lat1 and lon0 <= cell_lon <= lon1:
+                    yield members
+
+    def nearest(
+        self, lat: float, lon: float, radius_m: float, k: int, *, min_day: int = 0
+    ) -> List[Tuple[float, int]]:
+        """Up to k (distance_m, reporte_id) within radius_m, closest first."""
+        dlat, dlon = degrees_around(lat, radius_m)
+        lat0, lon0 = self._cell(lat - dlat, lon - dlon)
+        lat1, lon1 = self._cell(lat + dlat, lon + dlon)
+        found: List[Tuple[float, int]] = []
+        for members in self._cells_in(lat0, lon0, lat1, lon1):
+            for reporte_id in members:
+                point_lat, point_lon, day = self._points[reporte_id]
+                if day < min_day or abs(point_lat - lat) > dlat or abs(point_lon - lon) > dlon:
+                    continue
+                distance = haversine_m(lat, lon, point_lat, point_lon)
+                if distance <= radius_m:
+                    found.append((distance, reporte_id))
+        return heapq.nsmallest(k, found)
@@ -0,0 +1,135 @@
+"""Token buckets for per-client rate limiting.
+
+A bucket holds up to `burst` tokens and refills at `rate` tokens per second;
+each request takes one. Two backends:
+- MemoryRateLimitStore: per process, LRU-bounded number of buckets. With N
+  uvicorn workers a client effectively gets N times the configured rate.
+- SQLiteRateLimitStore: a local SQLite file shared by every worker on the
+  host, so the limit holds regardless of which worker serves the request.
+  Each take is one BEGIN IMMEDIATE transaction with a short busy timeout:
+  it runs on the event loop, so when the file stays locked longer than that
+  the request is let through (fail open) instead of stalling the worker.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+import logging
+import sqlite3
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima por el lock del archivo antes de dejar pasar la request
+SQLITE_BUSY_TIMEOUT = 0.05
+
+
+class RateLimitStore(ABC):
+    @abstractmethod
+    def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        """Take one token from key's bucket.
+
+        Returns (allowed, retry_after_seconds); retry_after is 0 when allowed.
+        """
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> float:
+    return min(burst, tokens + (now - updated) * rate)
+
+
+def _decide(tokens: float, rate: float) -> tuple[bool, float, float]:
+    """Return (allowed, tokens_left, retry_after) for a bucket holding `tokens`."""
+    if tokens >= 1.0:
+        return True, tokens - 1.0, 0.0
+    return False, tokens, (1.0 - tokens) / rate if rate > 0 else float("inf")
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        tokens = burst if bucket is None else _refill(bucket[0], bucket[1], now, rate, burst)
+        allowed, tokens, retry_after = _decide(tokens, rate)
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        # Los buckets menos usados se descartan (equivalen a un bucket lleno)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+
+class SQLiteRateLimitStore(RateLimitStore):
+    def __init__(self, path: str, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rate_buckets (
+                key TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS rate_buckets_updated_idx ON rate_buckets (updated);
+            """
+        )
+        # Creado el esquema, cada take espera poco por el lock
+        self._conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+
+    def take(self, key: str, rate: float, burst: float) -> tuple[bool, float]:
+        # Reloj de pared: se comparte entre procesos
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as exc:
+                # Archivo bloqueado por otro worker: no frenar el event loop
+                logger.warning("Rate limit store busy, letting request through: %s", exc)
+                return True, 0.0
+            try:
+                row = self._conn.execute("SELECT tokens, updated FROM rate_buckets WHERE key = ?", (key,)).fetchone()
+                tokens = burst if row is None else _refill(row[0], row[1], now, rate, burst)
+                allowed, tokens, retry_after = _decide(tokens, rate)
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO rate_buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                    (key, tokens, now),
+                )
+                self._writes += 1
+                if self._writes % 1000 == 0:
+                    self._prune(now)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return allowed, retry_after
+
+    def _prune(self, now: float) -> None:
+        # Buckets sin uso en 10 minutos ya están llenos: borrarlos no cambia nada
+        self._conn.execute("DELETE FROM rate_buckets WHERE updated < ?", (now - 600,))
+        excess = self._conn.execute("SELECT COUNT(*) FROM rate_buckets").fetchone()[0] - self.max_keys
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM rate_buckets WHERE key IN (SELECT key FROM rate_buckets ORDER BY updated LIMIT ?)",
+                (excess,),
+            )
+
+
+_rate_limit_store: RateLimitStore | None = None
+
+
+def get_rate_limit_store() -> RateLimitStore:
+    global _rate_limit_store
+    if _rate_limit_store is None:
+        if settings.RATE_LIMIT_BACKEND == "sqlite":
+            _rate_limit_store = SQLiteRateLimitStore(settings.RATE_LIMIT_SQLITE_PATH, settings.RATE_LIMIT_MAX_KEYS)
+        else:
+            _rate_limit_store = MemoryRateLimitStore(settings.RATE_LIMIT_MAX_KEYS)
+    return _rate_limit_store
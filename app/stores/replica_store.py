@@ -0,0 +1,242 @@
+"""Columnar in-memory copy of the Reportes table.
+
+Rows live column-wise: one list per column, addressed by a slot number, plus
+an id -> slot map. Deleted slots are cleared and reused. Two kinds of helper
+structures are kept up to date on every write:
+- hash indexes for INDEXED_COLUMNS (value -> slots), used by equality filters;
+- sorted views, created on first use for each ORDER BY column list and then
+  maintained with bisect, so ordered pages do not sort the whole table.
+
+`query` mimics the subset of PostgREST used by ReportesRepository and returns
+None for anything it cannot answer exactly (embedded selects, unknown
+columns, mixed sort directions, ...), so the caller can fall back to
+Supabase. Synchronization lives in app/repositories/reportes_replica.py.
+"""
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Collection, Dict, Iterable, List, Mapping, Tuple
+
+INDEXED_COLUMNS = ("user_id",)
+
+SortKey = Tuple[Tuple[bool, Any], ...]
+
+
+def parse_select(select: str) -> List[str] | None:
+    """Column list of a plain select ([] means all columns); None if unsupported."""
+    select = (select or "*").strip()
+    if select == "*":
+        return []
+    names = [name.strip() for name in select.split(",")]
+    if not all(name.isidentifier() for name in names):
+        return None
+    return names
+
+
+def parse_order(order: str | None) -> Tuple[Tuple[str, ...], bool] | None:
+    """("col1,col2", descending) for orders with a single direction; None if unsupported."""
+    if not order:
+        return (), False
+    columns: List[str] = []
+    directions = set()
+    for part in order.split(","):
+        name, _, direction = part.strip().partition(".")
+        if not name.isidentifier() or direction not in ("", "asc", "desc"):
+            return None
+        columns.append(name)
+        directions.add(direction == "desc")
+    if len(directions) != 1:
+        return None
+    return tuple(columns), directions.pop()
+
+
+def _null_key(value: Any) -> Tuple[bool, Any]:
+    # NULLs al final en orden ascendente (y al principio en descendente), como Postgres
+    return value is None, value
+
+
+class ReplicaStore:
+    def __init__(self, max_sorted_views: int = 8):
+        self.max_sorted_views = max_sorted_views
+        self.version = 0
+        self._capacity = 0
+        self._columns: Dict[str, list] = {"id": []}
+        self._slots: Dict[int, int] = {}
+        self._free: List[int] = []
+        self._indexes: Dict[str, Dict[Any, set]] = {name: {} for name in INDEXED_COLUMNS}
+        self._views: Dict[Tuple[str, ...], List[Tuple[SortKey, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _sort_key(self, columns: Tuple[str, ...], slot: int) -> SortKey:
+        return tuple(_null_key(self._columns[name][slot]) for name in columns)
+
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        for column in self._columns.values():
+            column.append(None)
+        self._capacity += 1
+        return self._capacity - 1
+
+    def _link(self, slot: int) -> None:
+        for name, index in self._indexes.items():
+            index.setdefault(self._columns[name][slot] if name in self._columns else None, set()).add(slot)
+        for columns, view in list(self._views.items()):
+            try:
+                insort(view, (self._sort_key(columns, slot), slot))
+            except TypeError:
+                # Tipos mezclados en la columna: esa vista deja de existir
+                del self._views[columns]
+
+    def _unlink(self, slot: int) -> None:
+        for name, index in self._indexes.items():
+            value = self._columns[name][slot] if name in self._columns else None
+            members = index.get(value)
+            if members is not None:
+                members.discard(slot)
+                if not members:
+                    del index[value]
+        for columns, view in self._views.items():
+            entry = (self._sort_key(columns, slot), slot)
+            position = bisect_left(view, entry)
+            if position < len(view) and view[position] == entry:
+                del view[position]
+
+    def upsert(self, row: Mapping[str, Any]) -> None:
+        reporte_id = row["id"]
+        slot = self._slots.get(reporte_id)
+        if slot is None:
+            slot = self._allocate()
+            self._slots[reporte_id] = slot
+        else:
+            self._unlink(slot)
+        for name, value in row.items():
+            column = self._columns.get(name)
+            if column is None:
+                column = self._columns[name] = [None] * self._capacity
+            column[slot] = value
+        self._link(slot)
+        self.version += 1
+
+    def delete(self, reporte_id: int) -> None:
+        slot = self._slots.pop(reporte_id, None)
+        if slot is None:
+            return
+        self._unlink(slot)
+        for column in self._columns.values():
+            column[slot] = None
+        self._free.append(slot)
+        self.version += 1
+
+    def _names(self, select: str) -> List[str] | None:
+        names = parse_select(select)
+        if names is None or not all(name in self._columns for name in names):
+            return None
+        return names or list(self._columns)
+
+    def _row(self, slot: int, names: Iterable[str]) -> Dict[str, Any]:
+        return {name: self._columns[name][slot] for name in names}
+
+    def get(self, reporte_id: int, select: str = "*") -> Dict[str, Any] | None:
+        names = self._names(select)
+        slot = self._slots.get(reporte_id)
+        if names is None or slot is None:
+            return None
+        return self._row(slot, names)
+
+    def contains(self, reporte_id: int) -> bool:
+        return reporte_id in self._slots
+
+    def _view(self, columns: Tuple[str, ...]) -> List[Tuple[SortKey, int]] | None:
+        view = self._views.get(columns)
+        if view is None and len(self._views) < self.max_sorted_views:
+            try:
+                view = sorted((self._sort_key(columns, slot), slot) for slot in self._slots.values())
+            except TypeError:
+                return None
+            self._views[columns] = view
+        return view
+
+    def query(
+        self,
+        select: str = "*",
+        *,
+        order: str | None = None,
+        limit: int | None = None,
+        offset: int | None = 0,
+        equals: Mapping[str, Collection[Any]] | None = None,
+        at_least: Mapping[str, Any] | None = None,
+        beyond: Tuple[Any, ...] | None = None,
+    ) -> List[Dict[str, Any]] | None:
+        """Rows matching the filters, in `order` ("col.asc,col2.asc" / "col.desc").
+
+        equals: column -> allowed values (eq/in). at_least: column -> minimum
+        (gte; NULLs never match). beyond: values of the order columns; only
+        rows strictly after them in the requested order are returned (keyset
+        pagination). Returns None when the query cannot be answered here.
+        """
+        names = self._names(select)
+        parsed = parse_order(order)
+        if names is None or parsed is None:
+            return None
+        order_columns, descending = parsed
+        equals = equals or {}
+        at_least = at_least or {}
+        if not all(name in self._columns for name in (*order_columns, *equals, *at_least)):
+            return None
+        if beyond is not None and len(beyond) != len(order_columns):
+            return None
+
+        def matches(slot: int) -> bool:
+            for name, allowed in equals.items():
+                if self._columns[name][slot] not in allowed:
+                    return False
+            for name, minimum in at_least.items():
+                value = self._columns[name][slot]
+                if value is None or value < minimum:
+                    return False
+            return True
+
+        beyond_key = tuple(_null_key(v) for v in beyond) if beyond is not None else None
+        try:
+            indexed = next((name for name in equals if name == "id" or name in self._indexes), None)
+            if indexed is not None:
+                # Pocos candidatos (por id o p. ej. reportes de ciertos usuarios): se ordenan aparte
+                if indexed == "id":
+                    candidates = {self._slots[v] for v in equals["id"] if v in self._slots}
+                else:
+                    candidates = set()
+                    for value in equals[indexed]:
+                        candidates.update(self._indexes[indexed].get(value, ()))
+                keyed = [(self._sort_key(order_columns, slot), slot) for slot in candidates]
+                if beyond_key is not None:
+                    keyed = [e for e in keyed if (e[0] < beyond_key if descending else e[0] > beyond_key)]
+                keyed.sort(reverse=descending)
+                slots: Iterable[int] = (slot for _, slot in keyed)
+            elif order_columns:
+                view = self._view(order_columns)
+                if view is None:
+                    return None
+                if descending:
+                    end = bisect_left(view, (beyond_key, -1)) if beyond_key is not None else len(view)
+                    slots = (view[i][1] for i in range(end - 1, -1, -1))
+                else:
+                    start = bisect_right(view, (beyond_key, float("inf"))) if beyond_key is not None else 0
+                    slots = (view[i][1] for i in range(start, len(view)))
+            else:
+                slots = list(self._slots.values())
+
+            skip = offset or 0
+            found: List[int] = []
+            for slot in slots:
+                if not matches(slot):
+                    continue
+                if skip:
+                    skip -= 1
+                    continue
+                found.append(slot)
+                if limit is not None and len(found) >= limit:
+                    break
+        except TypeError:
+            return None
+        return [self._row(slot, names) for slot in found]
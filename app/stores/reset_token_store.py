@@ -0,0 +1,230 @@
+"""Single-use, expiring password-reset tokens.
+
+Two backends:
+- MemoryResetTokenStore: per process; expiry kept in a min-heap so sweeping
+  costs O(k log n) for k expired tokens, and the number of live tokens is
+  capped (earliest-expiring tokens are evicted first under floods).
+- SQLiteResetTokenStore: a local SQLite file shared by every uvicorn worker on
+  the host, so a reset link works whichever worker receives it. `consume` is
+  atomic across processes (BEGIN IMMEDIATE). Calls run on the event loop, so
+  they wait at most SQLITE_BUSY_TIMEOUT for another worker's write lock and
+  then raise ResetTokenStoreBusy instead of stalling the worker.
+
+Token data must be JSON-serializable; stores add an `expires_at` epoch field.
+"""
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import Any, Dict
+import asyncio
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima por el lock del archivo antes de rendirse
+SQLITE_BUSY_TIMEOUT = 0.05
+
+
+class ResetTokenStoreBusy(Exception):
+    """The shared token file stayed locked by another worker; retry later."""
+
+
+class ResetTokenStore(ABC):
+    @abstractmethod
+    def put(self, token: str, data: Dict[str, Any], ttl_seconds: float) -> float:
+        """Store token and return its expiry (epoch seconds)."""
+
+    @abstractmethod
+    def get(self, token: str) -> Dict[str, Any] | None:
+        """Return the token data if it exists and has not expired."""
+
+    @abstractmethod
+    def consume(self, token: str) -> Dict[str, Any] | None:
+        """Atomically remove and return a live token (single use)."""
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Delete expired tokens; returns how many were removed."""
+
+    @abstractmethod
+    def count(self) -> int: ...
+
+
+class MemoryResetTokenStore(ResetTokenStore):
+    def __init__(self, max_tokens: int = 10_000):
+        self.max_tokens = max_tokens
+        self._tokens: Dict[str, Dict[str, Any]] = {}
+        self._heap: list[tuple[float, str]] = []
+
+    def put(self, token: str, data: Dict[str, Any], ttl_seconds: float) -> float:
+        expires_at = time.time() + ttl_seconds
+        if len(self._tokens) >= self.max_tokens:
+            self.sweep()
+        while len(self._tokens) >= self.max_tokens and self._heap:
+            _, oldest = heapq.heappop(self._heap)
+            self._tokens.pop(oldest, None)
+        self._tokens[token] = {**data, "expires_at": expires_at}
+        heapq.heappush(self._heap, (expires_at, token))
+        return expires_at
+
+    def get(self, token: str) -> Dict[str, Any] | None:
+        data = self._tokens.get(token)
+        if data is None:
+            return None
+        if data["expires_at"] <= time.time():
+            del self._tokens[token]
+            return None
+        return dict(data)
+
+    def consume(self, token: str) -> Dict[str, Any] | None:
+        data = self._tokens.pop(token, None)
+        if data is None or data["expires_at"] <= time.time():
+            return None
+        return data
+
+    def sweep(self) -> int:
+        now = time.time()
+        removed = 0
+        while self._heap and self._heap[0][0] <= now:
+            expires_at, token = heapq.heappop(self._heap)
+            data = self._tokens.get(token)
+            # Entradas del heap de tokens ya consumidos se descartan sin contar
+            if data is not None and data["expires_at"] == expires_at:
+                del self._tokens[token]
+                removed += 1
+        # Compactar el heap si quedó lleno de entradas huérfanas
+        if len(self._heap) > 2 * len(self._tokens) + 64:
+            self._heap = [(d["expires_at"], t) for t, d in self._tokens.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def count(self) -> int:
+        return len(self._tokens)
+
+
+class SQLiteResetTokenStore(ResetTokenStore):
+    def __init__(self, path: str, max_tokens: int = 10_000):
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reset_tokens (
+                token TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reset_tokens_expires_idx ON reset_tokens (expires_at);
+            """
+        )
+        # Creado el esquema, cada operación espera poco por el lock
+        self._conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+
+    @contextmanager
+    def _tx(self):
+        with self._lock:
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as exc:
+                raise ResetTokenStoreBusy(str(exc)) from exc
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _trim(self, keep: int) -> int:
+        """Within a transaction: drop expired tokens, then the soonest-expiring beyond `keep`."""
+        removed = self._conn.execute(
+            "DELETE FROM reset_tokens WHERE expires_at <= ?", (time.time(),)
+        ).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM reset_tokens").fetchone()[0] - keep
+        if excess > 0:
+            removed += self._conn.execute(
+                "DELETE FROM reset_tokens WHERE token IN ("
+                " SELECT token FROM reset_tokens ORDER BY expires_at LIMIT ?)",
+                (excess,),
+            ).rowcount
+        return removed
+
+    def put(self, token: str, data: Dict[str, Any], ttl_seconds: float) -> float:
+        expires_at = time.time() + ttl_seconds
+        with self._tx():
+            # Mismo tope que MemoryResetTokenStore: el archivo no crece entre barridos
+            count = self._conn.execute("SELECT COUNT(*) FROM reset_tokens").fetchone()[0]
+            if count >= self.max_tokens:
+                self._trim(self.max_tokens - 1)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO reset_tokens (token, data, expires_at) VALUES (?, ?, ?)",
+                (token, json.dumps(data), expires_at),
+            )
+        return expires_at
+
+    def get(self, token: str) -> Dict[str, Any] | None:
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT data, expires_at FROM reset_tokens WHERE token = ? AND expires_at > ?",
+                    (token, time.time()),
+                ).fetchone()
+            except sqlite3.OperationalError as exc:
+                raise ResetTokenStoreBusy(str(exc)) from exc
+        return {**json.loads(row[0]), "expires_at": row[1]} if row else None
+
+    def consume(self, token: str) -> Dict[str, Any] | None:
+        with self._tx():
+            row = self._conn.execute(
+                "SELECT data, expires_at FROM reset_tokens WHERE token = ?", (token,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute("DELETE FROM reset_tokens WHERE token = ?", (token,))
+        if row[1] <= time.time():
+            return None
+        return {**json.loads(row[0]), "expires_at": row[1]}
+
+    def sweep(self) -> int:
+        with self._tx():
+            return self._trim(self.max_tokens)
+
+    def count(self) -> int:
+        with self._lock:
+            try:
+                return self._conn.execute(
+                    "SELECT COUNT(*) FROM reset_tokens WHERE expires_at > ?", (time.time(),)
+                ).fetchone()[0]
+            except sqlite3.OperationalError as exc:
+                raise ResetTokenStoreBusy(str(exc)) from exc
+
+
+async def run_sweeper(store: ResetTokenStore, interval_seconds: float) -> None:
+    """Background task: periodically delete expired tokens."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            removed = store.sweep()
+            if removed:
+                logger.info("Removed %s expired reset tokens", removed)
+        except Exception:
+            logger.exception("Reset token sweep failed")
+
+
+_reset_token_store: ResetTokenStore | None = None
+
+
+def get_reset_token_store() -> ResetTokenStore:
+    global _reset_token_store
+    if _reset_token_store is None:
+        if settings.RESET_TOKEN_BACKEND == "sqlite":
+            _reset_token_store = SQLiteResetTokenStore(settings.RESET_TOKEN_SQLITE_PATH, settings.RESET_TOKEN_MAX)
+        else:
+            _reset_token_store = MemoryResetTokenStore(settings.RESET_TOKEN_MAX)
+    return _reset_token_store
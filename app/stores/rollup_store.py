@@ -0,0 +1,169 @@
+"""Daily rollups of report counts per (distrito, categoria).
+
+Each bucket is keyed by UTC day ("YYYY-MM-DD") and holds two counters: valid
+reportes (Activo with enough veracidad) and all reportes. Ranges are answered
+by summing buckets, so a one-year ranking reads at most 366 days regardless of
+how many reportes exist. Two backends:
+- MemoryRollupStore: per process; rebuilt by a backfill at startup.
+- SQLiteRollupStore: a local SQLite file that survives restarts and is shared
+  by every uvicorn worker on the host.
+
+Small string metadata (backfill/refresh watermarks) is kept alongside.
+"""
+from abc import ABC, abstractmethod
+from datetime import date, timedelta
+from typing import Dict, Tuple
+import sqlite3
+import threading
+
+from app.config import settings
+
+# (distrito, categoria) -> [validos, total]
+Counts = Dict[Tuple[str, str], list]
+
+
+def _merge(into: Counts, key: Tuple[str, str], validos: int, total: int) -> None:
+    bucket = into.get(key)
+    if bucket is None:
+        into[key] = [validos, total]
+    else:
+        bucket[0] += validos
+        bucket[1] += total
+
+
+class RollupStore(ABC):
+    @abstractmethod
+    def replace_days(self, first_day: str, last_day: str, buckets: Dict[str, Counts]) -> None:
+        """Atomically replace every bucket with first_day <= day <= last_day."""
+
+    @abstractmethod
+    def sum_range(self, first_day: str, last_day: str) -> Counts:
+        """Sum the buckets with first_day <= day <= last_day."""
+
+    @abstractmethod
+    def get_meta(self, key: str) -> str | None: ...
+
+    @abstractmethod
+    def set_meta(self, key: str, value: str) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def day_count(self) -> int: ...
+
+
+class MemoryRollupStore(RollupStore):
+    def __init__(self):
+        self._days: Dict[str, Counts] = {}
+        self._meta: Dict[str, str] = {}
+
+    def replace_days(self, first_day: str, last_day: str, buckets: Dict[str, Counts]) -> None:
+        for day in [d for d in self._days if first_day <= d <= last_day]:
+            del self._days[day]
+        for day, counts in buckets.items():
+            if first_day <= day <= last_day:
+                self._days[day] = {k: list(v) for k, v in counts.items()}
+
+    def sum_range(self, first_day: str, last_day: str) -> Counts:
+        result: Counts = {}
+        day = date.fromisoformat(first_day)
+        end = date.fromisoformat(last_day)
+        # Un bucket por día: el costo depende del largo del rango, no de la tabla
+        while day <= end:
+            for key, (validos, total) in self._days.get(day.isoformat(), {}).items():
+                _merge(result, key, validos, total)
+            day += timedelta(days=1)
+        return result
+
+    def get_meta(self, key: str) -> str | None:
+        return self._meta.get(key)
+
+    def set_meta(self, key: str, value: str) -> None:
+        self._meta[key] = value
+
+    def clear(self) -> None:
+        self._days.clear()
+        self._meta.clear()
+
+    def day_count(self) -> int:
+        return len(self._days)
+
+
+class SQLiteRollupStore(RollupStore):
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rollup_days (
+                day TEXT NOT NULL,
+                distrito TEXT NOT NULL,
+                categoria TEXT NOT NULL,
+                validos INTEGER NOT NULL,
+                total INTEGER NOT NULL,
+                PRIMARY KEY (day, distrito, categoria)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS rollup_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+
+    def replace_days(self, first_day: str, last_day: str, buckets: Dict[str, Counts]) -> None:
+        rows = [
+            (day, distrito, categoria, validos, total)
+            for day, counts in buckets.items() if first_day <= day <= last_day
+            for (distrito, categoria), (validos, total) in counts.items()
+        ]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM rollup_days WHERE day BETWEEN ? AND ?", (first_day, last_day))
+                self._conn.executemany("INSERT INTO rollup_days VALUES (?, ?, ?, ?, ?)", rows)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def sum_range(self, first_day: str, last_day: str) -> Counts:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT distrito, categoria, SUM(validos), SUM(total) FROM rollup_days"
+                " WHERE day BETWEEN ? AND ? GROUP BY distrito, categoria",
+                (first_day, last_day),
+            ).fetchall()
+        return {(distrito, categoria): [validos, total] for distrito, categoria, validos, total in rows}
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM rollup_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO rollup_meta (key, value) VALUES (?, ?)", (key, value))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM rollup_days")
+            self._conn.execute("DELETE FROM rollup_meta")
+
+    def day_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(DISTINCT day) FROM rollup_days").fetchone()[0]
+
+
+_rollup_store: RollupStore | None = None
+
+
+def get_rollup_store() -> RollupStore:
+    global _rollup_store
+    if _rollup_store is None:
+        if settings.ROLLUP_BACKEND == "sqlite":
+            _rollup_store = SQLiteRollupStore(settings.ROLLUP_SQLITE_PATH)
+        else:
+            _rollup_store = MemoryRollupStore()
+    return _rollup_store
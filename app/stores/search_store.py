@@ -0,0 +1,84 @@
+"""Inverted index of report text with BM25 ranking.
+
+Each document is the list of terms of a reporte (see app/core/spanish_text.py)
+plus the distrito and categoria used as filters. Postings map a term to
+{reporte_id: term frequency}, so adding, replacing or removing a document
+only touches the postings of its own terms. A query walks the postings of
+its terms only: its cost depends on how common the terms are, not on how
+many reportes exist.
+"""
+from typing import Dict, Iterable, List, Tuple
+import heapq
+import math
+
+K1 = 1.2
+B = 0.75
+
+
+class SearchIndex:
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        # reporte_id -> (frecuencia por término, largo, distrito, categoria)
+        self._docs: Dict[int, Tuple[Dict[str, int], int, str | None, str | None]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(
+        self, reporte_id: int, terms: Iterable[str], distrito: str | None = None, categoria: str | None = None
+    ) -> None:
+        """Add (or replace) a document; distrito/categoria should already be folded."""
+        self.remove(reporte_id)
+        frequencies: Dict[str, int] = {}
+        length = 0
+        for term in terms:
+            frequencies[term] = frequencies.get(term, 0) + 1
+            length += 1
+        if not length:
+            return
+        for term, count in frequencies.items():
+            self._postings.setdefault(term, {})[reporte_id] = count
+        self._docs[reporte_id] = (frequencies, length, distrito, categoria)
+        self._total_length += length
+
+    def remove(self, reporte_id: int) -> None:
+        doc = self._docs.pop(reporte_id, None)
+        if doc is None:
+            return
+        frequencies, length, _, _ = doc
+        for term in frequencies:
+            postings = self._postings[term]
+            del postings[reporte_id]
+            if not postings:
+                del self._postings[term]
+        self._total_length -= length
+
+    def search(
+        self,
+        terms: Iterable[str],
+        limit: int = 20,
+        distrito: str | None = None,
+        categoria: str | None = None,
+    ) -> List[Tuple[float, int]]:
+        """BM25 over the documents containing any of `terms`: [(score, reporte_id)], best first."""
+        count = len(self._docs)
+        if not count:
+            return []
+        average_length = self._total_length / count
+        docs = self._docs
+        scores: Dict[int, float] = {}
+        for term in set(terms):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for reporte_id, frequency in postings.items():
+                _, length, doc_distrito, doc_categoria = docs[reporte_id]
+                if (distrito is not None and doc_distrito != distrito) or (
+                    categoria is not None and doc_categoria != categoria
+                ):
+                    continue
+                norm = K1 * (1 - B + B * length / average_length)
+                scores[reporte_id] = scores.get(reporte_id, 0.0) + idf * frequency * (K1 + 1) / (frequency + norm)
+        return heapq.nlargest(limit, ((score, reporte_id) for reporte_id, score in scores.items()))
@@ -0,0 +1,321 @@
+"""Materialized home timelines for the followed-users feed.
+
+Each user gets a bounded ring with the IDs of the most recent reportes posted
+by the accounts they follow, newest first. ReportesService pushes new reportes
+into the rings of the author's followers (fan-out on write); authors with too
+many followers are flagged as "heavy" and their reportes are pulled at read time
+instead.
+
+A ring is only authoritative once it has been seeded from a pull of the feed;
+pushes into users without a ring are ignored so that a partial ring is never
+mistaken for a full one. Report IDs are assumed to grow with created_at.
+
+Rings are seeded from the first page of the feed, so they usually answer
+page 1 (and older pages only when the whole feed fit in the seed). The
+memory backend only sees this worker's writes and follow changes, so its
+rings expire `ttl` seconds after seeding and the next read pulls again.
+
+The SQLite backend runs on the event loop, so it waits at most
+SQLITE_BUSY_TIMEOUT for another worker's write lock. A read that cannot get
+the file falls back to the pull path. A write that cannot get it is kept and
+replayed, in order, before the next write that gets through. Until then this
+worker doesn't read rings, since they may still miss its writes.
+"""
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Sequence
+import logging
+import sqlite3
+import threading
+import time
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Espera máxima por el lock del archivo antes de caer al pull
+SQLITE_BUSY_TIMEOUT = 0.05
+# Escrituras diferidas por lock ocupado; pasado el tope se vacían todas las timelines
+MAX_DEFERRED_WRITES = 1_000
+
+
+class TimelineStore(ABC):
+    @abstractmethod
+    def is_materialized(self, user_id: int) -> bool: ...
+
+    @abstractmethod
+    def seed(self, user_id: int, reporte_ids: Sequence[int], *, complete: bool) -> None:
+        """Replace user_id's ring with reporte_ids (newest first).
+
+        complete=True means the IDs are the user's whole feed history.
+        """
+
+    @abstractmethod
+    def push(self, user_ids: Iterable[int], reporte_id: int) -> None:
+        """Prepend reporte_id to the rings of the given (materialized) users."""
+
+    @abstractmethod
+    def read(self, user_id: int, *, before_id: int | None, limit: int) -> List[int] | None:
+        """Return up to `limit` IDs older than before_id, newest first.
+
+        Returns None when the ring cannot answer the page on its own (not
+        materialized, or it ran out of entries and older history exists).
+        """
+
+    @abstractmethod
+    def drop(self, user_id: int) -> None: ...
+
+    @abstractmethod
+    def clear(self) -> None: ...
+
+    @abstractmethod
+    def mark_heavy_author(self, author_id: int) -> None: ...
+
+    @abstractmethod
+    def heavy_authors(self) -> set[int]: ...
+
+
+class _Ring:
+    __slots__ = ("ids", "complete", "expires_at")
+
+    def __init__(self, ids: Sequence[int], size: int, complete: bool, expires_at: float):
+        self.ids: deque[int] = deque(ids, maxlen=size)
+        self.complete = complete and len(ids) <= size
+        self.expires_at = expires_at
+
+
+class MemoryTimelineStore(TimelineStore):
+    """Per-process store; least recently used rings are evicted past max_users
+    and every ring expires `ttl` seconds after it was seeded."""
+
+    def __init__(self, size: int = 500, max_users: int = 50_000, ttl: float = 30.0):
+        self.size = size
+        self.max_users = max_users
+        self.ttl = ttl
+        self._rings: "OrderedDict[int, _Ring]" = OrderedDict()
+        self._heavy: set[int] = set()
+
+    def _ring(self, user_id: int) -> _Ring | None:
+        ring = self._rings.get(user_id)
+        if ring is not None and ring.expires_at <= time.monotonic():
+            # Otros workers pudieron publicar o cambiar seguimientos: volver a sembrar
+            del self._rings[user_id]
+            return None
+        return ring
+
+    def is_materialized(self, user_id: int) -> bool:
+        return self._ring(user_id) is not None
+
+    def seed(self, user_id: int, reporte_ids: Sequence[int], *, complete: bool) -> None:
+        self._rings[user_id] = _Ring(list(reporte_ids), self.size, complete, time.monotonic() + self.ttl)
+        self._rings.move_to_end(user_id)
+        while len(self._rings) > self.max_users:
+            self._rings.popitem(last=False)
+
+    def push(self, user_ids: Iterable[int], reporte_id: int) -> None:
+        for user_id in user_ids:
+            ring = self._ring(user_id)
+            if ring is None:
+                continue
+            if len(ring.ids) == ring.ids.maxlen:
+                ring.complete = False
+            ring.ids.appendleft(reporte_id)
+
+    def read(self, user_id: int, *, before_id: int | None, limit: int) -> List[int] | None:
+        ring = self._ring(user_id)
+        if ring is None:
+            return None
+        self._rings.move_to_end(user_id)
+        page: List[int] = []
+        for rid in ring.ids:
+            if before_id is not None and rid >= before_id:
+                continue
+            page.append(rid)
+            if len(page) == limit:
+                return page
+        return page if ring.complete else None
+
+    def drop(self, user_id: int) -> None:
+        self._rings.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._rings.clear()
+
+    def mark_heavy_author(self, author_id: int) -> None:
+        self._heavy.add(author_id)
+
+    def heavy_authors(self) -> set[int]:
+        return set(self._heavy)
+
+
+class SQLiteTimelineStore(TimelineStore):
+    """Store shared by every worker on the host through a local SQLite file."""
+
+    def __init__(self, path: str, size: int = 500):
+        self.size = size
+        self._lock = threading.Lock()
+        # Escrituras que no consiguieron el lock, en orden
+        self._deferred: List[tuple[Callable[..., None], tuple]] = []
+        self._heavy: set[int] = set()
+        self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS timelines (
+                user_id INTEGER PRIMARY KEY,
+                complete INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS timeline_entries (
+                user_id INTEGER NOT NULL,
+                reporte_id INTEGER NOT NULL,
+                PRIMARY KEY (user_id, reporte_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS heavy_authors (author_id INTEGER PRIMARY KEY);
+            """
+        )
+        # Creado el esquema, cada operación espera poco por el lock
+        self._conn.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT * 1000)}")
+
+    def _write(self, apply: Callable[..., None] | None = None, *args) -> None:
+        """Run the deferred writes plus apply(*args) in one transaction, or defer them all."""
+        with self._lock:
+            if apply is not None:
+                self._deferred.append((apply, args))
+            if not self._deferred:
+                return
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+            except sqlite3.OperationalError as exc:
+                if len(self._deferred) > MAX_DEFERRED_WRITES:
+                    # Demasiado atraso: descartar los rings es más barato que reproducirlo
+                    self._deferred = [(self._clear, ())]
+                logger.warning("Timeline store busy, deferring %s writes: %s", len(self._deferred), exc)
+                return
+            deferred, self._deferred = self._deferred, []
+            try:
+                for pending, pending_args in deferred:
+                    pending(*pending_args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _trim(self, user_id: int) -> None:
+        cur = self._conn.execute(
+            "DELETE FROM timeline_entries WHERE user_id = ? AND reporte_id NOT IN ("
+            " SELECT reporte_id FROM timeline_entries WHERE user_id = ?"
+            " ORDER BY reporte_id DESC LIMIT ?)",
+            (user_id, user_id, self.size),
+        )
+        if cur.rowcount:
+            self._conn.execute("UPDATE timelines SET complete = 0 WHERE user_id = ?", (user_id,))
+
+    def is_materialized(self, user_id: int) -> bool:
+        with self._lock:
+            if self._deferred:
+                return False
+            try:
+                row = self._conn.execute("SELECT 1 FROM timelines WHERE user_id = ?", (user_id,)).fetchone()
+            except sqlite3.OperationalError:
+                return False
+        return row is not None
+
+    def seed(self, user_id: int, reporte_ids: Sequence[int], *, complete: bool) -> None:
+        self._write(self._seed, user_id, list(reporte_ids), complete)
+
+    def _seed(self, user_id: int, reporte_ids: List[int], complete: bool) -> None:
+        self._conn.execute("DELETE FROM timeline_entries WHERE user_id = ?", (user_id,))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO timelines (user_id, complete) VALUES (?, ?)",
+            (user_id, int(complete)),
+        )
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO timeline_entries (user_id, reporte_id) VALUES (?, ?)",
+            [(user_id, rid) for rid in reporte_ids],
+        )
+        self._trim(user_id)
+
+    def push(self, user_ids: Iterable[int], reporte_id: int) -> None:
+        self._write(self._push, list(user_ids), reporte_id)
+
+    def _push(self, user_ids: List[int], reporte_id: int) -> None:
+        for user_id in user_ids:
+            cur = self._conn.execute(
+                "INSERT OR IGNORE INTO timeline_entries (user_id, reporte_id)"
+                " SELECT user_id, ? FROM timelines WHERE user_id = ?",
+                (reporte_id, user_id),
+            )
+            if cur.rowcount:
+                self._trim(user_id)
+
+    def read(self, user_id: int, *, before_id: int | None, limit: int) -> List[int] | None:
+        # Escrituras propias pendientes: reintentarlas y, si siguen pendientes, ir al pull
+        self._write()
+        with self._lock:
+            if self._deferred:
+                return None
+            try:
+                meta = self._conn.execute("SELECT complete FROM timelines WHERE user_id = ?", (user_id,)).fetchone()
+                if meta is None:
+                    return None
+                rows = self._conn.execute(
+                    "SELECT reporte_id FROM timeline_entries WHERE user_id = ? AND reporte_id < ?"
+                    " ORDER BY reporte_id DESC LIMIT ?",
+                    (user_id, before_id if before_id is not None else 2**63 - 1, limit),
+                ).fetchall()
+            except sqlite3.OperationalError:
+                return None
+        page = [r[0] for r in rows]
+        if len(page) == limit or meta[0]:
+            return page
+        return None
+
+    def drop(self, user_id: int) -> None:
+        self._write(self._drop, user_id)
+
+    def _drop(self, user_id: int) -> None:
+        self._conn.execute("DELETE FROM timelines WHERE user_id = ?", (user_id,))
+        self._conn.execute("DELETE FROM timeline_entries WHERE user_id = ?", (user_id,))
+
+    def clear(self) -> None:
+        with self._lock:
+            # Vaciar todo vuelve irrelevante lo que estaba pendiente
+            self._deferred = []
+        self._write(self._clear)
+
+    def _clear(self) -> None:
+        self._conn.execute("DELETE FROM timelines")
+        self._conn.execute("DELETE FROM timeline_entries")
+
+    def mark_heavy_author(self, author_id: int) -> None:
+        with self._lock:
+            self._heavy.add(author_id)
+        self._write(self._mark_heavy_author, author_id)
+
+    def _mark_heavy_author(self, author_id: int) -> None:
+        self._conn.execute("INSERT OR IGNORE INTO heavy_authors (author_id) VALUES (?)", (author_id,))
+
+    def heavy_authors(self) -> set[int]:
+        with self._lock:
+            try:
+                # Los autores pesados solo se agregan: con el archivo ocupado vale el último conjunto leído
+                self._heavy |= {r[0] for r in self._conn.execute("SELECT author_id FROM heavy_authors")}
+            except sqlite3.OperationalError:
+                pass
+            return set(self._heavy)
+
+
+_timeline_store: TimelineStore | None = None
+
+
+def get_timeline_store() -> TimelineStore:
+    global _timeline_store
+    if _timeline_store is None:
+        if settings.TIMELINE_BACKEND == "sqlite":
+            _timeline_store = SQLiteTimelineStore(settings.TIMELINE_SQLITE_PATH, settings.TIMELINE_SIZE)
+        else:
+            _timeline_store = MemoryTimelineStore(
+                settings.TIMELINE_SIZE, settings.TIMELINE_MAX_USERS, settings.TIMELINE_MEMORY_TTL_SECONDS
+            )
+    return _timeline_store
@@ -0,0 +1 @@
+"""Herramientas de medición (no se importan desde la app)."""
@@ -0,0 +1,210 @@
+"""Generador de datos sintéticos con forma de Lima para benchmarks.
+
+Produce las tablas que usa la API (Usuarios, Reportes, Seguidores, Reaccion,
+Comentarios, Notas_Comunidad, AreasInteres, Adjuntos) como listas de dicts,
+con distritos reales y coordenadas alrededor de su centro, fechas en el último
+año, seguidores con distribución de cola larga (pocos autores muy seguidos) y
+reacciones/notas coherentes con los contadores del reporte.
+
+Uso:
+    python -m bench.datagen --scale small --out bench/data/small.json
+    python -m bench.datagen --reportes 1000000 --users 200000 --out /tmp/lima.json
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import random
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# (distrito, lat, lon, peso relativo ~ población)
+LIMA_DISTRICTS: list[tuple[str, float, float, float]] = [
+    ("San Juan de Lurigancho", -11.9780, -77.0050, 11.0),
+    ("San Martín de Porres", -12.0000, -77.0667, 7.0),
+    ("Ate", -12.0260, -76.9180, 6.5),
+    ("Comas", -11.9333, -77.0500, 5.5),
+    ("Villa El Salvador", -12.2130, -76.9370, 4.5),
+    ("Villa María del Triunfo", -12.1600, -76.9400, 4.5),
+    ("San Juan de Miraflores", -12.1560, -76.9700, 4.0),
+    ("Los Olivos", -11.9900, -77.0700, 3.8),
+    ("Santiago de Surco", -12.1453, -76.9917, 3.6),
+    ("Cercado de Lima", -12.0464, -77.0428, 2.8),
+    ("Chorrillos", -12.1690, -77.0240, 3.3),
+    ("Independencia", -11.9900, -77.0500, 2.2),
+    ("La Victoria", -12.0650, -77.0300, 1.8),
+    ("Rímac", -12.0290, -77.0300, 1.7),
+    ("La Molina", -12.0860, -76.9270, 1.5),
+    ("San Borja", -12.1080, -77.0000, 1.2),
+    ("Surquillo", -12.1130, -77.0200, 0.9),
+    ("Miraflores", -12.1211, -77.0297, 1.0),
+    ("Breña", -12.0590, -77.0500, 0.9),
+    ("Pueblo Libre", -12.0740, -77.0630, 0.8),
+    ("Jesús María", -12.0760, -77.0470, 0.7),
+    ("Lince", -12.0840, -77.0360, 0.5),
+    ("Magdalena del Mar", -12.0900, -77.0700, 0.6),
+    ("San Isidro", -12.0977, -77.0365, 0.6),
+    ("Barranco", -12.1490, -77.0210, 0.3),
+]
+
+CATEGORIAS = ["Robo", "Hurto", "Asalto", "Acoso", "Vandalismo", "Accidente", "Otro"]
+CATEGORIA_WEIGHTS = [30, 25, 15, 10, 8, 7, 5]
+ESTADOS = ["Activo", "Falso", "Resuelto"]
+ESTADO_WEIGHTS = [80, 8, 12]
+
+# users, reportes; el resto de tablas se deriva de estos
+SCALES = {
+    "tiny": (200, 2_000),
+    "small": (2_000, 20_000),
+    "medium": (20_000, 200_000),
+    "lima": (200_000, 1_000_000),
+}
+
+# Radio (grados) de dispersión alrededor del centro de cada distrito (~2 km)
+_SPREAD_DEG = 0.018
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def nearest_district(lat: float, lon: float) -> str:
+    """Distrito cuyo centro está más cerca (usado también por el geocoder falso)."""
+    best, best_d = LIMA_DISTRICTS[0][0], math.inf
+    for name, dlat, dlon, _ in LIMA_DISTRICTS:
+        d = (lat - dlat) ** 2 + (lon - dlon) ** 2
+        if d < best_d:
+            best, best_d = name, d
+    return best
+
+
+def generate(users: int, reportes: int, *, seed: int = 7, now: datetime | None = None) -> dict[str, list[dict]]:
+    rng = random.Random(seed)
+    now = now or datetime.now(timezone.utc).replace(microsecond=0)
+    year_seconds = 365 * 24 * 3600
+    names = [d[0] for d in LIMA_DISTRICTS]
+    weights = [d[3] for d in LIMA_DISTRICTS]
+    centers = {d[0]: (d[1], d[2]) for d in LIMA_DISTRICTS}
+
+    usuarios = [
+        {
+            "id": uid,
+            "user": f"vecino{uid}",
+            "email": f"vecino{uid}@example.pe",
+            "psswd": f"clave{uid}",
+            "created_at": _iso(now - timedelta(seconds=rng.randrange(year_seconds))),
+        }
+        for uid in range(1, users + 1)
+    ]
+
+    # Autores con cola larga: pocos usuarios concentran muchos reportes/seguidores
+    def pick_user() -> int:
+        return min(users, int(rng.paretovariate(1.2))) if rng.random() < 0.3 else rng.randint(1, users)
+
+    rows_reportes = []
+    for rid in range(1, reportes + 1):
+        distrito = rng.choices(names, weights)[0]
+        clat, clon = centers[distrito]
+        up, down = int(rng.expovariate(1 / 6)), int(rng.expovariate(1 / 2))
+        total = up + down
+        rows_reportes.append({
+            "id": rid,
+            "user_id": pick_user(),
+            "titulo": f"Incidente {rid}",
+            "descripcion": "Reporte generado para pruebas de carga",
+            "categoria": rng.choices(CATEGORIAS, CATEGORIA_WEIGHTS)[0],
+            "lat": round(clat + rng.uniform(-_SPREAD_DEG, _SPREAD_DEG), 6),
+            "lon": round(clon + rng.uniform(-_SPREAD_DEG, _SPREAD_DEG), 6),
+            "direccion": f"Av. Prueba {rng.randint(100, 9999)}",
+            "distrito": distrito,
+            "estado": rng.choices(ESTADOS, ESTADO_WEIGHTS)[0],
+            "veracidad_porcentaje": round(up / total * 100, 2) if total else 0,
+            "cantidad_upvotes": up,
+            "cantidad_downvotes": down,
+            "created_at": _iso(now - timedelta(seconds=rng.randrange(year_seconds))),
+        })
+    # IDs crecientes en el tiempo, como en la tabla real
+    rows_reportes.sort(key=lambda r: r["created_at"])
+    for rid, r in enumerate(rows_reportes, 1):
+        r["id"] = rid
+
+    seguidores, seen = [], set()
+    for seguidor in range(1, users + 1):
+        for _ in range(min(users - 1, int(rng.paretovariate(1.5)) * 3)):
+            seguido = pick_user()
+            if seguido != seguidor and (seguidor, seguido) not in seen:
+                seen.add((seguidor, seguido))
+                seguidores.append({
+                    "id": len(seguidores) + 1,
+                    "seguidor_id": seguidor,
+                    "seguido_id": seguido,
+                    "notificar_reportes": rng.random() < 0.7,
+                    "created_at": _iso(now - timedelta(seconds=rng.randrange(year_seconds))),
+                })
+
+    reacciones, comentarios, notas, adjuntos = [], [], [], []
+    for r in rows_reportes:
+        for tipo, count in (("upvote", r["cantidad_upvotes"]), ("downvote", r["cantidad_downvotes"])):
+            for _ in range(count):
+                reacciones.append({"id": len(reacciones) + 1, "reporte_id": r["id"], "user_id": rng.randint(1, users),
+                                   "tipo": tipo, "created_at": r["created_at"]})
+        for _ in range(int(rng.expovariate(1 / 1.5))):
+            comentarios.append({"id": len(comentarios) + 1, "reporte_id": r["id"], "user_id": rng.randint(1, users),
+                                "mensaje": "Comentario de prueba", "created_at": r["created_at"]})
+        for _ in range(int(rng.expovariate(1 / 0.5))):
+            notas.append({"id": len(notas) + 1, "reporte_id": r["id"], "user_id": rng.randint(1, users),
+                          "nota": "Nota de prueba", "es_veraz": rng.choice([True, True, False, None]),
+                          "created_at": r["created_at"]})
+        if rng.random() < 0.4:
+            adjuntos.append({"id": len(adjuntos) + 1, "reporte_id": r["id"], "url": f"https://example.pe/img/{r['id']}.jpg",
+                             "tipo": "imagen", "created_at": r["created_at"]})
+
+    areas = []
+    for uid in range(1, users + 1):
+        if rng.random() < 0.2:
+            distrito = rng.choices(names, weights)[0]
+            clat, clon = centers[distrito]
+            areas.append({
+                "id": len(areas) + 1, "user_id": uid, "nombre": f"Zona {distrito}",
+                "lat": clat, "lon": clon, "radio_metros": rng.choice([500, 1000, 2000]),
+                "frecuencia_notificacion": rng.choice(["diario", "semanal"]), "activo": rng.random() < 0.9,
+                "ultima_notificacion": None, "created_at": _iso(now - timedelta(days=rng.randrange(365))),
+            })
+
+    return {
+        "Usuarios": usuarios,
+        "Reportes": rows_reportes,
+        "Seguidores": seguidores,
+        "Reaccion": reacciones,
+        "Comentarios": comentarios,
+        "Notas_Comunidad": notas,
+        "AreasInteres": areas,
+        "Adjuntos": adjuntos,
+    }
+
+
+def load(path: str | Path) -> dict[str, list[dict]]:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--users", type=int, default=None)
+    parser.add_argument("--reportes", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args(argv)
+
+    users, reportes = SCALES[args.scale]
+    data = generate(args.users or users, args.reportes or reportes, seed=args.seed)
+    Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, ensure_ascii=False)
+    print(", ".join(f"{name}={len(rows)}" for name, rows in data.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,475 @@
+"""Upstream falso (PostgREST + Google Maps + SendGrid) para pruebas de carga.
+
+Implementa el subconjunto de PostgREST que usan los repositorios:
+
+- GET/POST/PATCH/DELETE sobre /rest/v1/<tabla>
+- filtros `eq`, `neq`, `gt`, `gte`, `lt`, `lte`, `in`, `like`, `ilike`, `is`
+  (con prefijo opcional `not.`) y `or=(...)`/`and(...)` anidados
+- `select` (lista de columnas), `order` (varias columnas, asc/desc), `limit`, `offset`
+- RPC `reportes_de_seguidos`
+
+También responde Geocoding/Places de Google (distrito más cercano de
+bench.datagen) y `POST /v3/mail/send` de SendGrid (202).
+
+Se puede usar de dos formas:
+
+- en proceso: `mock_transport(FakeUpstream(db))` devuelve un `httpx.MockTransport`;
+- como servidor: `python -m bench.fake_upstream --data bench/data/small.json --port 54321`
+  y arrancar la API con `SUPABASE_URL=http://127.0.0.1:54321`,
+  `GOOGLE_MAPS_BASE_URL=http://127.0.0.1:54321/maps/api` y
+  `SENDGRID_API_HOST=http://127.0.0.1:54321`.
+
+Latencia, errores y timeouts se inyectan con `Faults` (por servicio).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import re
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+from urllib.parse import parse_qsl
+
+from bench.datagen import generate, load, nearest_district
+
+Row = dict[str, Any]
+Predicate = Callable[[Row], bool]
+
+
+# ---------------------------------------------------------------------------
+# Inyección de fallas
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0      # fracción de respuestas 503
+    timeout_rate: float = 0.0    # fracción de requests que "cuelgan" timeout_s
+    timeout_s: float = 30.0
+
+    async def apply(self, rng: random.Random) -> int | None:
+        """Espera la latencia configurada; devuelve un status de error si toca fallar."""
+        if self.timeout_rate and rng.random() < self.timeout_rate:
+            await asyncio.sleep(self.timeout_s)
+        delay = self.latency_ms + (rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        if self.error_rate and rng.random() < self.error_rate:
+            return 503
+        return None
+
+
+@dataclass
+class FaultConfig:
+    supabase: Faults = field(default_factory=Faults)
+    google_maps: Faults = field(default_factory=Faults)
+    sendgrid: Faults = field(default_factory=Faults)
+
+
+# ---------------------------------------------------------------------------
+# Filtros PostgREST
+# ---------------------------------------------------------------------------
+
+def _split_top_level(text: str) -> list[str]:
+    """Split on commas that are not inside parentheses or double quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == '"':
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        if ch == "," and depth == 0 and not quoted:
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(ch)
+    if current:
+        parts.append("".join(current))
+    return parts
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1] if len(value) >= 2 and value[0] == value[-1] == '"' else value
+
+
+def _coerce(sample: Any, raw: str) -> Any:
+    raw = _unquote(raw)
+    if raw == "null":
+        return None
+    if isinstance(sample, bool) or raw in ("true", "false"):
+        return raw == "true"
+    if isinstance(sample, (int, float)) and not isinstance(sample, bool):
+        try:
+            return float(raw)
+        except ValueError:
+            return raw
+    return raw
+
+
+def _like_regex(pattern: str, flags: int) -> re.Pattern:
+    out, escaped = [], False
+    for ch in pattern:
+        if escaped:
+            out.append(re.escape(ch))
+            escaped = False
+        elif ch == "\\":
+            escaped = True
+        elif ch in "%*":
+            out.append(".*")
+        elif ch == "_":
+            out.append(".")
+        else:
+            out.append(re.escape(ch))
+    return re.compile("".join(out), flags | re.DOTALL)
+
+
+def _compare(op: str, value: Any, arg: Any) -> bool:
+    if value is None or arg is None:
+        return False
+    try:
+        if op == "eq":
+            return value == arg
+        if op == "neq":
+            return value != arg
+        if op == "gt":
+            return value > arg
+        if op == "gte":
+            return value >= arg
+        if op == "lt":
+            return value < arg
+        if op == "lte":
+            return value <= arg
+    except TypeError:
+        return False
+    raise ValueError(f"operador no soportado: {op}")
+
+
+def build_predicate(column: str, expression: str) -> Predicate:
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+
+    if op == "in":
+        items = [_unquote(v) for v in _split_top_level(raw.strip("()"))]
+
+        def pred(row: Row) -> bool:
+            value = row.get(column)
+            return value is not None and any(value == _coerce(value, i) for i in items)
+    elif op in ("like", "ilike"):
+        regex = _like_regex(raw, re.IGNORECASE if op == "ilike" else 0)
+
+        def pred(row: Row) -> bool:
+            value = row.get(column)
+            return value is not None and regex.fullmatch(str(value)) is not None
+    elif op == "is":
+        target = {"null": None, "true": True, "false": False}[raw]
+
+        def pred(row: Row) -> bool:
+            return row.get(column) is target
+    else:
+        def pred(row: Row) -> bool:
+            value = row.get(column)
+            return _compare(op, value, _coerce(value, raw))
+
+    return (lambda row: not pred(row)) if negate else pred
+
+
+def build_logic(kind: str, body: str) -> Predicate:
+    """Parse the inside of ``or=(...)`` / ``and(...)``."""
+    preds = []
+    for item in _split_top_level(body):
+        item = item.strip()
+        for nested in ("and", "or"):
+            if item.startswith(nested + "("):
+                preds.append(build_logic(nested, item[len(nested) + 1:-1]))
+                break
+        else:
+            column, _, expression = item.partition(".")
+            preds.append(build_predicate(column, expression))
+    if kind == "or":
+        return lambda row: any(p(row) for p in preds)
+    return lambda row: all(p(row) for p in preds)
+
+
+def _order_rows(rows: list[Row], order: str) -> list[Row]:
+    for part in reversed(order.split(",")):
+        column, *mods = part.split(".")
+        desc = "desc" in mods
+        # None siempre al final (como nullslast en asc)
+        present = [r for r in rows if r.get(column) is not None]
+        missing = [r for r in rows if r.get(column) is None]
+        present.sort(key=lambda r: r[column], reverse=desc)
+        rows = present + missing
+    return rows
+
+
+def _project(rows: Iterable[Row], select: str) -> list[Row]:
+    if not select or select.strip() == "*":
+        return [dict(r) for r in rows]
+    columns = [c.strip() for c in select.split(",") if c.strip()]
+    return [{c: r.get(c) for c in columns} for r in rows]
+
+
+# ---------------------------------------------------------------------------
+# Base de datos en memoria
+# ---------------------------------------------------------------------------
+
+RESERVED = {"select", "order", "limit", "offset", "or", "and", "on_conflict", "columns"}
+
+
+class FakeDatabase:
+    def __init__(self, tables: dict[str, list[Row]] | None = None):
+        self.tables: dict[str, list[Row]] = {name: list(rows) for name, rows in (tables or {}).items()}
+        self._by_id: dict[str, dict[Any, Row]] = {}
+        self._next_id: dict[str, int] = {}
+        for name, rows in self.tables.items():
+            self._reindex(name)
+
+    def _reindex(self, table: str) -> None:
+        rows = self.tables.setdefault(table, [])
+        self._by_id[table] = {r["id"]: r for r in rows if "id" in r}
+        self._next_id[table] = max(self._by_id[table], default=0) + 1
+
+    def _candidates(self, table: str, filters: list[tuple[str, str]]) -> list[Row]:
+        # Atajo para id=eq.N / id=in.(...), como haría el índice de la PK
+        for column, expression in filters:
+            if column == "id" and expression.startswith(("eq.", "in.")):
+                op, _, raw = expression.partition(".")
+                ids = [raw] if op == "eq" else _split_top_level(raw.strip("()"))
+                index = self._by_id.get(table, {})
+                found = []
+                for raw_id in ids:
+                    try:
+                        row = index.get(int(raw_id))
+                    except ValueError:
+                        row = None
+                    if row is not None:
+                        found.append(row)
+                return found
+        return self.tables.get(table, [])
+
+    def _matching(self, table: str, params: list[tuple[str, str]]) -> list[Row]:
+        filters = [(k, v) for k, v in params if k not in RESERVED]
+        preds = [build_predicate(k, v) for k, v in filters]
+        for key, value in params:
+            if key in ("or", "and"):
+                preds.append(build_logic(key, value.strip()[1:-1]))
+        rows = self._candidates(table, filters)
+        return [r for r in rows if all(p(r) for p in preds)]
+
+    def select(self, table: str, params: list[tuple[str, str]]) -> list[Row]:
+        options = dict(params)
+        rows = self._matching(table, params)
+        if "order" in options:
+            rows = _order_rows(rows, options["order"])
+        offset = int(options.get("offset", 0))
+        limit = int(options["limit"]) if "limit" in options else None
+        rows = rows[offset: offset + limit if limit is not None else None]
+        return _project(rows, options.get("select", "*"))
+
+    def insert(self, table: str, payload: Row | list[Row]) -> list[Row]:
+        items = payload if isinstance(payload, list) else [payload]
+        rows = self.tables.setdefault(table, [])
+        index = self._by_id.setdefault(table, {})
+        created = []
+        for item in items:
+            row = dict(item)
+            if row.get("id") is None:
+                row["id"] = self._next_id.get(table, 1)
+            self._next_id[table] = max(self._next_id.get(table, 1), row["id"] + 1)
+            row.setdefault("created_at", datetime.now(timezone.utc).isoformat(timespec="seconds"))
+            rows.append(row)
+            index[row["id"]] = row
+            created.append(dict(row))
+        return created
+
+    def update(self, table: str, params: list[tuple[str, str]], payload: Row) -> list[Row]:
+        rows = self._matching(table, params)
+        for row in rows:
+            row.update(payload)
+        return _project(rows, dict(params).get("select", "*"))
+
+    def delete(self, table: str, params: list[tuple[str, str]]) -> list[Row]:
+        doomed = self._matching(table, params)
+        if doomed:
+            ids = {id(r) for r in doomed}
+            self.tables[table] = [r for r in self.tables[table] if id(r) not in ids]
+            for row in doomed:
+                self._by_id.get(table, {}).pop(row.get("id"), None)
+        return [dict(r) for r in doomed]
+
+    def rpc(self, function: str, args: Row) -> Any:
+        if function != "reportes_de_seguidos":
+            return None
+        seguidos = {
+            s["seguido_id"] for s in self.tables.get("Seguidores", [])
+            if s.get("seguidor_id") == args.get("p_user_id")
+        }
+        before = args.get("p_before_created_at")
+        before_id = args.get("p_before_id")
+        rows = [
+            r for r in self.tables.get("Reportes", [])
+            if r.get("user_id") in seguidos
+            and (before is None or (str(r.get("created_at")), r.get("id")) < (str(before), before_id))
+        ]
+        rows = _order_rows(rows, "created_at.desc,id.desc")
+        return [dict(r) for r in rows[: int(args.get("p_limit") or 20)]]
+
+
+# ---------------------------------------------------------------------------
+# Ruteo
+# ---------------------------------------------------------------------------
+
+def _json(status: int, body: Any) -> tuple[int, dict[str, str], bytes]:
+    return status, {"content-type": "application/json"}, json.dumps(body, ensure_ascii=False).encode()
+
+
+def _geocode(params: dict[str, str]) -> Any:
+    try:
+        lat, lon = (float(v) for v in params.get("latlng", "").split(","))
+    except ValueError:
+        return {"status": "INVALID_REQUEST", "results": []}
+    distrito = nearest_district(lat, lon)
+    return {
+        "status": "OK",
+        "results": [{
+            "formatted_address": f"{distrito}, Lima, Perú",
+            "address_components": [
+                {"long_name": distrito, "short_name": distrito, "types": ["locality", "political"]},
+                {"long_name": "Lima", "short_name": "Lima", "types": ["administrative_area_level_2", "political"]},
+                {"long_name": "Perú", "short_name": "PE", "types": ["country", "political"]},
+            ],
+        }],
+    }
+
+
+class FakeUpstream:
+    """Request router shared by the ASGI app and the httpx MockTransport."""
+
+    def __init__(self, db: FakeDatabase, faults: FaultConfig | None = None, seed: int = 11):
+        self.db = db
+        self.faults = faults or FaultConfig()
+        self.rng = random.Random(seed)
+        self.requests = 0
+
+    async def handle(self, method: str, path: str, query: str, body: bytes) -> tuple[int, dict[str, str], bytes]:
+        self.requests += 1
+        params = parse_qsl(query, keep_blank_values=True)
+
+        if path.startswith("/rest/v1/"):
+            failure = await self.faults.supabase.apply(self.rng)
+            if failure:
+                return _json(failure, {"message": "fake upstream: injected error"})
+            return self._postgrest(method, path[len("/rest/v1/"):], params, body)
+
+        if path.startswith("/maps/api/"):
+            failure = await self.faults.google_maps.apply(self.rng)
+            if failure:
+                return _json(failure, {"status": "UNKNOWN_ERROR"})
+            if path.startswith("/maps/api/geocode"):
+                return _json(200, _geocode(dict(params)))
+            if path.startswith("/maps/api/place/autocomplete"):
+                q = dict(params).get("input", "")
+                return _json(200, {"status": "OK", "predictions": [{"description": f"{q}, Lima, Perú"}]})
+
+        if path == "/v3/mail/send" and method == "POST":
+            failure = await self.faults.sendgrid.apply(self.rng)
+            if failure:
+                return _json(failure, {"errors": [{"message": "injected"}]})
+            return 202, {}, b""
+
+        return _json(404, {"message": f"fake upstream: ruta no soportada {method} {path}"})
+
+    def _postgrest(self, method: str, resource: str, params: list[tuple[str, str]], body: bytes):
+        payload = json.loads(body) if body else None
+        if resource.startswith("rpc/"):
+            result = self.db.rpc(resource[4:], payload or {})
+            if result is None:
+                return _json(404, {"code": "PGRST202", "message": "function not found"})
+            return _json(200, result)
+        try:
+            if method == "GET":
+                return _json(200, self.db.select(resource, params))
+            if method == "POST":
+                return _json(201, self.db.insert(resource, payload or {}))
+            if method == "PATCH":
+                return _json(200, self.db.update(resource, params, payload or {}))
+            if method == "DELETE":
+                return _json(200, self.db.delete(resource, params))
+        except (ValueError, KeyError) as e:
+            return _json(400, {"code": "PGRST100", "message": str(e)})
+        return _json(405, {"message": "method not allowed"})
+
+    # --- ASGI --------------------------------------------------------------
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        status, headers, content = await self.handle(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1"), body
+        )
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(k.encode(), v.encode()) for k, v in headers.items()],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+def mock_transport(upstream: FakeUpstream):
+    """httpx.MockTransport backed by the fake (for in-process benchmarks)."""
+    import httpx
+
+    async def handler(request: "httpx.Request") -> "httpx.Response":
+        status, headers, content = await upstream.handle(
+            request.method, request.url.path, request.url.query.decode("latin-1"), request.content
+        )
+        return httpx.Response(status, headers=headers, content=content)
+
+    return httpx.MockTransport(handler)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", help="JSON generado por bench.datagen (si falta, se genera --scale)")
+    parser.add_argument("--scale", default="small")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=54321)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-s", type=float, default=30.0)
+    args = parser.parse_args(argv)
+
+    from bench.datagen import SCALES
+
+    tables = load(args.data) if args.data else generate(*SCALES[args.scale])
+    supabase = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate, args.timeout_s)
+    app = FakeUpstream(FakeDatabase(tables), FaultConfig(supabase=supabase))
+
+    import uvicorn
+
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Reporte de tiempo de importación (`python -X importtime`).
+
+Uso:
+    python -m bench.import_time                      # importa app.main
+    python -m bench.import_time --module app.main --call create_app --top 25
+    python -m bench.import_time --budget-ms 400      # exit 1 si se excede
+
+Corre la importación en un subproceso limpio para medir un arranque en frío.
+Si faltan las variables obligatorias de Settings se usan valores de prueba,
+así el reporte funciona sin settings.env.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+from dataclasses import dataclass
+
+DUMMY_ENV = {
+    "SUPABASE_URL": "http://127.0.0.1:54321",
+    "SUPABASE_ANON_KEY": "bench",
+    "GOOGLE_MAPS_API_KEY": "bench",
+    "SENDGRID_API_KEY": "SG.bench",
+}
+
+
+@dataclass
+class ImportEntry:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportEntry]:
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_part, cumulative_part, name_part = line.split(":", 1)[1].split("|")
+            raw_name = name_part.rstrip()
+            depth = (len(raw_name) - len(raw_name.lstrip())) // 2
+            entries.append(ImportEntry(raw_name.strip(), int(self_part), int(cumulative_part), depth))
+        except ValueError:
+            continue
+    return entries
+
+
+def measure(module: str, call: str | None = None) -> tuple[list[ImportEntry], str]:
+    code = f"import {module}"
+    if call:
+        code += f"; {module}.{call}()"
+    env = {**DUMMY_ENV, **os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"La importación falló:\n{proc.stderr[-4000:]}")
+    return parse_importtime(proc.stderr), proc.stdout
+
+
+def _package(name: str) -> str:
+    return name.split(".", 1)[0]
+
+
+def report(entries: list[ImportEntry], top: int) -> float:
+    total_ms = sum(e.self_us for e in entries) / 1000
+    print(f"Total: {total_ms:.1f} ms en {len(entries)} módulos\n")
+
+    print(f"Top {top} por tiempo acumulado:")
+    for e in sorted(entries, key=lambda e: e.cumulative_us, reverse=True)[:top]:
+        print(f"  {e.cumulative_us / 1000:8.1f} ms  (self {e.self_us / 1000:6.1f})  {e.module}")
+
+    by_package: dict[str, int] = {}
+    for e in entries:
+        by_package[_package(e.module)] = by_package.get(_package(e.module), 0) + e.self_us
+    print(f"\nTop {top} paquetes por tiempo propio:")
+    for name, us in sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+    return total_ms
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--call", default=None, help="función del módulo a invocar tras importarlo (p. ej. create_app)")
+    parser.add_argument("--top", type=int, default=20)
+    parser.add_argument("--budget-ms", type=float, default=None)
+    parser.add_argument("--forbid", action="append", default=[],
+                        help="paquete que no debe cargarse al importar (repetible, p. ej. sendgrid)")
+    args = parser.parse_args(argv)
+
+    entries, _ = measure(args.module, args.call)
+    total_ms = report(entries, args.top)
+
+    failed = False
+    loaded = {_package(e.module) for e in entries}
+    for name in args.forbid:
+        if name in loaded:
+            print(f"\n✗ '{name}' se importa al cargar {args.module}")
+            failed = True
+    if args.budget_ms is not None and total_ms > args.budget_ms:
+        print(f"\n✗ {total_ms:.1f} ms supera el presupuesto de {args.budget_ms:.0f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
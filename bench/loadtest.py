@@ -0,0 +1,295 @@
+"""Driver de carga: latencias p50/p95/p99 y RPS por endpoint.
+
+Dos modos:
+
+- contra un servidor ya levantado (la API apuntando a bench/fake_upstream.py
+  o a un Supabase de staging):
+
+      python -m bench.loadtest --target http://127.0.0.1:8000 --duration 30 --concurrency 50
+
+- en proceso, sin red: arma la app con create_app() y reemplaza los clientes
+  HTTP compartidos (Supabase, Google Maps) por el upstream falso vía
+  httpx.MockTransport. El SDK de SendGrid usa urllib, así que `send_mail` se
+  reemplaza por un envío al upstream falso por el mismo transporte. Las
+  requests entran por httpx.ASGITransport, que no corre el lifespan: la corrida
+  lo ejecuta aparte y espera a que los índices en memoria estén listos (hasta
+  --ready-timeout), para medir los caminos de producción y no los de respaldo:
+
+      python -m bench.loadtest --in-process --scale small --latency-ms 20 --duration 15
+
+En proceso todas las requests llegan desde el mismo cliente (una sola IP), así
+que el rate limit y el shedding por sobrecarga quedan desactivados salvo que
+el entorno diga otra cosa. Las respuestas 429 y 503 se informan
+aparte: si superan REJECTED_MAX_SHARE de las requests la corrida no es válida
+(se mide el limitador, no los endpoints) y el comando sale con código 1.
+
+Los escenarios tienen pesos (ver SCENARIOS); `--only feed,ranking` limita la
+mezcla. `--json out.json` guarda el resultado para comparar corridas.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable
+
+import httpx
+
+# nombre -> (peso, método, path(rng, n_users, n_reportes, n_areas), body opcional)
+Scenario = tuple[int, str, Callable[[random.Random, int, int, int], str], Callable[[random.Random, int], dict] | None]
+
+SCENARIOS: dict[str, Scenario] = {
+    "list": (30, "GET", lambda r, u, n, a: f"/Reportes?limit=20&offset={r.randrange(0, 200, 20)}", None),
+    "feed": (25, "GET", lambda r, u, n, a: f"/Reportes/seguidos/{r.randint(1, u)}?limit=20", None),
+    "get": (15, "GET", lambda r, u, n, a: f"/Reportes/{r.randint(1, n)}", None),
+    "by_user": (10, "GET", lambda r, u, n, a: f"/Reportes/user/{r.randint(1, u)}", None),
+    "ranking": (5, "GET", lambda r, u, n, a: f"/Reportes/ranking/distritos?period={r.choice(['week', 'month'])}", None),
+    "stats": (3, "GET", lambda r, u, n, a: "/Reportes/estadisticas/distritos", None),
+    "riesgo": (5, "GET", lambda r, u, n, a: f"/AreasInteres/{r.randint(1, max(1, a))}/riesgo", None),
+    "login": (5, "POST", lambda r, u, n, a: "/auth/login",
+              lambda r, u: {"user": f"vecino{(uid := r.randint(1, u))}", "psswd": f"clave{uid}"}),
+    "create": (2, "POST", lambda r, u, n, a: "/Reportes",
+               lambda r, u: {"user_id": r.randint(1, u), "titulo": "Carga", "categoria": "Robo",
+                             "distrito": "Miraflores", "estado": "Activo", "veracidad_porcentaje": 50}),
+}
+
+
+# Fracción máxima de 429/503 para considerar válida una corrida
+REJECTED_MAX_SHARE = 0.01
+
+
+@dataclass
+class Samples:
+    latencies: list[float] = field(default_factory=list)
+    statuses: dict[int, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def summary(self, elapsed: float) -> dict:
+        lat = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            if not lat:
+                return 0.0
+            return round(lat[min(len(lat) - 1, int(p / 100 * len(lat)))] * 1000, 2)
+
+        return {
+            "requests": len(lat) + self.errors,
+            "rps": round((len(lat) + self.errors) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": pct(50),
+            "p95_ms": pct(95),
+            "p99_ms": pct(99),
+            "mean_ms": round(statistics.fmean(lat) * 1000, 2) if lat else 0.0,
+            "max_ms": round(lat[-1] * 1000, 2) if lat else 0.0,
+            "statuses": {str(k): v for k, v in sorted(self.statuses.items())},
+            # Rechazos del rate limit y del shedding/bulkheads: no son latencias del endpoint
+            "rate_limited": self.statuses.get(429, 0),
+            "unavailable": self.statuses.get(503, 0),
+            "transport_errors": self.errors,
+        }
+
+
+async def _worker(client: httpx.AsyncClient, names: list[str], weights: list[int], sizes: tuple[int, int, int],
+                  deadline: float, results: dict[str, Samples], rng: random.Random) -> None:
+    users, reportes, areas = sizes
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        _, method, path_fn, body_fn = SCENARIOS[name]
+        path = path_fn(rng, users, reportes, areas)
+        body = body_fn(rng, users) if body_fn else None
+        samples = results[name]
+        start = time.perf_counter()
+        try:
+            res = await client.request(method, path, json=body)
+        except httpx.HTTPError:
+            samples.errors += 1
+            continue
+        samples.latencies.append(time.perf_counter() - start)
+        samples.statuses[res.status_code] = samples.statuses.get(res.status_code, 0) + 1
+
+
+async def run(client: httpx.AsyncClient, *, duration: float, concurrency: int, only: list[str] | None,
+              sizes: tuple[int, int, int], warmup: float, seed: int) -> dict:
+    names = [n for n in SCENARIOS if not only or n in only]
+    weights = [SCENARIOS[n][0] for n in names]
+    rng = random.Random(seed)
+
+    if warmup > 0:
+        scratch = {n: Samples() for n in names}
+        end = time.perf_counter() + warmup
+        await asyncio.gather(*(
+            _worker(client, names, weights, sizes, end, scratch, random.Random(rng.random()))
+            for _ in range(concurrency)
+        ))
+
+    results = {n: Samples() for n in names}
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _worker(client, names, weights, sizes, start + duration, results, random.Random(rng.random()))
+        for _ in range(concurrency)
+    ))
+    elapsed = time.perf_counter() - start
+
+    overall = Samples()
+    for s in results.values():
+        overall.latencies.extend(s.latencies)
+        overall.errors += s.errors
+        for code, count in s.statuses.items():
+            overall.statuses[code] = overall.statuses.get(code, 0) + count
+    return {
+        "duration_s": round(elapsed, 2),
+        "concurrency": concurrency,
+        "overall": overall.summary(elapsed),
+        "endpoints": {n: s.summary(elapsed) for n, s in results.items() if s.latencies or s.errors},
+    }
+
+
+def print_report(report: dict) -> None:
+    header = (f"{'endpoint':<10} {'reqs':>7} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+              f"{'429':>6} {'503':>6}  statuses")
+    print(header)
+    print("-" * len(header))
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for name, s in rows:
+        print(f"{name:<10} {s['requests']:>7} {s['rps']:>8} {s['p50_ms']:>8} {s['p95_ms']:>8} "
+              f"{s['p99_ms']:>8} {s['max_ms']:>8} {s['rate_limited']:>6} {s['unavailable']:>6}  {s['statuses']}"
+              + (f" errores={s['transport_errors']}" if s["transport_errors"] else ""))
+    if not report["valid"]:
+        overall = report["overall"]
+        print(f"\nCORRIDA NO VÁLIDA: {overall['rate_limited']} respuestas 429 y {overall['unavailable']} 503 "
+              f"de {overall['requests']} (máximo {REJECTED_MAX_SHARE:.0%}); revisar RATE_LIMIT_* y OVERLOAD_*")
+
+
+def is_valid(summary: dict) -> bool:
+    rejected = summary["rate_limited"] + summary["unavailable"]
+    return rejected <= REJECTED_MAX_SHARE * summary["requests"]
+
+
+def _in_process_client(args) -> tuple[httpx.AsyncClient, tuple[int, int, int], object]:
+    from bench.datagen import SCALES, generate, load
+    from bench.fake_upstream import FakeDatabase, FakeUpstream, FaultConfig, Faults, mock_transport
+
+    for key, value in {
+        "SUPABASE_URL": "http://fake-upstream",
+        "SUPABASE_ANON_KEY": "bench",
+        "GOOGLE_MAPS_API_KEY": "bench",
+        "SENDGRID_API_KEY": "SG.bench",
+        # Por si algo llama al SDK igual: nunca a api.sendgrid.com
+        "SENDGRID_API_HOST": "http://fake-upstream",
+        "GOOGLE_MAPS_BASE_URL": "http://fake-upstream/maps/api",
+        "LOG_LEVEL": "WARNING",
+        # Un solo cliente = un solo bucket de IP: sin esto se mide el rate limit, no la API
+        "RATE_LIMIT_ENABLED": "false",
+        # El driver comparte el event loop con la app: su propio lag no debe disparar el shedding (0 = sin tope)
+        "OVERLOAD_MAX_IN_FLIGHT": "0",
+        "OVERLOAD_MAX_LAG_MS": "0",
+    }.items():
+        os.environ.setdefault(key, value)
+
+    tables = load(args.data) if args.data else generate(*SCALES[args.scale])
+    faults = Faults(args.latency_ms, args.jitter_ms, args.error_rate, args.timeout_rate, args.timeout_s)
+    upstream = FakeUpstream(FakeDatabase(tables), FaultConfig(supabase=faults))
+    transport = mock_transport(upstream)
+
+    from app.clients import google_maps_client, sendgrid_client, supabase_client
+    from app.main import create_app
+    from app.services import email_service
+
+    # Mismos timeouts que producción, pero sin red
+    supabase_client._shared_async_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(10.0))
+    supabase_client._shared_write_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(10.0))
+    google_maps_client._shared_async_client = httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(10.0))
+
+    mail_client = httpx.AsyncClient(transport=transport, base_url="http://fake-upstream", timeout=httpx.Timeout(10.0))
+
+    async def send_mail(api_key, message, kind):
+        # Misma firma que sendgrid_client.send_mail; la respuesta trae status_code como la del SDK
+        return await mail_client.post("/v3/mail/send", json=message.get())
+
+    sendgrid_client.send_mail = send_mail
+    email_service.send_mail = send_mail  # importado por nombre
+
+    app = create_app()
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://api", timeout=60.0)
+    sizes = (len(tables["Usuarios"]), len(tables["Reportes"]), len(tables.get("AreasInteres", [])))
+    return client, sizes, app
+
+
+async def _wait_until_ready(timeout: float) -> None:
+    """Wait for the in-memory indexes built by the lifespan (gives up after `timeout`)."""
+    from app.services.indexes import enabled_indexes
+
+    deadline = time.perf_counter() + timeout
+    pending = list(enabled_indexes().values())
+    while pending and time.perf_counter() < deadline:
+        await asyncio.sleep(0.1)
+        pending = [index for index in pending if not index.ready]
+    if pending:
+        print(f"aviso: índices sin cargar tras {timeout:.0f} s: {', '.join(i.label for i in pending)}", file=sys.stderr)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="URL base de la API ya levantada")
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument("--data", help="JSON de bench.datagen (modo en proceso)")
+    parser.add_argument("--scale", default="small")
+    parser.add_argument("--users", type=int, default=2_000, help="rango de IDs de usuario (modo --target)")
+    parser.add_argument("--reportes", type=int, default=20_000, help="rango de IDs de reporte (modo --target)")
+    parser.add_argument("--areas", type=int, default=400, help="rango de IDs de área (modo --target)")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--only", help="escenarios separados por coma: " + ",".join(SCENARIOS))
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-s", type=float, default=30.0)
+    parser.add_argument("--ready-timeout", type=float, default=120.0,
+                        help="segundos máximos de espera a los índices en memoria (modo en proceso)")
+    parser.add_argument("--json", dest="json_out", help="guardar el reporte en este archivo")
+    args = parser.parse_args(argv)
+
+    if bool(args.target) == bool(args.in_process):
+        parser.error("usar --target URL o --in-process (uno de los dos)")
+
+    app = None
+    if args.in_process:
+        client, sizes, app = _in_process_client(args)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=args.target, timeout=60.0, limits=limits)
+        sizes = (args.users, args.reportes, args.areas)
+
+    only = [s.strip() for s in args.only.split(",")] if args.only else None
+
+    async def go() -> dict:
+        async with contextlib.AsyncExitStack() as stack:
+            if app is not None:
+                # ASGITransport no dispara el lifespan: tareas de fondo, índices, rollups, réplica
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                await _wait_until_ready(args.ready_timeout)
+            await stack.enter_async_context(client)
+            return await run(client, duration=args.duration, concurrency=args.concurrency, only=only,
+                             sizes=sizes, warmup=args.warmup, seed=args.seed)
+
+    report = asyncio.run(go())
+    report["mode"] = "in-process" if args.in_process else args.target
+    report["valid"] = is_valid(report["overall"])
+    print_report(report)
+    if args.json_out:
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0 if report["valid"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Micro-benchmarks de los caminos CPU-bound que escalan con el tamaño de tabla.
+
+Cada benchmark recibe N filas sintéticas (10k, 100k y 1M por defecto) ya en
+memoria, sin red: los repositorios/clientes se reemplazan por dobles que
+devuelven esas filas. Se mide el tiempo (mínimo y mediana de varias corridas)
+y, en una corrida aparte con tracemalloc, el pico de memoria.
+
+Uso:
+    python -m bench.micro                                  # todos, 10k/100k/1M
+    python -m bench.micro --sizes 10000,100000 --only ranking,riesgo
+    python -m bench.micro --json bench/results/micro.json --compare bench/results/base.json
+
+Con --compare se imprime la razón contra una corrida anterior (<1 = mejora).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import inspect
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from bench.datagen import CATEGORIAS, ESTADOS, LIMA_DISTRICTS
+
+for _key, _value in {
+    "SUPABASE_URL": "http://fake-upstream",
+    "SUPABASE_ANON_KEY": "bench",
+    "GOOGLE_MAPS_API_KEY": "bench",
+    "SENDGRID_API_KEY": "SG.bench",
+    "LOG_LEVEL": "WARNING",
+}.items():
+    os.environ.setdefault(_key, _value)
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+
+# setup(n) -> función (sync o async) sin argumentos que ejecuta el camino medido
+Setup = Callable[[int], Callable[[], Any]]
+
+
+@dataclass
+class Benchmark:
+    name: str
+    target: str
+    setup: Setup
+
+
+BENCHMARKS: dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, target: str):
+    def register(setup: Setup) -> Setup:
+        BENCHMARKS[name] = Benchmark(name, target, setup)
+        return setup
+    return register
+
+
+# ---------------------------------------------------------------------------
+# Datos sintéticos
+# ---------------------------------------------------------------------------
+
+def reportes_rows(n: int, seed: int = 3) -> list[dict]:
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(1, n + 1):
+        distrito, lat, lon, _ = LIMA_DISTRICTS[rng.randrange(len(LIMA_DISTRICTS))]
+        rows.append({
+            "id": i,
+            "user_id": rng.randint(1, max(1, n // 10)),
+            "distrito": distrito if rng.random() > 0.02 else None,
+            "categoria": rng.choice(CATEGORIAS),
+            "estado": rng.choices(ESTADOS, [80, 8, 12])[0],
+            "veracidad_porcentaje": rng.randint(0, 100),
+            "lat": lat + rng.uniform(-0.02, 0.02),
+            "lon": lon + rng.uniform(-0.02, 0.02),
+            # Mitad dentro de la última semana para que los filtros de período trabajen
+            "created_at": (now - timedelta(seconds=rng.randrange(14 * 86400))).isoformat(),
+        })
+    return rows
+
+
+def geocode_components(n: int, seed: int = 5) -> list[list[dict]]:
+    rng = random.Random(seed)
+    results = []
+    for _ in range(n):
+        distrito = LIMA_DISTRICTS[rng.randrange(len(LIMA_DISTRICTS))][0]
+        comps = [
+            {"long_name": f"Calle {rng.randint(1, 999)}", "types": ["route"]},
+            {"long_name": str(rng.randint(100, 999)), "types": ["street_number"]},
+            {"long_name": "Lima", "types": ["administrative_area_level_2", "political"]},
+            {"long_name": "Perú", "types": ["country", "political"]},
+        ]
+        # Variar el tipo que trae el distrito para recorrer distintas prioridades
+        kind = rng.choice(["sublocality_level_1", "administrative_area_level_3", "locality", None])
+        if kind:
+            comps.insert(rng.randrange(len(comps) + 1), {"long_name": distrito, "types": [kind, "political"]})
+        results.append(comps)
+    return results
+
+
+class _StaticResponse:
+    """Enough of httpx.Response for repositories reading a pre-encoded JSON body."""
+
+    status_code = 200
+
+    def __init__(self, rows: list[dict]):
+        self.content = json.dumps(rows).encode()
+        self.text = self.content.decode()
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        return None
+
+
+class _StaticClient:
+    def __init__(self, rows: list[dict]):
+        self.response = _StaticResponse(rows)
+
+    async def get(self, url: str, params: dict | None = None) -> _StaticResponse:
+        return self.response
+
+
+class _RowsRepo:
+    """Repository double returning fixed rows for any list_* call."""
+
+    def __init__(self, rows: list[dict] | None = None, by_id: dict | None = None):
+        self.rows = rows or []
+        self.by_id = by_id or {}
+
+    async def list_reportes(self, **kwargs) -> list[dict]:
+        return self.rows
+
+    async def list_by_reporte(self, reporte_id: int) -> list[dict]:
+        return self.rows
+
+    async def get_by_id(self, item_id: int) -> dict | None:
+        return self.by_id.get(item_id)
+
+    async def update_reporte(self, reporte_id: int, payload: dict) -> dict:
+        return {"id": reporte_id, **payload}
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@benchmark("ranking", "ReportesRepository.get_district_ranking")
+def _ranking(n: int):
+    from app.repositories.reportes_repository import ReportesRepository
+
+    repo = ReportesRepository(client=_StaticClient(reportes_rows(n)))
+    return lambda: repo.get_district_ranking("month")
+
+
+@benchmark("statistics", "ReportesRepository.get_district_statistics")
+def _statistics(n: int):
+    from app.repositories.reportes_repository import ReportesRepository
+
+    repo = ReportesRepository(client=_StaticClient(reportes_rows(n)))
+    return repo.get_district_statistics
+
+
+@benchmark("find_district", "ReportesRepository._find_district_in_components")
+def _find_district(n: int):
+    import logging
+
+    from app.repositories.reportes_repository import ReportesRepository
+
+    # El método loguea cada acierto en INFO; se mide el cálculo, no el logging
+    logging.getLogger("app.repositories.reportes_repository").setLevel(logging.WARNING)
+    repo = ReportesRepository(client=_StaticClient([]))
+    results = geocode_components(n)
+
+    def run() -> int:
+        return sum(1 for comps in results if repo._find_district_in_components(comps))
+    return run
+
+
+@benchmark("riesgo", "AreasInteresService.calcular_nivel_riesgo")
+def _riesgo(n: int):
+    from app.services.areas_interes_service import AreasInteresService
+
+    # En producción se consultan 1000 reportes; aquí se alimentan N para ver cómo escala el bucle
+    area = {"id": 1, "nombre": "Miraflores", "lat": -12.1211, "lon": -77.0297, "radio_metros": 2000}
+    service = AreasInteresService(repo=_RowsRepo(by_id={1: area}), reportes_repo=_RowsRepo(reportes_rows(n)))
+    return lambda: service.calcular_nivel_riesgo(1, 7)
+
+
+@benchmark("veracidad", "NotasComunidadService._recalcular_veracidad")
+def _veracidad(n: int):
+    import app.repositories.reacciones_repository as reacciones_module
+    from app.services.notas_comunidad_service import NotasComunidadService
+
+    rng = random.Random(9)
+    reacciones = [{"id": i, "reporte_id": 1, "tipo": rng.choice(["upvote", "downvote"])} for i in range(n)]
+    notas = [{"id": i, "reporte_id": 1, "es_veraz": rng.choice([True, False, None])} for i in range(n // 10)]
+    # _recalcular_veracidad instancia ReaccionesRepository() por dentro
+    reacciones_module.ReaccionesRepository = lambda: _RowsRepo(reacciones)
+    service = NotasComunidadService(repo=_RowsRepo(notas), reportes_repo=_RowsRepo())
+    return lambda: service._recalcular_veracidad(1)
+
+
+# ---------------------------------------------------------------------------
+# Runner
+# ---------------------------------------------------------------------------
+
+def _call(fn: Callable[[], Any], loop: asyncio.AbstractEventLoop) -> Any:
+    result = fn()
+    if inspect.isawaitable(result):
+        result = loop.run_until_complete(result)
+    return result
+
+
+def measure(bench: Benchmark, n: int, repeat: int, loop: asyncio.AbstractEventLoop) -> dict:
+    fn = bench.setup(n)
+    _call(fn, loop)  # calentamiento (imports perezosos, cachés)
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        _call(fn, loop)
+        times.append(time.perf_counter() - start)
+
+    gc.collect()
+    tracemalloc.start()
+    _call(fn, loop)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "name": bench.name,
+        "target": bench.target,
+        "rows": n,
+        "runs": repeat,
+        "min_s": round(min(times), 6),
+        "median_s": round(statistics.median(times), 6),
+        "peak_mem_bytes": peak,
+    }
+
+
+def _git_rev() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result: dict) -> tuple[str, int]:
+    return result["name"], result["rows"]
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)))
+    parser.add_argument("--only", help="benchmarks separados por coma: " + ",".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_out")
+    parser.add_argument("--compare", help="JSON de una corrida anterior")
+    args = parser.parse_args(argv)
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    names = [s.strip() for s in args.only.split(",")] if args.only else list(BENCHMARKS)
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = {_key(r): r for r in json.load(fh)["results"]}
+
+    loop = asyncio.new_event_loop()
+    results = []
+    print(f"{'benchmark':<14} {'rows':>9} {'min ms':>10} {'median ms':>10} {'peak MiB':>9}  vs base")
+    for name in names:
+        for n in sizes:
+            # Menos repeticiones con 1M filas para que la suite termine en minutos
+            repeat = max(1, args.repeat if n < 1_000_000 else args.repeat // 2)
+            result = measure(BENCHMARKS[name], n, repeat, loop)
+            results.append(result)
+            base = baseline.get(_key(result))
+            ratio = f"{result['median_s'] / base['median_s']:.2f}x" if base and base["median_s"] else ""
+            print(f"{name:<14} {n:>9} {result['min_s'] * 1000:>10.2f} {result['median_s'] * 1000:>10.2f} "
+                  f"{result['peak_mem_bytes'] / 2**20:>9.1f}  {ratio}")
+    loop.close()
+
+    if args.json_out:
+        os.makedirs(os.path.dirname(args.json_out) or ".", exist_ok=True)
+        with open(args.json_out, "w", encoding="utf-8") as fh:
+            json.dump({
+                "meta": {
+                    "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "git_rev": _git_rev(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                },
+                "results": results,
+            }, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())